@@ -1,4 +1,5 @@
 import argparse
+import logging
 import textwrap
 
 """
@@ -45,11 +46,14 @@ def main(args):
     from common.config import QUERY_DB_ADMIN_PATH, QUERY_DB_USER_PATH
 
     if 'convert' in args.type:
+        from source.format_convert import set_row_log_level
         from source.raw2tsv import convert_all_to_tsv
 
+        set_row_log_level(logging.DEBUG if args.verbose else logging.INFO)
+
     # 1️⃣ 字表轉換
     if 'convert' in args.type:
-        convert_all_to_tsv()
+        convert_all_to_tsv(jobs=args.jobs, force=args.force_convert)
 
     # 2️⃣ 字表检查
     if 'sheet' in args.check:
@@ -76,6 +80,7 @@ def main(args):
     #   python build.py -t needchars      → 重写中古地位数据库
     #   python build.py -t append         → 追加写入
     #   python build.py -t update         → 增量更新
+    #   python build.py -t incremental    → 按 TSV 内容哈希只重建变化的方言点
     #
     # 但避免：
     #   python build.py -c sheet          → 意外触发默认写库
@@ -84,7 +89,7 @@ def main(args):
         and not args.type
         and not args.check
     )
-    should_write_special = any(x in args.type for x in ['needchars', 'append', 'update'])
+    should_write_special = any(x in args.type for x in ['needchars', 'append', 'update', 'incremental'])
 
     if should_write_default or should_write_special:
         if args.user == 'admin':
@@ -92,14 +97,24 @@ def main(args):
                 mode='admin',
                 write_chars_db='needchars' in args.type,
                 append='append' in args.type,
-                update='update' in args.type
+                update='update' in args.type,
+                incremental='incremental' in args.type,
+                jobs=args.jobs,
+                syllable_cache=args.syllable_cache,
+                resume=not args.no_resume,
+                status_cube='cube' in args.type
             )
         elif args.user == 'user':
             write_to_sql(
                 mode='user',
                 write_chars_db='needchars' in args.type,
                 append='append' in args.type,
-                update='update' in args.type
+                update='update' in args.type,
+                incremental='incremental' in args.type,
+                jobs=args.jobs,
+                syllable_cache=args.syllable_cache,
+                resume=not args.no_resume,
+                status_cube='cube' in args.type
             )
 
     # 5️⃣ 建立 dialect 資料表
@@ -133,6 +148,19 @@ def main(args):
     if 'chars' in args.type:
         process_phonology_excel()
 
+    # 7️⃣.5 地位特徵預聚合：不寫庫時單獨刷新，只重算新增、刪除或 characters.db 變化後未重算的方言點
+    if 'cube' in args.type and not (should_write_default or should_write_special):
+        from common.config import DIALECTS_DB_ADMIN_PATH, DIALECTS_DB_USER_PATH
+        from source.status_cube import build_status_cube
+
+        build_status_cube(DIALECTS_DB_ADMIN_PATH if args.user == 'admin' else DIALECTS_DB_USER_PATH, abbrs=[])
+
+    # 8️⃣ 發佈數據庫給後端（放在最後，發佈本次生成的全部結果）
+    if 'publish' in args.type:
+        from source.publish_db import publish_databases
+
+        publish_databases()
+
 
 # === 命令列參數設定 ===
 if __name__ == "__main__":
@@ -145,6 +173,10 @@ if __name__ == "__main__":
           python build.py
           python build.py -m full
           python build.py -m diff -t update
+          python build.py -t incremental
+          python build.py -t incremental publish
+          python build.py -t incremental cube
+          python build.py -j 8
           python build.py -t convert chars query
           python build.py -c sheet
           python build.py -c deny
@@ -162,6 +194,43 @@ if __name__ == "__main__":
         help='指定写入数据库：admin 或 user'
     )
 
+    # 並行解析 TSV 的進程數
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='写库时并行解析 TSV 的进程数，写入仍由单进程按文件顺序完成；也用于 -t convert 并行转换字表'
+    )
+
+    # 忽略轉換清單，全部重新轉換
+    parser.add_argument(
+        '--force-convert',
+        action='store_true',
+        help='-t convert 时忽略转换清单，重新转换所有「已做」字表（默认跳过输出比来源新且配置未变的字表）'
+    )
+
+    # 輸出逐行轉換明細
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='-t convert 时输出逐行转换明细（笛卡尔积、多对一、简繁一对多等），默认只输出汇总和跳过提示'
+    )
+
+    # 持久化音節拆分緩存
+    parser.add_argument(
+        '--syllable-cache',
+        action='store_true',
+        help='写库时把音节拆分缓存保存到 data/cache/，下次运行直接复用'
+    )
+
+    # 丟棄上次中斷留下的暫存庫
+    parser.add_argument(
+        '--no-resume',
+        action='store_true',
+        help='全量写库时删除上次中断留下的暂存库（*.db.staging）从头构建，默认从最后完成的方言点继续'
+    )
+
     # 拉取 MCPDict 音典資料
     pull_group = parser.add_argument_group('音典数据拉取')
     pull_group.add_argument(
@@ -196,6 +265,9 @@ if __name__ == "__main__":
             'needchars',
             'append',
             'update',
+            'incremental',
+            'publish',
+            'cube',
         ],
         default=[],
         metavar='TASK',
@@ -208,6 +280,9 @@ if __name__ == "__main__":
           sync       同步方言标记
           append     追加写入，从补充表“待更新”列中添加，慎用
           update     增量更新，从 pull_yindian/ 读取 TSV 并更新数据库
+          incremental 对比构建清单中的 TSV 内容哈希，只重写新增、变化或删除的方言点
+          cube       生成 / 刷新方言库中的地位特征预聚合表 status_features；与写库任务同用时在建索引后生成
+          publish    把生成的数据库快照到 data/releases/<版本>/，检查、ANALYZE 后原子切换 data/current
         """)
     )
 
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+
+from common.config import CHARACTERS_DB_PATH
+from common.constants import HIERARCHY_COLUMNS
+from common.db_pool import get_read_connection
+
+MULTI_STATUS_COLUMN = "多地位標記"
+
+# 進程內緩存：(數據庫絕對路徑, 表名) → ((mtime_ns, 文件大小), CharactersIndex)
+_characters_index_cache = {}
+
+
+class CharactersIndex:
+    """
+    characters 表的只讀內存索引（按 rowid 順序，一行一個地位）：
+        層級欄位按類別編碼（codes[欄位] 為每行的類別號，categories[欄位] 為類別值，None 也是一類）
+        每個 (欄位, 值) 一個布爾位圖 → 路徑查詢是位圖求交
+        每個層級欄位一個「多地位」位圖：該行的字標了多地位，且全表中這個字在該欄位不止一個值
+    """
+
+    def __init__(self, chars, columns, multi_flags=None):
+        """
+        chars: 每行的漢字；columns: {層級欄位: 每行的值}；multi_flags: 每行的多地位標記，沒有該欄時為 None
+        """
+        self.size = len(chars)
+        self.chars = np.array(chars, dtype=object)
+        self.has_multi_flag = multi_flags is not None
+        self.codes = {}
+        self.categories = {}
+        self._bitmaps = {}
+        for col, values in columns.items():
+            categories = list(dict.fromkeys(values))
+            lookup = {value: code for code, value in enumerate(categories)}
+            codes = np.fromiter((lookup[value] for value in values), dtype=np.int32, count=self.size)
+            self.codes[col] = codes
+            self.categories[col] = categories
+            for code, value in enumerate(categories):
+                if value is not None:
+                    self._bitmaps[(col, value)] = codes == code
+
+        flagged = (
+            np.fromiter((flag == "1" for flag in multi_flags), dtype=bool, count=self.size)
+            if self.has_multi_flag else np.zeros(self.size, dtype=bool)
+        )
+        # 每行的字編號；(字編號, 類別號) 去重後按字計數，即一字在該欄位有幾個不同的值
+        char_lookup = {}
+        char_codes = np.fromiter(
+            (char_lookup.setdefault(char, len(char_lookup)) for char in chars), dtype=np.int64, count=self.size
+        )
+        self._multi_bitmaps = {}
+        for col, codes in self.codes.items():
+            width = len(self.categories[col])
+            pairs = np.unique(char_codes * width + codes)
+            value_counts = np.bincount(pairs // width, minlength=len(char_lookup))
+            self._multi_bitmaps[col] = flagged & (value_counts[char_codes] > 1)
+
+    def values(self, col):
+        """欄位的全部非空值（排序）"""
+        return sorted(value for value in self.categories.get(col, []) if value is not None)
+
+    def match_rows(self, conditions):
+        """同時滿足全部 (值, 欄位) 條件的行（布爾位圖）"""
+        bitmap = np.ones(self.size, dtype=bool)
+        for value, col in conditions:
+            posting = self._bitmaps.get((col, value))
+            if posting is None:
+                return np.zeros(self.size, dtype=bool)
+            bitmap = bitmap & posting
+        return bitmap
+
+    def query(self, conditions):
+        """
+        Returns:
+            tuple: (符合條件的漢字，按行序、一行一個；
+                    其中的多地位字：標了多地位，且全表中在條件涉及的欄位上不止一個地位)
+        """
+        matched = self.match_rows(conditions)
+        characters = [char for char in self.chars[matched].tolist() if char is not None]
+        if not characters:
+            return [], []
+
+        multi = np.zeros(self.size, dtype=bool)
+        for col in dict.fromkeys(col for _, col in conditions):
+            multi |= self._multi_bitmaps[col]
+        multi_chars = list(dict.fromkeys(
+            char for char in self.chars[matched & multi].tolist() if char is not None
+        ))
+        return characters, multi_chars
+
+
+def load_characters_index(db_path=CHARACTERS_DB_PATH, table="characters"):
+    """
+    讀出 characters 表的內存索引。同一進程內按數據庫路徑和表名緩存，庫文件變化後重新讀取。
+    表中缺少的層級欄位不建索引。
+    """
+    db_path = os.path.abspath(db_path)
+    stat = os.stat(db_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (db_path, table)
+
+    cached = _characters_index_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    conn = get_read_connection(db_path)
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    columns = [col for col in HIERARCHY_COLUMNS if col in existing]
+    has_flag = MULTI_STATUS_COLUMN in existing
+    select = ["漢字", *columns] + ([MULTI_STATUS_COLUMN] if has_flag else [])
+    rows = conn.execute(f"SELECT {', '.join(select)} FROM {table} ORDER BY rowid").fetchall()
+
+    chars = [row[0] for row in rows]
+    column_values = {col: [row[i] for row in rows] for i, col in enumerate(columns, start=1)}
+    multi_flags = [row[-1] for row in rows] if has_flag else None
+
+    index = CharactersIndex(chars, column_values, multi_flags)
+    _characters_index_cache[key] = (signature, index)
+    return index
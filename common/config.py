@@ -48,6 +48,9 @@ MULCODECHAR_PATH = os.path.join(BASE_DIR, "data", "dependency", "mulcodechar.dt"
 MISSING_DATA_LOG = os.path.join(BASE_DIR, "logs", "缺資料.txt")
 WRITE_INFO_LOG = os.path.join(BASE_DIR, "logs", "write.txt")
 WRITE_ERROR_LOG = os.path.join(BASE_DIR, "logs", "write_error.txt")
+SYLLABLE_CACHE_PATH = os.path.join(BASE_DIR, "data", "cache", "syllable_cache.pkl")
+WORKBOOK_CACHE_DIR = os.path.join(BASE_DIR, "data", "cache", "workbooks")
+CONVERT_MANIFEST_PATH = os.path.join(BASE_DIR, "data", "cache", "convert_manifest.json")
 
 # Admin 模式數據庫路徑
 QUERY_DB_ADMIN_PATH = os.path.join(BASE_DIR, "data", "query_admin.db")
@@ -61,3 +64,9 @@ DIALECTS_DB_USER_PATH = os.path.join(BASE_DIR, "data", "dialects_user.db")
 QUERY_DB_PATH = QUERY_DB_ADMIN_PATH
 DIALECTS_DB_PATH = DIALECTS_DB_ADMIN_PATH
 
+# 發佈給後端的數據庫：data/releases/<版本>/ 存整套副本，data/current 符號鏈接指向正在服務的版本
+RELEASES_DIR = os.path.join(BASE_DIR, "data", "releases")
+CURRENT_RELEASE_PATH = os.path.join(BASE_DIR, "data", "current")
+# 保留最近幾個發佈版本（含當前版本），便於回滾
+KEEP_RELEASES = 3
+
@@ -0,0 +1,77 @@
+"""
+查詢輔助函數共用的只讀 SQLite 連接。
+
+後端（FastAPI）和分析腳本反覆調用 query_by_status、search_tones 等函數，
+每次 sqlite3.connect 的建連、讀 schema 佔了請求耗時的可觀部分。這裡按 (線程, 數據庫路徑) 複用連接：
+    - 以 URI mode=ro 打開，開啟 mmap，放大預編譯語句緩存（SQL 文本不變時直接複用）
+    - 路徑指向的文件換了（發佈切換 data/current、全量構建替換正式庫）時自動重新打開
+長 IN 列表用 json_each 綁定成一個參數（見 IN_JSON / json_param），SQL 文本不隨列表長度變化。
+構建流程的寫庫連接不走這裡。
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+READ_MMAP_SIZE = 256 * 1024 * 1024
+READ_CACHED_STATEMENTS = 256
+# 在 WHERE 中寫 f"簡稱 {IN_JSON}"，參數傳 json_param(列表)
+IN_JSON = "IN (SELECT value FROM json_each(?))"
+
+# (進程 id, 線程 id, 數據庫絕對路徑) → ((st_dev, st_ino), 連接)
+# 帶上進程 id：構建流程 fork 出的子進程不能沿用父進程的連接
+_connections = {}
+_lock = threading.Lock()
+
+
+def json_param(values):
+    """把值列表編碼成 json_each 的參數"""
+    return json.dumps(list(values), ensure_ascii=False)
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def _open_read_connection(path):
+    conn = sqlite3.connect(
+        f"{Path(path).as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=READ_CACHED_STATEMENTS,
+    )
+    conn.execute(f"PRAGMA mmap_size = {READ_MMAP_SIZE}")
+    return conn
+
+
+def get_read_connection(db_path):
+    """
+    當前線程到 db_path 的只讀連接，調用方不要關閉。
+    數據庫不存在時拋出 FileNotFoundError。
+    """
+    path = os.path.abspath(db_path)
+    identity = _file_identity(path)
+    key = (os.getpid(), threading.get_ident(), path)
+
+    cached = _connections.get(key)
+    if cached is not None:
+        if cached[0] == identity:
+            return cached[1]
+        cached[1].close()
+
+    conn = _open_read_connection(path)
+    with _lock:
+        _connections[key] = (identity, conn)
+    return conn
+
+
+def close_read_connections(db_path=None):
+    """關閉本進程所有線程到 db_path（None 表示全部數據庫）的只讀連接，如替換數據庫文件前"""
+    path = os.path.abspath(db_path) if db_path is not None else None
+    pid = os.getpid()
+    with _lock:
+        keys = [key for key in _connections if key[0] == pid and (path is None or key[2] == path)]
+        for key in keys:
+            _connections.pop(key)[1].close()
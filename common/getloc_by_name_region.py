@@ -1,7 +1,7 @@
 import os
-import sqlite3
 
 from common.config import QUERY_DB_PATH
+from common.db_pool import get_read_connection
 
 
 def query_dialect_abbreviations(
@@ -57,38 +57,37 @@ def query_dialect_abbreviations(
     result = []
     seen = set()
 
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        # 根據 region_mode 決定使用哪個分區欄位
-        partition_column = "地圖集二分區" if region_mode == "map" else "音典分區"
-        if debug:
-            print(region_mode)
-            print(partition_column)
-            print(db_path)
-        query = f"""
-            SELECT {partition_column}, 簡稱 
-            FROM {tables} 
-            WHERE 1=1
-        """
-        if need_storage_flag:
-            query += " AND 存儲標記 IS NOT NULL AND 存儲標記 != ''"
-        cursor.execute(query)
-        all_rows = cursor.fetchall()
-
-        for item in region_list:
-            found_exact = False
+    cursor = get_read_connection(db_path).cursor()
+    # 根據 region_mode 決定使用哪個分區欄位
+    partition_column = "地圖集二分區" if region_mode == "map" else "音典分區"
+    if debug:
+        print(region_mode)
+        print(partition_column)
+        print(db_path)
+    query = f"""
+        SELECT {partition_column}, 簡稱 
+        FROM {tables} 
+        WHERE 1=1
+    """
+    if need_storage_flag:
+        query += " AND 存儲標記 IS NOT NULL AND 存儲標記 != ''"
+    cursor.execute(query)
+    all_rows = cursor.fetchall()
+
+    for item in region_list:
+        found_exact = False
+        for partition_str, abbr in all_rows:
+            if item == partition_str:
+                if abbr not in seen:
+                    result.append(abbr)
+                    seen.add(abbr)
+                found_exact = True
+        if not found_exact:
             for partition_str, abbr in all_rows:
-                if item == partition_str:
+                if item in partition_str.split("-"):
                     if abbr not in seen:
                         result.append(abbr)
                         seen.add(abbr)
-                    found_exact = True
-            if not found_exact:
-                for partition_str, abbr in all_rows:
-                    if item in partition_str.split("-"):
-                        if abbr not in seen:
-                            result.append(abbr)
-                            seen.add(abbr)
 
     # 最終結果：保留匹配順序，直接拼接原始地點
     final_result = result + location_list
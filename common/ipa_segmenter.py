@@ -0,0 +1,244 @@
+import contextlib
+import os
+import pickle
+import re
+from collections import OrderedDict
+
+from common.constants import vowel_pattern
+
+# 字符集（對應原先逐字 re.match 的字符類）
+VOWEL_CHARS = frozenset(vowel_pattern.strip('[]'))
+VOWEL_OR_GLIDE_CHARS = VOWEL_CHARS | {'j', 'ʲ'}
+FALLBACK_CONSONANT_CHARS = frozenset("ʐɣmnŋɲȵƞʋvʒlḷfzr")
+SYLLABIC_CONSONANT_CHARS = frozenset("ʐzflḷɣmnŋȵɲƞʋvʒr")
+ZERO_INITIAL_MARKS = ("∅", "Ø")
+
+PUNCT_ONLY_PATTERN = re.compile(r'^[\d\/?\'"’”、|；：，。:;,.]+$')
+PLACEHOLDER_HANZI_PATTERN = re.compile(r"[□■⬜⬛☐☑☒▯▢▣█�]")
+TONE_CODE_PATTERN = re.compile(r"([A-Da-d0-9]+)")
+TONE_CODE_SUFFIX_PATTERN = re.compile(r'[a-dA-D]+$')
+DECIMAL_PATTERN = re.compile(r"\d")
+
+# 韻母替換的鍵都是單字符，且替換結果不會再命中後面的鍵，可合併成一張翻譯表（與逐個 str.replace 結果相同）。
+# 鼻化元音由預組合字符拆成「元音 + U+0303」（多字符輸出），用轉義寫出，免得被編輯器 NFC 正規化
+RHYME_TRANSLATION = str.maketrans({
+    'ε': 'ɛ', "α": "ɑ", "ʯ": "ʮ", "∅": "ø", "ο": "o", "ǝ": "ə", "о": "o", "у": "y", "е": "e",
+    "\u00e3": "a\u0303", "\u1ebd": "e\u0303", "\u0129": "i\u0303", "\u012b": "i\u0303", "\u0101": "a\u0303",
+    "\u1ef9": "y\u0303", "\u00f5": "o\u0303", "ʱ": "ʰ", "ˡ": "ʰ"
+})
+
+# 聲母替換有多字符鍵且前後依賴（th → tʰ, tsh → tsʰ → ʦʰ），必須按順序執行
+CONSONANT_REPLACEMENTS = (
+    ('∫', 'ʃ'), ('th', 'tʰ'), ('kh', 'kʰ'), ('ph', 'pʰ'),
+    ('tsh', 'tsʰ'), ("ς", "ɕ"), ('ts', 'ʦ'), ('tʃ', 'ʧ'), ('tɕ', 'ʨ'),
+    ("∨", "v"), ("ł", "ɬ"), ("tʰs", "ʦʰ"), ("(ʔ)", "ʔ"), ("∅", "ʔ"), ("Ǿ", "ʔ"),
+)
+
+
+def _is_cjk(c):
+    return '一' <= c <= '鿿'
+
+
+def _take_until(text, stop_chars, stop_on_decimal=False):
+    out = []
+    for c in text:
+        if c in stop_chars or (stop_on_decimal and c.isdecimal()):
+            break
+        out.append(c)
+    return ''.join(out)
+
+
+def _extract_consonant(phon):
+    """返回 (聲母, 韻母起始偏移)"""
+    if phon[0] in ZERO_INITIAL_MARKS:
+        return "ʔ", 0
+
+    rhyme_start = 0
+    head = DECIMAL_PATTERN.split(phon, 1)[0]
+    if not any(c in VOWEL_CHARS for c in head):
+        if len(phon) > 1 and phon[0] in 'mn' and phon[1] == 'ŋ':
+            consonant = phon[0]
+            rhyme_start = 1
+        elif phon[0] in FALLBACK_CONSONANT_CHARS:
+            consonant = "/"
+        elif not any(c in FALLBACK_CONSONANT_CHARS for c in phon):
+            consonant = ""
+        else:
+            consonant = _take_until(phon, FALLBACK_CONSONANT_CHARS, stop_on_decimal=True)
+    elif phon[0] in VOWEL_CHARS:
+        consonant = "/"
+    elif 'j' in phon[1:] or 'ʲ' in phon[1:]:
+        consonant = _take_until(phon, VOWEL_OR_GLIDE_CHARS)
+    else:
+        consonant = _take_until(phon, VOWEL_CHARS)
+
+    return DECIMAL_PATTERN.sub("", consonant), rhyme_start
+
+
+def _extract_rhyme(tmp_phon):
+    if 'j' in tmp_phon[1:] or 'ʲ' in tmp_phon[1:]:
+        # 從第一個元音或 j/ʲ 起，到數字或空白為止
+        for i, c in enumerate(tmp_phon):
+            if c in VOWEL_OR_GLIDE_CHARS:
+                end = i + 1
+                while end < len(tmp_phon) and not (tmp_phon[end].isdecimal() or tmp_phon[end].isspace()):
+                    end += 1
+                return tmp_phon[i:end]
+        return ""
+
+    for i, c in enumerate(tmp_phon):
+        if c in VOWEL_CHARS:
+            end = i + 1
+            while end < len(tmp_phon) and not (tmp_phon[end].isdigit() or tmp_phon[end].isspace()):
+                end += 1
+            return tmp_phon[i:end]
+
+    # 無元音：成音節輔音（m̩ / ŋ̍ / z̩ 等）
+    for i, c in enumerate(tmp_phon):
+        if c in SYLLABIC_CONSONANT_CHARS:
+            end = i + 1
+            while end < len(tmp_phon) and not (tmp_phon[end].isdecimal() or tmp_phon[end].isspace()):
+                end += 1
+            return tmp_phon[i:end]
+    return ""
+
+
+def split_syllable(phon):
+    """
+    把單個音節拆成 (聲母, 韻母)，已做標準化替換。
+    phon 需已 strip 且非空。
+    """
+    consonant, rhyme_start = _extract_consonant(phon)
+
+    tmp_phon = phon[1:] if phon.startswith(ZERO_INITIAL_MARKS) else phon[rhyme_start:]
+    rhyme = ''.join(
+        c for c in _extract_rhyme(tmp_phon)
+        if not (c.isdigit() or _is_cjk(c))
+    ).translate(RHYME_TRANSLATION)
+
+    for old, new in CONSONANT_REPLACEMENTS:
+        consonant = consonant.replace(old, new)
+
+    return consonant, rhyme
+
+
+def extract_tone_code(phon):
+    """取音節末尾的調號（如 7a → 7），「輕聲」原樣返回，無調號返回空串"""
+    if "輕聲" in phon:
+        return "輕聲"
+    tone_match = TONE_CODE_PATTERN.search(phon[::-1])
+    tone_code = tone_match.group(1) if tone_match else ""
+    if tone_code:
+        # 刪除末尾的字母，直到遇到數字
+        tone_code = TONE_CODE_SUFFIX_PATTERN.sub('', tone_code)
+    return tone_code[::-1] if tone_code else ""
+
+
+# 規則表變化時持久化的緩存自動失效
+RULES_SIGNATURE = repr((
+    vowel_pattern,
+    sorted(FALLBACK_CONSONANT_CHARS),
+    sorted(SYLLABIC_CONSONANT_CHARS),
+    sorted(RHYME_TRANSLATION.items()),
+    CONSONANT_REPLACEMENTS,
+))
+
+
+class SyllableCache:
+    """
+    音節拆分結果的有界 LRU 緩存：原始音節 → (聲母, 韻母, 調號)。
+    同一音節在各方言點間大量重複；調號 → 調類名因方言點而異，不在緩存內。
+    """
+
+    def __init__(self, maxsize=1 << 17):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # 只在 recording_new_entries 期間記錄新解析的條目，其餘時候為 None
+        self._new_entries = None
+
+    def parse(self, phon):
+        entry = self._entries.get(phon)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(phon)
+            return entry
+
+        self.misses += 1
+        consonant, rhyme = split_syllable(phon)
+        entry = (consonant, rhyme, extract_tone_code(phon))
+        self._store(phon, entry)
+        if self._new_entries is not None:
+            self._new_entries[phon] = entry
+        return entry
+
+    def _store(self, phon, entry):
+        self._entries[phon] = entry
+        self._entries.move_to_end(phon)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def counters(self):
+        return self.hits, self.misses
+
+    @contextlib.contextmanager
+    def recording_new_entries(self):
+        """
+        在 with 塊內記錄新解析的條目，產出記錄用的字典（供子進程回傳給主進程合併）。
+        不在 with 塊內時不記錄，其他調用方不會累積無界的字典。
+        """
+        entries = self._new_entries = {}
+        try:
+            yield entries
+        finally:
+            self._new_entries = None
+
+    def update(self, entries):
+        for phon, entry in entries.items():
+            self._store(phon, tuple(entry))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, path):
+        """讀取持久化緩存；文件不存在、損壞或規則已變化時忽略"""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            return 0
+        if not isinstance(data, dict) or data.get('rules') != RULES_SIGNATURE:
+            return 0
+        self.update(data.get('entries', {}))
+        return len(self._entries)
+
+    def save(self, path):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'rules': RULES_SIGNATURE, 'entries': dict(self._entries)}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+SYLLABLE_CACHE = SyllableCache()
+
+
+def parse_syllable(phon):
+    """返回 (聲母, 韻母, 調號)，經進程內共享的 SYLLABLE_CACHE"""
+    return SYLLABLE_CACHE.parse(phon)
+
+
+def load_syllable_cache(path):
+    """進程池 initializer：子進程啟動時載入持久化緩存"""
+    return SYLLABLE_CACHE.load(path)
+
+
+def is_skipped_syllable(phon):
+    """空音節或純數字 / 標點的音節不參與拆分"""
+    return not phon or PUNCT_ONLY_PATTERN.match(phon) is not None
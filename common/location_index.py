@@ -0,0 +1,215 @@
+import os
+import re
+import sqlite3
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from pypinyin import lazy_pinyin
+
+from common.config import QUERY_DB_PATH
+from common.db_pool import get_read_connection
+
+LOCATION_PINYIN_TABLE = "location_pinyin"
+LOCATION_NAME_COLUMNS = ("鎮", "行政村", "自然村")
+# 與 SQLite 默認 LIKE 相同：只有 ASCII 字母不分大小寫
+_ASCII_FOLD = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# 進程內緩存：(數據庫絕對路徑, 是否只取存儲標記=1) → ((mtime_ns, 文件大小), LocationIndex)
+_location_index_cache = {}
+
+
+@lru_cache(maxsize=65536)
+def name_pinyin(name):
+    """地名的無聲調拼音串（小寫、不分隔）"""
+    return ''.join(lazy_pinyin(name)).lower()
+
+
+def build_location_pinyin_table(conn):
+    """
+    由 query 庫的 dialects 表生成 location_pinyin(名稱, 拼音)，覆蓋全部簡稱和鎮 / 行政村 / 自然村名。
+    構建時做一次，匹配地點時不再逐個地名調用 lazy_pinyin。
+    """
+    names = set()
+    for col in ("簡稱",) + LOCATION_NAME_COLUMNS:
+        names.update(row[0] for row in conn.execute(f"SELECT {col} FROM dialects"))
+    rows = sorted((name, name_pinyin(name)) for name in names if isinstance(name, str) and name)
+
+    conn.execute(f"DROP TABLE IF EXISTS {LOCATION_PINYIN_TABLE}")
+    conn.execute(f"""
+        CREATE TABLE {LOCATION_PINYIN_TABLE} (
+            名稱 TEXT PRIMARY KEY,
+            拼音 TEXT NOT NULL
+        )
+    """)
+    conn.executemany(f"INSERT INTO {LOCATION_PINYIN_TABLE} (名稱, 拼音) VALUES (?, ?)", rows)
+    return len(rows)
+
+
+def _like_prefix_pattern(term):
+    """把 LIKE 'term%' 翻譯成正則（% → 任意串，_ → 任一字符，ASCII 字母不分大小寫）"""
+    parts = ['.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in term]
+    return re.compile(''.join(parts) + '.*', re.ASCII | re.IGNORECASE | re.DOTALL)
+
+
+def _similar_names(text, names, postings, threshold):
+    """
+    names 中與 text 的 SequenceMatcher 比值 ≥ threshold 的名字。
+    比值 ≥ threshold > 0 必須至少有一個相同字符，所以只需比較 postings 中與 text 共享字符的名字；
+    再依次用 real_quick_ratio / quick_ratio（都是比值的上界）篩掉，只對剩下的少數名字算真正的比值。
+    """
+    if postings is None:
+        candidates = names
+    else:
+        candidates = set()
+        for ch in set(text):
+            candidates |= postings.get(ch, set())
+
+    matcher = SequenceMatcher(None, text)
+    matched = []
+    for name in candidates:
+        matcher.set_seq2(name)
+        if (matcher.real_quick_ratio() >= threshold
+                and matcher.quick_ratio() >= threshold
+                and matcher.ratio() >= threshold):
+            matched.append(name)
+    return matched
+
+
+class LocationIndex:
+    """
+    一個 query 庫的地點檢索索引（全部在內存中）：
+        簡稱集合與按 ASCII 小寫排序的簡稱表 → 完全匹配 / 前綴匹配
+        鎮 / 行政村 / 自然村名的單字、雙字倒排表 → 子串匹配
+        參與相似度比較的名字及其單字倒排表、按長度排序的拼音表 → 相似 / 拼音相似匹配的候選預篩
+    """
+
+    def __init__(self, abbrs, geo_rows, pinyin=None):
+        """
+        abbrs: 簡稱列表；geo_rows: 按 LOCATION_NAME_COLUMNS 順序的 (地名, 簡稱)；pinyin: {名稱: 拼音}
+        """
+        pinyin = pinyin or {}
+        self.abbrs = set(abbrs)
+        self._folded_abbrs = sorted((abbr.translate(_ASCII_FOLD), abbr) for abbr in self.abbrs if isinstance(abbr, str))
+
+        # 同名地點以最後出現的一行的簡稱為準（與逐行覆蓋的結果一致）
+        self.geo_abbr = {}
+        # 參與相似度比較的名字 → 簡稱集合（地名和簡稱本身）
+        self.name_abbrs = {}
+        for name, abbr in geo_rows:
+            if not isinstance(name, str):
+                continue
+            self.geo_abbr[name] = abbr
+            if name and abbr and abbr in self.abbrs:
+                self.name_abbrs.setdefault(name, set()).add(abbr)
+        for abbr in self.abbrs:
+            if isinstance(abbr, str) and abbr:
+                self.name_abbrs.setdefault(abbr, set()).add(abbr)
+
+        self._geo_grams = {}
+        for name in self.geo_abbr:
+            for size in (1, 2):
+                for i in range(len(name) - size + 1):
+                    self._geo_grams.setdefault(name[i:i + size], set()).add(name)
+
+        self._name_chars = {}
+        for name in self.name_abbrs:
+            for ch in set(name):
+                self._name_chars.setdefault(ch, set()).add(name)
+
+        pinyin_names = {}
+        for name in self.name_abbrs:
+            text = pinyin.get(name)
+            if text is None:
+                text = name_pinyin(name)
+            pinyin_names.setdefault(text, []).append(name)
+        self._pinyin_names = pinyin_names
+        self._pinyin_by_length = sorted((len(text), text) for text in pinyin_names)
+
+    def exact(self, terms):
+        return {term for term in terms if term in self.abbrs}
+
+    def prefix(self, terms):
+        """與 簡稱 LIKE 'term%' 相同的前綴匹配"""
+        matched = set()
+        for term in terms:
+            if '%' in term or '_' in term:
+                pattern = _like_prefix_pattern(term)
+                matched.update(abbr for _, abbr in self._folded_abbrs if pattern.fullmatch(abbr))
+                continue
+            folded = term.translate(_ASCII_FOLD)
+            start = bisect_left(self._folded_abbrs, (folded,))
+            for key, abbr in self._folded_abbrs[start:]:
+                if not key.startswith(folded):
+                    break
+                matched.add(abbr)
+        return matched
+
+    def substring(self, terms):
+        """包含任一 term 的鎮 / 行政村 / 自然村名"""
+        matched = set()
+        for term in terms:
+            if not term:
+                matched.update(self.geo_abbr)
+                continue
+            grams = [term[i:i + 2] for i in range(len(term) - 1)] or [term]
+            postings = sorted((self._geo_grams.get(gram, set()) for gram in set(grams)), key=len)
+            candidates = set.intersection(*postings)
+            matched.update(name for name in candidates if term in name)
+        return matched
+
+    def similar(self, text, threshold=0.7):
+        """字面相似的名字：SequenceMatcher(None, text, 名字).ratio() ≥ threshold"""
+        if not text:
+            return []
+        return _similar_names(text, self.name_abbrs, self._name_chars, threshold)
+
+    def pinyin_similar(self, text, threshold=0.9):
+        """讀音相似的名字：兩者拼音串的 SequenceMatcher 比值 ≥ threshold"""
+        if not text:
+            return []
+        text_pinyin = name_pinyin(text)
+        size = len(text_pinyin)
+        # 比值 2M/(la+lb) ≥ threshold 要求 lb 落在 [la·t/(2-t), la·(2-t)/t]，多取一位避免浮點誤差
+        low = int(size * threshold / (2 - threshold)) - 1
+        high = int(size * (2 - threshold) / threshold) + 1
+        window = self._pinyin_by_length[
+            bisect_left(self._pinyin_by_length, (low,)):bisect_right(self._pinyin_by_length, (high, '\U0010ffff'))
+        ]
+        matched = _similar_names(text_pinyin, [text for _, text in window], None, threshold)
+        return [name for text in matched for name in self._pinyin_names[text]]
+
+
+def _read_pinyin_table(conn):
+    try:
+        return dict(conn.execute(f"SELECT 名稱, 拼音 FROM {LOCATION_PINYIN_TABLE}"))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def load_location_index(db_path=QUERY_DB_PATH, valid_only=True):
+    """
+    讀出 query 庫的地點檢索索引；valid_only=True 時只包含存儲標記=1 的方言點。
+    同一進程內按數據庫路徑緩存，庫文件變化（如同步存儲標記）後重新讀取。
+    庫中沒有 location_pinyin 表（舊庫）時即時計算拼音。
+    """
+    db_path = os.path.abspath(db_path)
+    stat = os.stat(db_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (db_path, valid_only)
+
+    cached = _location_index_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    where = " WHERE 存儲標記 = 1" if valid_only else ""
+    conn = get_read_connection(db_path)
+    abbrs = [row[0] for row in conn.execute(f"SELECT 簡稱 FROM dialects{where}")]
+    geo_rows = []
+    for col in LOCATION_NAME_COLUMNS:
+        geo_rows.extend(conn.execute(f"SELECT {col}, 簡稱 FROM dialects{where}"))
+    pinyin = _read_pinyin_table(conn)
+
+    index = LocationIndex(abbrs, geo_rows, pinyin)
+    _location_index_cache[key] = (signature, index)
+    return index
@@ -1,88 +1,222 @@
 import os
+from collections import OrderedDict
 
 from opencc import OpenCC
 
 from common.config import ZHENGZI_PATH, MULCODECHAR_PATH
 
+# 單字預計算表覆蓋的區段：CJK 基本區、擴展 A、兼容漢字
+SINGLE_CHAR_RANGES = ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF))
+
+
+class OpenCCService:
+    """
+    單個 OpenCC 配置的轉換服務：首次使用時才載入詞典，逐串結果記在有界 LRU 緩存中
+    （輸入常來自用戶，長期運行的進程不能無限增長）。預計算的單字表固定大小，另存不淘汰。
+    convert_many 把未命中的字串以換行拼接後一次轉換（詞典中沒有跨換行的詞條，結果與逐個轉換一致）。
+    """
+
+    def __init__(self, config, maxsize=1 << 16):
+        self.config = config
+        self.maxsize = maxsize
+        self._opencc = None
+        self._cache = OrderedDict()
+        self._single_chars = {}
+
+    def _converter(self):
+        if self._opencc is None:
+            self._opencc = OpenCC(self.config)
+        return self._opencc
+
+    def _lookup(self, text):
+        result = self._single_chars.get(text)
+        if result is None:
+            result = self._cache.get(text)
+            if result is not None:
+                self._cache.move_to_end(text)
+        return result
+
+    def _store(self, text, result):
+        self._cache[text] = result
+        self._cache.move_to_end(text)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _convert_batch(self, texts):
+        if any("\n" in text for text in texts):
+            return [self._converter().convert(text) for text in texts]
+        return self._converter().convert("\n".join(texts)).split("\n")
+
+    def convert(self, text):
+        result = self._lookup(text)
+        if result is None:
+            result = self._converter().convert(text)
+            self._store(text, result)
+        return result
+
+    def convert_many(self, texts):
+        """批量轉換，返回與輸入等長的列表"""
+        texts = list(texts)
+        results = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            result = self._lookup(text)
+            if result is None:
+                missing.append(text)
+            else:
+                results[text] = result
+        if missing:
+            for text, result in zip(missing, self._convert_batch(missing)):
+                self._store(text, result)
+                results[text] = result
+        return [results[text] for text in texts]
+
+    def precompute_single_chars(self, ranges=SINGLE_CHAR_RANGES):
+        """一次轉換整個區段的單字，之後的單字轉換都是字典命中"""
+        if self._single_chars:
+            return
+        chars = [chr(code) for start, end in ranges for code in range(start, end + 1)]
+        self._single_chars = dict(zip(chars, self._convert_batch(chars)))
+
+
+_opencc_services = {}
+
+
+def get_opencc(config):
+    """按配置名（如 's2t.json'）取得進程內共用的轉換服務"""
+    service = _opencc_services.get(config)
+    if service is None:
+        service = OpenCCService(config)
+        _opencc_services[config] = service
+    return service
 
-opencc_s2t = OpenCC('s2t.json')
-opencc_t2s = OpenCC('t2s.json')
 
 # ========== 簡繁轉換輔助函數 ==========
 def simplified2traditional(text):
     """簡體轉繁體"""
-    return opencc_s2t.convert(text)
+    return get_opencc('s2t.json').convert(text)
 
 def traditional2simplified(text):
     """繁體轉簡體"""
-    return opencc_t2s.convert(text)
+    return get_opencc('t2s.json').convert(text)
 
 # ========== 繁體轉換函數 ==========
-def s2t_pro(字組, level=1):
-    variant_file = os.path.join(os.path.dirname(__file__), ZHENGZI_PATH)
-    mulcode_file = os.path.join(os.path.dirname(__file__), MULCODECHAR_PATH)
-
-    normVariants = {}
+def load_variant_table(variant_file=ZHENGZI_PATH, level=1):
+    """讀取正字表，返回 {原字: 對應字串}"""
     stVariants = {}
-    n2o_dict = {}
+    with open(variant_file, encoding="utf-8") as f:
+        for 行 in f:
+            if 行.startswith("#"):
+                continue  # 行首為註解，跳過
+
+            行 = 行.rstrip("\n")
+            列 = 行.split("\t")
+            if len(列) < 2:
+                continue
+
+            原字 = 列[0].strip()
+            對應字串 = 列[1].split("#")[0].strip()  # 去除 # 後的註解
+            候選字列表 = 對應字串.split()
+
+            if level == 1:
+                if "#" in 行:
+                    continue  # 含 # 的行不處理
+                if len(候選字列表) > 1:
+                    continue  # 多候選字，不處理
 
-    # 讀取正字表
-    for 行 in open(variant_file, encoding="utf-8"):
-        if 行.startswith("#"):
-            continue  # 行首為註解，跳過
-
-        行 = 行.rstrip("\n")
-        列 = 行.split("\t")
-        if len(列) < 2:
-            continue
-
-        原字 = 列[0].strip()
-        對應字串 = 列[1].split("#")[0].strip()  # 去除 # 後的註解
-        候選字列表 = 對應字串.split()
-
-        if level == 1:
-            if "#" in 行:
-                continue  # 含 # 的行不處理
-            if len(候選字列表) > 1:
-                continue  # 多候選字，不處理
-
-        stVariants[原字] = 對應字串
-
-    # 讀取 mulcodechar.dt
-    for 行 in open(mulcode_file, encoding="utf-8"):
-        if not 行 or 行[0] == "#":
-            continue
-        列 = 行.strip().split("-")
-        if len(列) < 2:
-            continue
-        n2o_dict[列[0]] = 列[1]
-
-    def n2o(s):
-        return ''.join(n2o_dict.get(i, i) for i in s)
-
-    result_chars = []
-    mapping = []
-
-    for 字 in 字組:
-        原字 = 字
-        對應字串 = stVariants.get(字, None)
-
-        if 對應字串 is None and level == 2:
-            對應字串 = opencc_s2t.convert(原字)
-            # print(f"【OpenCC】{原字} → {對應字串}")  # Debug 用
+            stVariants[原字] = 對應字串
+    return stVariants
+
+
+def load_mulcode_table(mulcode_file=MULCODECHAR_PATH):
+    """讀取 mulcodechar.dt，返回 {新碼字: 舊碼字}"""
+    n2o_dict = {}
+    with open(mulcode_file, encoding="utf-8") as f:
+        for 行 in f:
+            if not 行 or 行[0] == "#":
+                continue
+            列 = 行.strip().split("-")
+            if len(列) < 2:
+                continue
+            n2o_dict[列[0]] = 列[1]
+    return n2o_dict
+
+
+class S2TConverter:
+    """
+    s2t_pro 的轉換器：正字表與 mulcodechar 只在建構時讀取一次，
+    單字結果按字緩存，同一 level 的所有調用共用。
+    """
+
+    def __init__(self, level=1, variant_file=ZHENGZI_PATH, mulcode_file=MULCODECHAR_PATH):
+        self.level = level
+        self.stVariants = load_variant_table(variant_file, level)
+        self.n2o_dict = load_mulcode_table(mulcode_file)
+        self._char_cache = {}
+
+    def n2o(self, s):
+        return ''.join(self.n2o_dict.get(i, i) for i in s)
+
+    def convert_char(self, 字):
+        """單字轉換，返回候選字列表"""
+        候選 = self._char_cache.get(字)
+        if 候選 is not None:
+            return 候選
+
+        對應字串 = self.stVariants.get(字, None)
+
+        if 對應字串 is None and self.level == 2:
+            對應字串 = simplified2traditional(字)
         elif 對應字串 is None:
-            對應字串 = 原字
+            對應字串 = 字
 
-        對應字串 = n2o(對應字串)
+        對應字串 = self.n2o(對應字串)
 
         # 保留候選字列表
         if " " in 對應字串:
             候選 = 對應字串.split()
         else:
             候選 = [對應字串]
-        mapping.append((原字, 候選))
-        result_chars.extend(候選)
+        self._char_cache[字] = 候選
+        return 候選
+
+    def convert(self, 字組):
+        """與 s2t_pro 相同：返回 (clean_str, [(原字, 候選列表), ...])"""
+        result_chars = []
+        mapping = []
+
+        for 字 in 字組:
+            候選 = list(self.convert_char(字))
+            mapping.append((字, 候選))
+            result_chars.extend(候選)
+
+        clean_str = ''.join(result_chars)
+
+        return clean_str, mapping
+
+    def convert_many(self, 字組列表):
+        """批量轉換一整列字串，返回與輸入等長的 (clean_str, mapping) 列表"""
+        return [self.convert(字組) for 字組 in 字組列表]
+
+
+_converters = {}
+
+
+def get_s2t_converter(level=1):
+    """按 level 取得模塊級緩存的轉換器，首次調用時才讀取依賴文件"""
+    converter = _converters.get(level)
+    if converter is None:
+        variant_file = os.path.join(os.path.dirname(__file__), ZHENGZI_PATH)
+        mulcode_file = os.path.join(os.path.dirname(__file__), MULCODECHAR_PATH)
+        converter = S2TConverter(level, variant_file, mulcode_file)
+        _converters[level] = converter
+    return converter
+
+
+def s2t_pro(字組, level=1):
+    return get_s2t_converter(level).convert(字組)
 
-    clean_str = ''.join(result_chars)
 
-    return clean_str, mapping
+def s2t_pro_batch(字組列表, level=1):
+    """批量版 s2t_pro：一次轉換多個字串"""
+    return get_s2t_converter(level).convert_many(字組列表)
@@ -1,4 +1,5 @@
 import json
+import os
 import re
 import sqlite3
 from pathlib import Path
@@ -6,6 +7,7 @@ from pathlib import Path
 import pandas as pd
 
 from common.config import QUERY_DB_PATH
+from common.db_pool import IN_JSON, get_read_connection, json_param
 from common.getloc_by_name_region import query_dialect_abbreviations
 
 TONE_MAPPING_PATH = Path("data/dependency/tone_value_overrides.json")
@@ -29,21 +31,131 @@ def apply_tone_value_override(shortname, raw_value, overrides):
     return raw_value
 
 
+TONE_COLUMNS = ["T1陰平", "T2陽平", "T3陰上", "T4陽上", "T5陰去", "T6陽去", "T7陰入", "T8陽入", "T9其他調", "T10輕聲"]
+TONE_MAP_TABLE = "tone_map"
+TONE_CELL_SPLIT_PATTERN = re.compile(r'[，,|;]')
+TONE_TAG_STRIP_PATTERN = re.compile(r'[-/ʔˀ]')
+# 提取所有 [tag]字 的形式，如 [1a]陰平、[7B]上陰入
+TONE_TAG_PATTERN = re.compile(r"\[([0-9]{1,2}[a-zA-Z]?)\](?:\d+)?([^\[\],\d]*)")
+
+# 進程內緩存：數據庫絕對路徑 → ((mtime_ns, 文件大小), {簡稱: {tag: 調類名}})
+_tone_maps_cache = {}
+
+
+def format_tone_cell(value, num):
+    """把 T{num} 欄的原始值整理成 [num]55陰平,[numb]… 的形式"""
+    if value is None or pd.isnull(value):
+        return ""
+    if isinstance(value, str):
+        raw_elements = TONE_CELL_SPLIT_PATTERN.split(value)
+        elements = [e.strip() for e in raw_elements if e.strip()]
+        processed_elements = []
+        need_letter = len(elements) > 1
+
+        for i, element in enumerate(elements):
+            letter = chr(97 + i) if need_letter else ""
+            if '[' not in element and ']' not in element:
+                processed_elements.append(f"[{num}{letter}]{element}")
+            else:
+                processed_elements.append(element)
+
+        return ','.join(processed_elements)
+    return value
+
+
+def build_tone_map(cells):
+    """從整理後的聲調欄取 {tag: 調類名}，同一 tag 以先出現者為準"""
+    tone_map = {}
+    for cell in cells:
+        if not cell:
+            continue
+        cell = TONE_TAG_STRIP_PATTERN.sub('', str(cell))
+        for tag, name in TONE_TAG_PATTERN.findall(cell):
+            name = name.strip()
+            if tag and name and tag not in tone_map:
+                tone_map[tag] = name
+    return tone_map
+
+
+def build_tone_map_table(conn, overrides=None):
+    """
+    由 query 庫的 dialects 表（T1–T10 欄）生成 tone_map(簡稱, tag, 調類名)，已套用 tone_value_overrides。
+    構建時做一次，寫庫階段按簡稱直接取用，不再逐個方言點調用 search_tones。
+    """
+    if overrides is None:
+        overrides = load_tone_value_overrides()
+
+    rows = conn.execute(f"SELECT 簡稱, {', '.join(TONE_COLUMNS)} FROM dialects").fetchall()
+    tone_rows = []
+    for shortname, *values in rows:
+        cells = [
+            format_tone_cell(apply_tone_value_override(shortname, value, overrides), num)
+            for num, value in enumerate(values, start=1)
+        ]
+        tone_map = build_tone_map(cells)
+        tone_rows.extend((shortname, tag, name) for tag, name in tone_map.items())
+
+    conn.execute(f"DROP TABLE IF EXISTS {TONE_MAP_TABLE}")
+    conn.execute(f"""
+        CREATE TABLE {TONE_MAP_TABLE} (
+            簡稱 TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            調類名 TEXT NOT NULL,
+            PRIMARY KEY (簡稱, tag)
+        )
+    """)
+    conn.executemany(f"INSERT INTO {TONE_MAP_TABLE} (簡稱, tag, 調類名) VALUES (?, ?, ?)", tone_rows)
+    return len(tone_rows)
+
+
+def load_tone_maps(db_path=QUERY_DB_PATH):
+    """
+    一次讀出所有方言點的調號映射：{簡稱: {tag: 調類名}}。
+    同一進程內按數據庫路徑緩存，庫文件變化後重新讀取；庫中沒有 tone_map 表時返回 None。
+    """
+    db_path = os.path.abspath(db_path)
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _tone_maps_cache.get(db_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    tone_maps = {}
+    try:
+        conn = get_read_connection(db_path)
+        for shortname, tag, name in conn.execute(f"SELECT 簡稱, tag, 調類名 FROM {TONE_MAP_TABLE}"):
+            tone_maps.setdefault(shortname, {})[tag] = name
+    except sqlite3.OperationalError:
+        return None
+
+    _tone_maps_cache[db_path] = (signature, tone_maps)
+    return tone_maps
+
+
+def tone_map_for(shortnames, tone_maps):
+    """多個簡稱時按順序合併，同一 tag 以先出現者為準（與 search_tones 的結果一致）"""
+    tone_map = {}
+    for shortname in shortnames or []:
+        for tag, name in tone_maps.get(shortname, {}).items():
+            tone_map.setdefault(tag, name)
+    return tone_map
+
+
 def search_tones(locations=None, regions=None, get_raw: bool = False, db_path=QUERY_DB_PATH, region_mode='yindian'):
     all_locations = query_dialect_abbreviations(regions, locations, db_path=db_path, region_mode=region_mode)
     if not all_locations:
         return [] if (get_raw or locations is not None or regions is not None) else []
 
-    conn = sqlite3.connect(db_path)
-
-    placeholders = ','.join(['?'] * len(all_locations))
     query = f"""
     SELECT 簡稱, T1陰平, T2陽平, T3陰上, T4陽上, T5陰去, T6陽去, T7陰入, T8陽入, T9其他調, T10輕聲
     FROM dialects
-    WHERE 簡稱 IN ({placeholders})
+    WHERE 簡稱 {IN_JSON}
     """
-    df = pd.read_sql(query, conn, params=all_locations)
-    conn.close()
+    df = pd.read_sql(query, get_read_connection(db_path), params=(json_param(all_locations),))
 
     if df.empty:
         return []
@@ -57,25 +169,6 @@ def search_tones(locations=None, regions=None, get_raw: bool = False, db_path=QU
 
     overrides = load_tone_value_overrides()
 
-    def process_cell(value, num):
-        if value is None or pd.isnull(value):
-            return ""
-        if isinstance(value, str):
-            raw_elements = re.split(r'[，,|;]', value)
-            elements = [e.strip() for e in raw_elements if e.strip()]
-            processed_elements = []
-            need_letter = len(elements) > 1
-
-            for i, element in enumerate(elements):
-                letter = chr(97 + i) if need_letter else ""
-                if '[' not in element and ']' not in element:
-                    processed_elements.append(f"[{num}{letter}]{element}")
-                else:
-                    processed_elements.append(element)
-
-            return ','.join(processed_elements)
-        return value
-
     match_table = {
         'T1': ['陰平', '平聲', '阴平', '平声'],
         'T2': ['陽平', '阳平'],
@@ -91,7 +184,7 @@ def search_tones(locations=None, regions=None, get_raw: bool = False, db_path=QU
         for col_num, col_name in enumerate(df.columns, start=1):
             raw_value = row[col_name]
             mapped_value = apply_tone_value_override(shortname, raw_value, overrides)
-            df.at[shortname, col_name] = process_cell(mapped_value, col_num)
+            df.at[shortname, col_name] = format_tone_cell(mapped_value, col_num)
 
     result = []
     new_result = []
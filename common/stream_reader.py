@@ -0,0 +1,328 @@
+import contextlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+
+import openpyxl
+from docx.oxml.parser import element_class_lookup
+from docx.table import _Cell
+from docx.text.paragraph import Paragraph
+from lxml import etree
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string, get_column_letter
+from xlrd import open_workbook
+
+try:
+    from openpyxl.worksheet._reader import WorkSheetParser
+except ImportError:
+    WorkSheetParser = None
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_BODY, W_P, W_TBL, W_TR = (f"{{{W_NS}}}{tag}" for tag in ("body", "p", "tbl", "tr"))
+
+S_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+S_SHEETS, S_SHEET_DATA, S_ROW, S_C, S_IS, S_T = (
+    f"{{{S_NS}}}{tag}" for tag in ("sheets", "sheetData", "row", "c", "is", "t")
+)
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# read_only 工作表的公開接口（iter_rows）不向解析器傳 rich_text，內聯字符串（t="inlineStr"）的富文本會丟失。
+# 已知 3.1.x 的內部解析器支持 rich_text，這些版本上直接用它解析；其他版本退回公開接口，只保留共享字符串的富文本
+_OPENPYXL_VERSION = tuple(int(part) for part in re.findall(r"\d+", openpyxl.__version__)[:2])
+INLINE_RICH_TEXT = WorkSheetParser is not None and (3, 1) <= _OPENPYXL_VERSION < (3, 2)
+
+
+# ========== xlsx ==========
+@contextlib.contextmanager
+def open_xlsx_stream(path, rich_text=False):
+    """
+    以 read_only 模式打開 .xlsx（只讀取公式的緩存值），退出時關閉文件。
+    工作表按需逐行解析，配合 iter_sheet_rows 使用（rich_text 要一併傳給 iter_sheet_rows）。
+    """
+    wb = load_workbook(path, read_only=True, data_only=True, rich_text=rich_text)
+    try:
+        yield wb
+    finally:
+        wb.close()
+
+
+def _iter_rich_rows(ws):
+    """同 iter_rows(values_only=True)，但內聯字符串也解析為富文本（僅 INLINE_RICH_TEXT 時可用）"""
+    wb = ws.parent
+    expected = 1
+    with ws._get_source() as src:
+        parser = WorkSheetParser(
+            src, ws._shared_strings, data_only=wb.data_only, epoch=wb.epoch,
+            date_formats=wb._date_formats, timedelta_formats=wb._timedelta_formats, rich_text=True,
+        )
+        for row_idx, cells in parser.parse():
+            for _ in range(expected, row_idx):
+                yield ()
+            values = [None] * (cells[-1]["column"] if cells else 0)
+            for cell in cells:
+                values[cell["column"] - 1] = cell["value"]
+            yield tuple(values)
+            expected = row_idx + 1
+
+
+def _iter_raw_rows(ws, rich_text=False):
+    """
+    逐行產出工作表的值，每行只到該行最後一個單元格，中間缺失的行為空元組。
+    不採用文件中的 dimension：不少工具寫出的 dimension 過期，按它截斷會丟列。
+    """
+    if rich_text and INLINE_RICH_TEXT:
+        yield from _iter_rich_rows(ws)
+        return
+    ws.reset_dimensions()
+    for row in ws.iter_rows(values_only=True):
+        yield tuple(row)
+
+
+def _sheet_width(ws, rich_text=False, limit=None):
+    """工作表列數，按實際解析到的單元格計算（同非 read_only 載入）；達到 limit 即停止掃描"""
+    width = 0
+    for row in _iter_raw_rows(ws, rich_text):
+        width = max(width, len(row))
+        if limit and width >= limit:
+            return limit
+    return width
+
+
+def iter_sheet_rows(ws, max_col=None, rich_text=False):
+    """
+    流式逐行產出工作表的值，內存只保留當前行。
+    先掃描一遍得到工作表寬度，每行補齊到該寬度（max_col 再截斷），中間缺失的行以全 None 補上，
+    與 load_workbook 後 iter_rows(values_only=True) 的結果一致。
+    rich_text=True 時富文本單元格返回 CellRichText（工作簿也要以 rich_text=True 打開）。
+    """
+    width = _sheet_width(ws, rich_text, limit=max_col)
+    for row in _iter_raw_rows(ws, rich_text):
+        row = row[:width]
+        yield row + (None,) * (width - len(row))
+
+
+def iter_xlsx_rows(path, sheet=0, max_col=None, rich_text=False):
+    """
+    流式讀取 .xlsx 的一個工作表（sheet 為序號、名稱，None 表示活動工作表）。
+    rich_text=True 時富文本單元格返回 CellRichText。
+    """
+    with open_xlsx_stream(path, rich_text=rich_text) as wb:
+        ws = wb.active if sheet is None else wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        yield from iter_sheet_rows(ws, max_col=max_col, rich_text=rich_text)
+
+
+def read_sheet_headers(path):
+    """
+    各工作表的表頭（第 1 行，與 pd.read_excel 的 header=0 相同），逐行解析，不載入整表。
+    表頭補齊到整個工作表的寬度。支持 .xlsx 和 .xls，返回 {工作表名: tuple}。
+    """
+    headers = {}
+    if path.lower().endswith(".xls"):
+        book = open_workbook(path, on_demand=True)
+        try:
+            for name in book.sheet_names():
+                sheet = book.sheet_by_name(name)
+                headers[name] = tuple(sheet.row_values(0)) if sheet.nrows else ()
+        finally:
+            book.release_resources()
+        return headers
+
+    with open_xlsx_stream(path) as wb:
+        for ws in wb.worksheets:
+            header = None
+            width = 0
+            for row in _iter_raw_rows(ws):
+                if header is None:
+                    header = row
+                width = max(width, len(row))
+            header = header or ()
+            headers[ws.title] = header + (None,) * (width - len(header))
+    return headers
+
+
+def _main_part(archive):
+    """_rels/.rels 中 officeDocument 關係指向的主文檔（如 word/document.xml、xl/workbook.xml）"""
+    rels = etree.fromstring(archive.read("_rels/.rels"))
+    for rel in rels:
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+
+def _xlsx_sheet_part(archive, sheet_name):
+    """工作表 sheet_name 在壓縮包中的 XML 路徑"""
+    workbook_part = _main_part(archive)
+    base = posixpath.dirname(workbook_part)
+    rels_part = posixpath.join(base, "_rels", posixpath.basename(workbook_part) + ".rels")
+    targets = {rel.get("Id"): rel.get("Target") for rel in etree.fromstring(archive.read(rels_part))}
+
+    for sheet in etree.fromstring(archive.read(workbook_part)).find(S_SHEETS):
+        if sheet.get("name") == sheet_name:
+            target = targets[sheet.get(R_ID)]
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join(base, target))
+    raise KeyError(f"工作表不存在：{sheet_name}")
+
+
+def _rename_header_cells(row, names):
+    """把第 1 行中 names（{列序號: 新表頭}）指定的單元格改為內聯字符串，保留其樣式，其餘單元格不動"""
+    cells = {}
+    column = -1
+    for cell in row.iter(S_C):
+        ref = cell.get("r")
+        # 沒有 r 屬性的單元格緊接上一格
+        column = column_index_from_string(ref.rstrip("0123456789")) - 1 if ref else column + 1
+        cells[column] = cell
+
+    for column, name in sorted(names.items()):
+        cell = cells.get(column)
+        if cell is None:
+            cell = etree.Element(S_C)
+            following = [idx for idx in cells if idx > column]
+            if following:
+                cells[min(following)].addprevious(cell)
+            else:
+                row.append(cell)
+            cells[column] = cell
+        style = cell.get("s")
+        cell.clear()
+        cell.set("r", f"{get_column_letter(column + 1)}1")
+        if style is not None:
+            cell.set("s", style)
+        cell.set("t", "inlineStr")
+        text = etree.SubElement(etree.SubElement(cell, S_IS), S_T)
+        text.text = str(name)
+        if text.text != text.text.strip():
+            text.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+
+
+def _rewrite_sheet_header(src, dst, names):
+    """
+    流式複製工作表 XML，只改第 1 行。sheetData 以外的元素原樣寫出，各行處理完即從樹上刪除。
+    """
+    def header_row():
+        row = etree.Element(S_ROW, r="1")
+        _rename_header_cells(row, names)
+        return row
+
+    with etree.xmlfile(dst, encoding="UTF-8") as xf:
+        xf.write_declaration(standalone=True)
+        context = etree.iterparse(src, events=("start", "end"), resolve_entities=False)
+        open_elements = []
+        depth = 0
+        row_idx = 0
+        header_done = False
+        for event, element in context:
+            if event == "start":
+                depth += 1
+                if depth == 1 or (depth == 2 and element.tag == S_SHEET_DATA):
+                    writer = xf.element(element.tag, dict(element.attrib), nsmap=element.nsmap if depth == 1 else None)
+                    writer.__enter__()
+                    open_elements.append(writer)
+                continue
+
+            if depth == 3 and element.tag == S_ROW:
+                row_idx = int(element.get("r", row_idx + 1))
+                if not header_done:
+                    if row_idx == 1:
+                        _rename_header_cells(element, names)
+                    else:
+                        xf.write(header_row())
+                    header_done = True
+                xf.write(element)
+                _release(element)
+            elif depth == 2 and element.tag == S_SHEET_DATA:
+                if not header_done:
+                    xf.write(header_row())
+                    header_done = True
+                open_elements.pop().__exit__(None, None, None)
+            elif depth == 2:
+                xf.write(element)
+                _release(element)
+            elif depth == 1:
+                open_elements.pop().__exit__(None, None, None)
+            depth -= 1
+
+
+def rewrite_xlsx_header(path, sheet_name, names):
+    """
+    把 sheet_name 表頭（第 1 行）中 names（{列序號（0 起）: 新表頭}）指定的單元格改寫，寫臨時文件後替換原文件。
+    只重寫該工作表的 XML（流式、只改這幾個單元格），壓縮包中其他部件（別的工作表、樣式、共享字符串等）原樣複製。
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp_path, "w") as zout:
+            sheet_part = _xlsx_sheet_part(zin, sheet_name)
+            for info in zin.infolist():
+                with zin.open(info) as src, zout.open(info, "w") as dst:
+                    if info.filename == sheet_part:
+                        _rewrite_sheet_header(src, dst, names)
+                    else:
+                        shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ========== docx ==========
+def _row_cells(tr, above):
+    """
+    與 python-docx 的 row.cells 相同：橫向合併的格重複出現同一對象，縱向合併的後續格取上一行同位置的格。
+    above 為上一行的 {網格偏移: _Cell}，返回 (本行 cells, 本行的 {網格偏移: _Cell})。
+    """
+    cells = []
+    current = {}
+    offset = tr.grid_before
+    for tc in tr.tc_lst:
+        cell = above.get(offset) if tc.vMerge == "continue" else None
+        if cell is None:
+            cell = _Cell(tc, None)
+        span = tc.grid_span
+        cells.extend([cell] * span)
+        current[offset] = cell
+        offset += span
+    return tuple(cells), current
+
+
+def _release(element):
+    """清空已處理的元素並刪掉它前面的兄弟節點，使樹上只剩當前塊"""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def iter_docx_blocks(path):
+    """
+    按正文順序流式產出 .docx 的段落和表格行（lxml iterparse），處理完即從樹上刪除，
+    內存只保留當前段落 / 表格行。
+
+    產出：
+        Paragraph：正文中的段落
+        tuple[_Cell, ...]：正文表格的一行（同 row.cells）
+    表格單元格內的段落、嵌套表格不單獨產出。
+    """
+    with zipfile.ZipFile(path) as archive, archive.open(_main_part(archive)) as src:
+        context = etree.iterparse(src, events=("end",), tag=(W_P, W_TR, W_TBL),
+                                  remove_blank_text=True, resolve_entities=False)
+        context.set_element_class_lookup(element_class_lookup)
+
+        above = {}
+        for _, element in context:
+            parent = element.getparent()
+            if element.tag == W_P and parent.tag == W_BODY:
+                yield Paragraph(element, None)
+                _release(element)
+            elif element.tag == W_TR and parent.getparent().tag == W_BODY:
+                cells, above = _row_cells(element, above)
+                yield cells
+                _release(element)
+            elif element.tag == W_TBL and parent.tag == W_BODY:
+                above = {}
+                _release(element)
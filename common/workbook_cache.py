@@ -0,0 +1,104 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+from common.config import WORKBOOK_CACHE_DIR
+
+# 進程內緩存：(絕對路徑, 工作表, 讀取參數) → ((mtime_ns, 文件大小), DataFrame)
+_MEMORY_CACHE = {}
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _variant_key(sheet_name, read_kwargs):
+    """同一文件以不同參數讀取（dtype / keep_default_na …）得到的結果不同，分開緩存"""
+    text = repr((sheet_name, sorted(read_kwargs.items(), key=lambda item: item[0]), pd.__version__))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _load_snapshot(snapshot_path):
+    try:
+        with open(snapshot_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _save_snapshot(snapshot_path, df):
+    """寫入快照並刪除同一文件同一讀法的舊快照；緩存目錄不可寫時靜默跳過"""
+    cache_dir = os.path.dirname(snapshot_path)
+    prefix = os.path.basename(snapshot_path).rsplit("-", 1)[0] + "-"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{snapshot_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".pkl") and os.path.join(cache_dir, name) != snapshot_path:
+                os.remove(os.path.join(cache_dir, name))
+    except OSError:
+        pass
+
+
+def read_excel_cached(path, sheet_name=0, persist=True, **read_kwargs):
+    """
+    帶緩存的 pd.read_excel（單個工作表）。
+
+    - 同一進程內：文件 mtime / 大小不變時直接返回已解析的結果
+    - 跨進程 / 跨運行：按文件內容哈希在 WORKBOOK_CACHE_DIR 存 pickle 快照，
+      文件內容變化後自動失效
+    每次返回副本，調用方可以隨意修改列名、刪行。
+
+    Args:
+        path: Excel 文件路徑
+        sheet_name: 工作表名或序號（與 pd.read_excel 相同，但不支持 None）
+        persist: 是否讀寫磁盤快照
+        **read_kwargs: 其餘 pd.read_excel 參數，參與緩存鍵
+    """
+    if sheet_name is None:
+        raise ValueError("read_excel_cached 只支持讀取單個工作表")
+
+    path = os.path.abspath(path)
+    variant = _variant_key(sheet_name, read_kwargs)
+    memory_key = (path, variant)
+    signature = _file_signature(path)
+
+    cached = _MEMORY_CACHE.get(memory_key)
+    if cached is not None and cached[0] == signature:
+        return cached[1].copy()
+
+    snapshot_path = None
+    df = None
+    if persist and WORKBOOK_CACHE_DIR:
+        snapshot_name = f"{Path(path).stem}-{variant}-{_content_hash(path)}.pkl"
+        snapshot_path = os.path.join(WORKBOOK_CACHE_DIR, snapshot_name)
+        if os.path.exists(snapshot_path):
+            df = _load_snapshot(snapshot_path)
+
+    if not isinstance(df, pd.DataFrame):
+        df = pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+        if snapshot_path:
+            _save_snapshot(snapshot_path, df)
+
+    _MEMORY_CACHE[memory_key] = (signature, df)
+    return df.copy()
+
+
+def clear_workbook_cache():
+    """清空進程內緩存（磁盤快照不受影響）"""
+    _MEMORY_CACHE.clear()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+方言庫構建基準測試（離線，使用合成語料）
+
+對每個規模：生成 N 個合成方言點 → 依次跑 full / incremental / update / append，
+記錄 write_to_sql 各步驟耗時、總行數和庫文件大小，輸出 JSON（每條一行）。
+
+所有路徑常量在運行期間被重定向到臨時目錄，不會觸碰倉庫 data/ 下的真實數據庫。
+重定向只改本進程已載入的模塊，--jobs > 1 時解析子進程必須以 fork 啟動才能繼承；
+不支持 fork 的平台（Windows）拒絕 --jobs > 1。
+
+使用方法：
+    python scripts/bench/build_benchmark.py
+    python scripts/bench/build_benchmark.py --sizes 10 100 2000 --jobs 4 --output bench.jsonl
+    python scripts/bench/build_benchmark.py --sizes 10 --modes full incremental --keep
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.bench.synthetic_corpus import generate_corpus, mutate_dialects, write_metadata_workbooks
+
+ALL_MODES = ("full", "incremental", "update", "append")
+# update / append / incremental 模式改寫的方言點比例
+CHANGE_RATIO = 0.1
+
+
+def _path_overrides(root):
+    """與 common/config.py 同名的路徑常量 → 臨時目錄下的對應路徑"""
+    data_dir = os.path.join(root, "data")
+    return {
+        "BASE_DIR": root,
+        "YINDIAN_DATA_DIR": os.path.join(data_dir, "yindian"),
+        "PROCESSED_DATA_DIR": os.path.join(data_dir, "processed"),
+        "UPDATE_DATA_DIR": os.path.join(data_dir, "raw", "pull_yindian"),
+        "HAN_PATH": os.path.join(data_dir, "dependency", "漢字音典字表檔案（長期更新）.xlsx"),
+        "APPEND_PATH": os.path.join(data_dir, "dependency", "jengzang補充.xlsx"),
+        "QUERY_DB_PATH": os.path.join(data_dir, "query_admin.db"),
+        "QUERY_DB_ADMIN_PATH": os.path.join(data_dir, "query_admin.db"),
+        "QUERY_DB_USER_PATH": os.path.join(data_dir, "query_user.db"),
+        "DIALECTS_DB_PATH": os.path.join(data_dir, "dialects_admin.db"),
+        "DIALECTS_DB_ADMIN_PATH": os.path.join(data_dir, "dialects_admin.db"),
+        "DIALECTS_DB_USER_PATH": os.path.join(data_dir, "dialects_user.db"),
+        "CHARACTERS_DB_PATH": os.path.join(data_dir, "characters.db"),
+        "SYLLABLE_CACHE_PATH": os.path.join(data_dir, "cache", "syllable_cache.pkl"),
+        "WORKBOOK_CACHE_DIR": os.path.join(data_dir, "cache", "workbooks"),
+        "MISSING_DATA_LOG": os.path.join(root, "logs", "缺資料.txt"),
+        "WRITE_INFO_LOG": os.path.join(root, "logs", "write.txt"),
+        "WRITE_ERROR_LOG": os.path.join(root, "logs", "write_error.txt"),
+    }
+
+
+@contextlib.contextmanager
+def redirected_paths(root):
+    """
+    把已載入的 common.* / source.* 模塊中的路徑常量指向 root。
+    各模塊以 from common.config import ... 綁定常量，只改 config 不夠，需逐個模塊替換。
+    只對本進程（及其後 fork 出的子進程）有效，見 _require_fork_workers。
+    """
+    import source.tsv2sql  # noqa: F401  確保寫庫鏈路上的模塊都已載入
+
+    overrides = _path_overrides(str(root))
+    with contextlib.ExitStack() as stack:
+        for name, module in list(sys.modules.items()):
+            if module is None or not name.startswith(("common.", "source.")):
+                continue
+            for attr, value in overrides.items():
+                if attr in vars(module):
+                    stack.enter_context(mock.patch.object(module, attr, value))
+        yield overrides
+
+
+def _db_stats(db_path):
+    if not os.path.exists(db_path):
+        return 0, 0
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM dialects").fetchone()[0]
+    return rows, os.path.getsize(db_path)
+
+
+def _prepare_mode(mode, root, names, seed):
+    """在跑 mode 之前準備輸入（改寫部分方言點 / 複製到 pull_yindian / 標記待更新）"""
+    yindian_dir = Path(root) / "data" / "yindian"
+    changed = names[:max(1, int(len(names) * CHANGE_RATIO))]
+    changed_paths = [yindian_dir / f"{name}.tsv" for name in changed]
+
+    if mode == "incremental":
+        mutate_dialects(changed_paths, seed=seed)
+    elif mode == "update":
+        update_dir = Path(root) / "data" / "raw" / "pull_yindian"
+        if update_dir.exists():
+            shutil.rmtree(update_dir)
+        update_dir.mkdir(parents=True)
+        mutate_dialects(changed_paths, seed=seed + 1)
+        for path in changed_paths:
+            shutil.copy2(path, update_dir / path.name)
+    elif mode == "append":
+        mutate_dialects(changed_paths, seed=seed + 2)
+        write_metadata_workbooks(Path(root) / "data" / "dependency", names, changed)
+    return len(changed)
+
+
+def run_mode(mode, root, names, jobs, seed, log_file, syllable_cache=False):
+    from source.tsv2sql import write_to_sql
+
+    changed = len(names) if mode == "full" else _prepare_mode(mode, root, names, seed)
+    with redirected_paths(root) as paths, contextlib.redirect_stdout(log_file):
+        start = time.perf_counter()
+        steps = write_to_sql(
+            write_chars_db=False,
+            append=mode == "append",
+            update=mode == "update",
+            incremental=mode == "incremental",
+            mode="admin",
+            jobs=jobs,
+            syllable_cache=syllable_cache,
+        )
+        total = time.perf_counter() - start
+        rows, db_size = _db_stats(paths["DIALECTS_DB_ADMIN_PATH"])
+
+    return {
+        "dialects": len(names),
+        "changed": changed,
+        "mode": mode,
+        "jobs": jobs,
+        "steps": {name: round(seconds, 4) for name, seconds in steps.items()},
+        "total_seconds": round(total, 4),
+        "rows": rows,
+        "db_size": db_size,
+    }
+
+
+def run_size(size, modes, jobs, chars, seed, work_dir, keep=False, syllable_cache=False):
+    root = Path(work_dir) / f"dialects_{size}"
+    if root.exists():
+        shutil.rmtree(root)
+    print(f"\n⏳ 生成 {size} 個合成方言點（每點 {chars} 字）：{root}")
+    start = time.perf_counter()
+    names = generate_corpus(root, dialects=size, chars=chars, seed=seed)
+    print(f"   生成耗時 {time.perf_counter() - start:.2f}秒")
+
+    results = []
+    log_path = root / "logs" / "benchmark.log"
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        # 非 full 模式都基於已有的方言庫，先做一次全量構建
+        if modes and modes[0] != "full":
+            run_mode("full", root, names, jobs, seed, log_file, syllable_cache)
+        for mode in modes:
+            result = run_mode(mode, root, names, jobs, seed, log_file, syllable_cache)
+            print(f"   {mode:<12} {result['total_seconds']:>9.2f}秒  {result['rows']} 行  "
+                  f"{result['db_size'] / 1024 / 1024:.1f}MB")
+            results.append(result)
+
+    if not keep:
+        shutil.rmtree(root, ignore_errors=True)
+    else:
+        print(f"   日誌：{log_path}")
+    return results
+
+
+def _require_fork_workers(parser, jobs):
+    """
+    spawn / forkserver 啟動的子進程會重新導入 common.config，讀寫倉庫 data/ 下的真實路徑。
+    多進程時改用 fork（Linux 從 Python 3.14 起默認不是 fork），平台不支持 fork 則報錯退出。
+    """
+    if jobs <= 1:
+        return
+    if "fork" not in multiprocessing.get_all_start_methods():
+        parser.error("--jobs > 1 需要 fork 啟動子進程（本平台不支持），否則子進程不會沿用臨時目錄的路徑")
+    multiprocessing.set_start_method("fork", force=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="方言庫構建基準測試（合成語料，離線）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 2000], help="方言點數（可多個）")
+    parser.add_argument("--modes", nargs="+", choices=ALL_MODES, default=list(ALL_MODES), help="要測試的構建模式")
+    parser.add_argument("--jobs", type=int, default=1, help="write_to_sql 的解析進程數")
+    parser.add_argument("--chars", type=int, default=3000, help="每個方言點的字數")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    parser.add_argument("--syllable-cache", action="store_true", help="啟用音節緩存持久化")
+    parser.add_argument("--work-dir", help="語料和數據庫的存放目錄（默認臨時目錄）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的語料、數據庫和日誌")
+    parser.add_argument("--output", help="結果輸出文件（JSON Lines），默認只打印到終端")
+    args = parser.parse_args()
+    _require_fork_workers(parser, args.jobs)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dialect_bench_")
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.modes, args.jobs, args.chars, args.seed, work_dir,
+                                keep=args.keep, syllable_cache=args.syllable_cache))
+
+    lines = [json.dumps(result, ensure_ascii=False) for result in results]
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n", encoding="utf-8")
+        print(f"\n✅ 結果已寫入 {args.output}")
+    else:
+        print()
+        print("\n".join(lines))
+
+    if not args.work_dir and not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成用於構建基準測試的合成語料（不需要網絡、不依賴真實音典數據）
+
+生成內容（均位於 root 之下，目錄結構與 BASE_DIR 一致）：
+    data/yindian/*.tsv                                  N 個音典格式字表（#漢字 / 音標 / 解釋）
+    data/processed/                                     空目錄
+    data/dependency/漢字音典字表檔案（長期更新）.xlsx    「檔案」表，含聲調欄
+    data/dependency/jengzang補充.xlsx                   「檔案」表，含 待更新 / isUser 欄
+
+使用方法：
+    python scripts/bench/synthetic_corpus.py out_dir --dialects 100
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+
+from common.constants import DIALECT_BASE_REQUIRED_COLUMNS, DIALECT_METADATA_RENAME_MAP, DIALECT_TONE_COLUMN_MAP
+
+HAN_FILENAME = "漢字音典字表檔案（長期更新）.xlsx"
+APPEND_FILENAME = "jengzang補充.xlsx"
+
+INITIALS = ["p", "pʰ", "m", "f", "t", "tʰ", "n", "l", "ts", "tsʰ", "s", "k", "kʰ", "ŋ", "h", "j", "w", "∅"]
+FINALS = ["a", "ɐi", "ɐu", "ɔ", "ɔŋ", "ɐm", "ɐn", "ɐŋ", "ɛ", "ɛŋ", "i", "iu", "in", "u", "ui", "un", "uŋ", "y", "yn", "ɪŋ"]
+CHECKED_FINALS = ["ɐp", "ɐt", "ɐk", "ap", "at", "ak", "ɔk", "ɪk", "ʊk", "it"]
+TONE_VALUES = {
+    "[1]陰平": "55陰平", "[2]陽平": "21陽平", "[3]陰上": "35陰上", "[4]陽上": "13陽上",
+    "[5]陰去": "33陰去", "[6]陽去": "22陽去", "[7]陰入": "5陰入", "[8]陽入": "2陽入",
+    "[9]變調": "", "[0]輕聲": "",
+}
+NOTES = ["", "", "", "", "～子", "姓", "文讀", "白讀", "～頭"]
+
+
+def dialect_name(index):
+    return f"合成點{index:04d}"
+
+
+def _base_readings(chars, rng):
+    """所有方言點共享的「祖語」讀音，各點在此基礎上變異，使音節在點間大量重複"""
+    readings = {}
+    for char in chars:
+        if rng.random() < 0.15:
+            readings[char] = (rng.choice(INITIALS), rng.choice(CHECKED_FINALS), rng.choice("78"))
+        else:
+            readings[char] = (rng.choice(INITIALS), rng.choice(FINALS), rng.choice("123456"))
+    return readings
+
+
+def _syllable(initial, final, tone):
+    return f"{'' if initial == '∅' else initial}{final}{tone}"
+
+
+def write_dialect_tsv(path, chars, base, rng, polyphone_rate=0.08):
+    lines = ["#漢字\t音標\t解釋"]
+    for char in chars:
+        initial, final, tone = base[char]
+        if rng.random() < 0.2:
+            initial = rng.choice(INITIALS)
+        if rng.random() < 0.1 and tone not in "78":
+            final = rng.choice(FINALS)
+        syllable = _syllable(initial, final, tone)
+        lines.append(f"{char}\t{syllable}\t{rng.choice(NOTES)}")
+
+        if rng.random() < polyphone_rate:
+            # 文白異讀 / 多音
+            other = _syllable(rng.choice(INITIALS), rng.choice(FINALS), rng.choice("123456"))
+            marks = rng.choice([("=", "-"), ("", ""), ("", "")])
+            lines[-1] = f"{char}\t{syllable}{marks[0]}\t{rng.choice(NOTES)}"
+            lines.append(f"{char}\t{other}{marks[1]}\t{rng.choice(NOTES)}")
+        if rng.random() < 0.02:
+            # 重複行，測試註釋合併
+            lines.append(f"{char}\t{syllable}\t{rng.choice(NOTES)}")
+
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _metadata_row(index, name):
+    row = {column: "" for column in DIALECT_METADATA_RENAME_MAP}
+    row.update(TONE_VALUES)
+    row.update({
+        "語言": name,
+        "簡稱": name,
+        "音典排序": index,
+        "地圖集二分區": "粵語-廣府片" if index % 2 else "客家話-粵台片",
+        "音典分區": "粵-廣府" if index % 2 else "客-粵台",
+        "字表來源（母本）": "合成",
+        "方言島": "",
+        "經緯度": f"{113 + index % 100 / 100:.4f},{23 + index % 50 / 100:.4f}",
+        "地圖級別": "1",
+        "省/自治區/直轄市": "廣東",
+    })
+    return row
+
+
+def write_metadata_workbooks(dependency_dir, names, append_names=()):
+    columns = list(DIALECT_TONE_COLUMN_MAP) + [
+        column for column in DIALECT_METADATA_RENAME_MAP if column not in DIALECT_TONE_COLUMN_MAP
+    ] + DIALECT_BASE_REQUIRED_COLUMNS
+
+    han_rows = [_metadata_row(idx, name) for idx, name in enumerate(names, 1)]
+    # HAN_PATH 的第 2 行是說明行，讀取時會被丟棄
+    han_df = pd.DataFrame([{column: "說明" for column in columns}] + han_rows, columns=columns)
+    han_df.to_excel(Path(dependency_dir) / HAN_FILENAME, sheet_name="檔案", index=False)
+
+    append_rows = []
+    for name in append_names:
+        row = _metadata_row(names.index(name) + 1, name)
+        row["待更新"] = 1
+        row["isUser"] = 1
+        append_rows.append(row)
+    append_df = pd.DataFrame(append_rows, columns=columns + ["待更新", "isUser"])
+    append_df.to_excel(Path(dependency_dir) / APPEND_FILENAME, sheet_name="檔案", index=False)
+
+
+def generate_corpus(root, dialects=10, chars=3000, seed=0, append_dialects=0):
+    """
+    在 root 下生成合成語料。
+
+    Returns:
+        list: 方言點簡稱列表
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    yindian_dir = root / "data" / "yindian"
+    dependency_dir = root / "data" / "dependency"
+    for directory in (yindian_dir, root / "data" / "processed", dependency_dir, root / "logs"):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    char_pool = [chr(0x4E00 + i) for i in rng.sample(range(0x5000), chars)]
+    base = _base_readings(char_pool, rng)
+    names = [dialect_name(idx) for idx in range(1, dialects + 1)]
+    for name in names:
+        write_dialect_tsv(yindian_dir / f"{name}.tsv", char_pool, base, rng)
+
+    write_metadata_workbooks(dependency_dir, names, names[:append_dialects])
+    return names
+
+
+def mutate_dialects(tsv_paths, seed=1, rate=0.05):
+    """改寫部分字表中的少量讀音（模擬日常拉取帶來的變化）"""
+    rng = random.Random(seed)
+    for path in tsv_paths:
+        path = Path(path)
+        lines = path.read_text(encoding="utf-8").splitlines()
+        for idx in range(1, len(lines)):
+            if rng.random() < rate:
+                char, _, note = lines[idx].split("\t")
+                lines[idx] = f"{char}\t{_syllable(rng.choice(INITIALS), rng.choice(FINALS), rng.choice('123456'))}\t{note}"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成構建基準測試用的合成語料")
+    parser.add_argument("root", help="輸出目錄")
+    parser.add_argument("--dialects", type=int, default=10, help="方言點數")
+    parser.add_argument("--chars", type=int, default=3000, help="每個方言點的字數")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    args = parser.parse_args()
+
+    names = generate_corpus(args.root, args.dialects, args.chars, args.seed)
+    print(f"已生成 {len(names)} 個方言點：{args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -92,6 +92,7 @@ from tkinter import filedialog
 import pandas as pd
 
 from common.constants import col_map, custom_order
+from common.stream_reader import read_sheet_headers
 from source.format_convert import process_縣志_word, process_跳跳老鼠, process_縣志_excel
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # 添加项目根目录到 sys.path
@@ -759,13 +760,12 @@ def check_pro(mode='only'):
 
             elif ext in (".xlsx", ".xls"):
                 try:
-                    df = pd.read_excel(path, dtype=str)
+                    # 只需判斷欄位名，讀第一個工作表的表頭即可
+                    df_cols = [str(value) for value in next(iter(read_sheet_headers(path).values()), ())]
                 except Exception as e:
                     print(f"[❌] 無法讀取：{path}\n原因：{e}")
                     continue
 
-                df_cols = df.columns.tolist()
-
                 mapped_cols = {}
                 for std_col, variants in col_map.items():
                     for v in variants:
@@ -5,12 +5,12 @@ import tkinter as tk
 from tkinter import filedialog
 
 from common.config import CHARACTERS_DB_PATH
+from common.characters_index import load_characters_index
 from source.get_new import extract_all_from_files  # 绝对导入
 from scripts.check.status_arrange_pho import run_status
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # 添加项目根目录到 sys.path
 
-import sqlite3
 import pandas as pd
 
 
@@ -19,26 +19,24 @@ def check_get_chars(df, feature, user_input=None):
     if not user_input:
         # print("ℹ️ inputs 為空，自動推導條件字串...")
         db_path_char = CHARACTERS_DB_PATH
-        conn = sqlite3.connect(db_path_char)
-        df_char = pd.read_sql_query("SELECT * FROM characters", conn)
-        conn.close()
+        char_index = load_characters_index(db_path_char)
 
         auto_inputs = []
         auto_features = []
 
         if feature == "声母":
-            unique_vals = sorted(df_char["母"].dropna().unique())
+            unique_vals = char_index.values("母")
             auto_inputs.extend([f"{v}母" for v in unique_vals])
             # auto_features.extend(["声母"] * len(unique_vals))
 
         elif feature == "韵母":
-            unique_vals = sorted(df_char["攝"].dropna().unique())
+            unique_vals = char_index.values("攝")
             auto_inputs.extend([f"{v}攝" for v in unique_vals])
             # auto_features.extend(["韵母"] * len(unique_vals))
 
         elif feature == "声调":
-            clean_vals = sorted(df_char["清濁"].dropna().unique())
-            tone_vals = sorted(df_char["調"].dropna().unique())
+            clean_vals = char_index.values("清濁")
+            tone_vals = char_index.values("調")
             for cv in clean_vals:
                 for tv in tone_vals:
                     auto_inputs.append(f"{cv}{tv}")
@@ -1,9 +1,10 @@
 import re
-import sqlite3
 
 import pandas as pd
 
 from common.config import CHARACTERS_DB_PATH, DIALECTS_DB_PATH
+from common.characters_index import load_characters_index
+from common.db_pool import IN_JSON, get_read_connection, json_param
 from common.constants import HIERARCHY_COLUMNS, AMBIG_VALUES
 from scripts.check.process_sp_input import auto_convert_batch
 from common.getloc_by_name_region import query_dialect_abbreviations
@@ -21,6 +22,7 @@ from scripts.check.match_input_tip import match_locations_batch
 
 3. query_by_status：
    ➤ 根據查得漢字，在指定地點與語音特徵下計算統計資訊與多音字詳情。
+   ➤ query_by_status_batch 為批量版，sta2pho 的全部條件只查詢一次 dialects 庫。
 
 4. run_feature_analysis：
    ➤ 整合 run_status 與 query_by_status，批次處理多組輸入與地點，進行完整分析流程。
@@ -39,7 +41,10 @@ def query_characters_by_path(path_string, db_path=CHARACTERS_DB_PATH, table="cha
 
     回傳：
     - 符合條件的漢字清單
-    - 多地位的漢字清單
+    - 多地位的漢字清單：標了「多地位標記」，且在全表中於條件涉及的欄位上不止一個值的字
+
+    ⚠️ 行為變化：舊版在已按條件篩過的行上判斷多地位（各行的條件欄位必然相同），多地位清單恆為空；
+    現在按全表判斷，同樣的輸入會得到非空的多地位清單，run_status / sta2pho 的「多地位字」也隨之有值。
     """
 
     # print(f"\n📥 查詢語法輸入：{path_string}")
@@ -60,130 +65,48 @@ def query_characters_by_path(path_string, db_path=CHARACTERS_DB_PATH, table="cha
             print(f"⚠️ 欄位「{col}」不在允許的層級欄位中")
             return [], []
 
-    # 讀取資料
-    conn = sqlite3.connect(db_path)
-    # df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-    # 動態組裝 WHERE 子句（根據 matches）
-    where_clause = " AND ".join([f"{col} = ?" for _, col in matches])
-    values = [val for val, _ in matches]
-
-    query = f"SELECT * FROM {table} WHERE {where_clause}"
-    df = pd.read_sql_query(query, conn, params=values)
-
-    conn.close()
-
-    # 執行篩選
-    filtered_df = df.copy()
-    for value, column in matches:
-        before = len(filtered_df)
-        filtered_df = filtered_df[filtered_df[column] == value]
-        after = len(filtered_df)
-        print(f"🔽 篩選 {column} = {value}：剩下 {after} 筆（原本 {before} 筆）")
-        if after == 0:
-            # raise HTTPException(status_code=404, detail="❌ 輸入的中古地位不存在")
-            return [], []
-
-    # 提取漢字
-    if "漢字" not in filtered_df.columns:
-        print("❌ 缺少「漢字」欄")
+    # 讀取資料：characters 表的內存索引（按庫文件緩存），各條件的位圖求交
+    index = load_characters_index(db_path, table)
+    characters, multi_chars = index.query(matches)
+    if not characters:
+        # raise HTTPException(status_code=404, detail="❌ 輸入的中古地位不存在")
         return [], []
-
-    characters = filtered_df["漢字"].dropna().tolist()
     # print(f"\n🎯 符合條件的漢字共 {len(characters)} 個")
 
-    # 多地位過濾（優化判斷）
-    multi_chars = []
-    if "多地位標記" in filtered_df.columns:
-        candidates = filtered_df[
-            filtered_df["多地位標記"] == "1"
-            ]["漢字"].dropna().unique().tolist()
-
-        # print(f"🟡 初步多地位標記候選：{len(candidates)} 字")
-
-        for word in candidates:
-            all_rows = df[df["漢字"] == word]
-            sub = all_rows[filter_columns].drop_duplicates()
-            if len(sub) > 1:
-                multi_chars.append(word)
-
-        # print(f"🟠 經過比對後確定有多地位的漢字：{len(multi_chars)} 字")
-    else:
+    # 多地位：標了多地位，且全表中在這些欄位上不止一個地位的字（構建索引時已預先算好）
+    if not index.has_multi_flag:
         print("⚠️ 無「多地位標記」欄")
 
     return characters, multi_chars
 
 
-def query_by_status(char_list, locations, features, user_input, db_path=DIALECTS_DB_PATH, table="dialects"):
+def _fetch_status_rows(locations, char_list, features, db_path=DIALECTS_DB_PATH, table="dialects"):
     """
-    📌 根據提供的漢字名單，查詢其在不同地點與語音特徵（如聲母/韻母）下的分佈情況。
-
-    功能包含：
-    - 從 dialects.db 中找出指定地點與漢字的資料
-    - 計算每種語音特徵值（如 b, p, m...）的字數、比例（去重後）
-    - 處理「多音字」的詳細音節資訊（保留所有對應的發音）
-    - 輸出欄位包含：分組值（特徵=值）
-
-    回傳：
-    - 每筆統計結果以字典方式輸出，最終轉為 DataFrame
-    """
-    # print(f"📦 連接資料庫：{db_path}")
-    conn = sqlite3.connect(db_path)
-
-    # 1. 只選擇需要的欄位並添加過濾條件，減少資料庫加載量
-    query = f"""
-    SELECT 簡稱, 漢字, {', '.join(features)}, 多音字, 音節
-    FROM {table}
-    WHERE 簡稱 IN ({','.join(f"'{loc}'" for loc in locations)}) 
-    AND 漢字 IN ({','.join(f"'{char}'" for char in char_list)})
+    一次取出 locations × char_list 的全部讀音行（按 rowid 順序）。
+    地點與漢字經 json_each 綁定為參數，不拼接 SQL 字符串，也不受 IN 列表長度限制。
+    不在 SQL 中 ORDER BY rowid：那樣查詢規劃器會放棄 (漢字, 簡稱) 索引改為整表掃描，取回後再排序。
     """
-    try:
-        df = pd.read_sql_query(query, conn)
-        print(f"✅ 查詢結果：載入 {len(df)} 條資料")
-    except Exception as e:
-        print(f"❌ 查詢失敗：{e}")
-    conn.close()
-
-    # 2. 為每個地點分別查詢多音字資料，並構建多音字字典
-    poly_dicts = {}  # 存儲每個地點的多音字字典
-    for loc in locations:
-        # 針對每個地點進行查詢
-        # print(f"🔍 查詢地點：{loc}")
-        conn = sqlite3.connect(db_path)
-        try:
-            # 查詢該地點的多音字資料
-            query = f"""
-            SELECT 漢字, 音節 
-            FROM {table} 
-            WHERE 多音字 = '1' 
-            AND 簡稱 = '{loc}' 
-            AND 漢字 IN ({','.join(f"'{char}'" for char in char_list)})
-            """
-            poly_data = pd.read_sql_query(query, conn)
-            # print(f"✅ 地點 {loc} 的多音字資料載入完成，共 {len(poly_data)} 條")
-        except Exception as e:
-            print(f"❌ 查詢地點 {loc} 的多音字資料失敗：{e}")
-        conn.close()
-
-        # 構建該地點的多音字字典
-        poly_dict = poly_data.groupby("漢字")["音節"].apply(lambda x: '|'.join(x)).to_dict()
-        poly_dicts[loc] = poly_dict
-        print(f"✅ 地點 {loc} 的多音字字典建構完成，共 {len(poly_dict)} 條")
-
-    # 3. 開始處理資料
+    conn = get_read_connection(db_path)
+    rows = conn.execute(f"""
+        SELECT rowid, 簡稱, 漢字, 多音字, 音節, {', '.join(features)}
+        FROM {table}
+        WHERE 簡稱 {IN_JSON}
+        AND 漢字 {IN_JSON}
+    """, (json_param(dict.fromkeys(locations)), json_param(dict.fromkeys(char_list)))).fetchall()
+    rows.sort(key=lambda row: row[0])
+    return [row[1:] for row in rows]
+
+
+def _status_distribution(char_list, features, user_input, locations, loc_char_rows, poly_syllables, feature_pos):
+    """單個條件在各地點的特徵分布，欄位與 query_by_status 的結果相同"""
+    ordered_chars = list(dict.fromkeys(char_list))
     results = []
 
-    # print("🔍 開始處理地點和特徵...")
-
     for loc in locations:
-        # print(f"\n🔍 處理地點：{loc}")
-        loc_df = df[df["簡稱"] == loc]
-        # print(f"   - 該地資料筆數：{len(loc_df)}")
-
-        loc_chars_df = loc_df[loc_df["漢字"].isin(char_list)]
-        # print(f"   - 匹配輸入漢字筆數：{len(loc_chars_df)} / {len(char_list)}")
+        char_rows = loc_char_rows.get(loc, {})
+        loc_chars = [hz for hz in ordered_chars if hz in char_rows]
 
-        if loc_chars_df.empty:
-            print("   ⚠️ 無符合漢字，略過此地點")
+        if not loc_chars:
             results.append({
                 "地點": loc,
                 "特徵類別": "無",
@@ -196,26 +119,25 @@ def query_by_status(char_list, locations, features, user_input, db_path=DIALECTS
             })
             continue
 
-        total_chars = len(loc_chars_df["漢字"].unique())
-        # print(f"   - 總共字數：{total_chars}")
+        total_chars = len(loc_chars)
 
         for feature in features:
-            # print(f"   🔎 處理特徵：{feature}")
-            feature_groups = loc_chars_df.groupby(feature)
-
-            for fval, sub_df in feature_groups:
-                all_chars = sub_df["漢字"].tolist()
-                unique_chars = list(set(all_chars))
+            pos = feature_pos[feature]
+            # 特徵值 → 去重後的漢字（保持輸入順序）；空值不成組，與 pandas groupby 相同
+            feature_groups = {}
+            for hz in loc_chars:
+                for values in char_rows[hz]:
+                    if values[pos] is not None:
+                        feature_groups.setdefault(values[pos], {})[hz] = None
+
+            for fval in sorted(feature_groups):
+                unique_chars = list(feature_groups[fval])
                 count = len(unique_chars)
 
-                # print(f"     ▶︎ {feature} = {fval}，字數：{count}，字例：{unique_chars[:5]}...")
-
-                poly_details = []
-                # 使用該地點的多音字字典
-                poly_dict = poly_dicts.get(loc, {})
-                for hz in unique_chars:
-                    if hz in poly_dict:
-                        poly_details.append(f"{hz}:{poly_dict[hz]}")
+                poly_details = [
+                    f"{hz}:{'|'.join(poly_syllables[(loc, hz)])}"
+                    for hz in unique_chars if (loc, hz) in poly_syllables
+                ]
 
                 results.append({
                     "地點": loc,
@@ -228,12 +150,61 @@ def query_by_status(char_list, locations, features, user_input, db_path=DIALECTS
                     "多音字詳情": "; ".join(poly_details) if poly_details else ""
                 })
 
-    # print("\n✅ 分析完成！")
-
-    # 返回結果
     return pd.DataFrame(results)
 
 
+def query_by_status_batch(jobs, locations, db_path=DIALECTS_DB_PATH, table="dialects"):
+    """
+    📌 批量版 query_by_status：多組條件共用一次查詢。
+
+    jobs 為 [(漢字清單, 特徵欄位清單, 分組名稱), ...]。
+    所有條件涉及的漢字與地點只從 dialects 庫讀一次，
+    再在內存中按 (地點, 漢字) 分組，逐個條件算出各特徵值的字數、佔比、對應字與多音字詳情。
+
+    回傳：
+    - 與 jobs 一一對應的 DataFrame 清單，每個與 query_by_status(*job) 的結果相同
+    """
+    if not jobs:
+        return []
+
+    features = list(dict.fromkeys(feature for _, job_features, _ in jobs for feature in job_features))
+    feature_pos = {feature: i for i, feature in enumerate(features)}
+    all_chars = {char for char_list, _, _ in jobs for char in char_list}
+
+    rows = _fetch_status_rows(locations, all_chars, features, db_path=db_path, table=table)
+    print(f"✅ 查詢結果：載入 {len(rows)} 條資料（{len(jobs)} 組條件 × {len(locations)} 個地點）")
+
+    # 地點 → 漢字 → 各讀音的特徵值；(地點, 漢字) → 多音字的全部音節（按 rowid 順序）
+    loc_char_rows = {}
+    poly_syllables = {}
+    for loc, hz, polyphonic, syllable, *values in rows:
+        loc_char_rows.setdefault(loc, {}).setdefault(hz, []).append(values)
+        if polyphonic == '1':
+            poly_syllables.setdefault((loc, hz), []).append(syllable)
+
+    return [
+        _status_distribution(char_list, job_features, user_input, locations, loc_char_rows, poly_syllables,
+                             feature_pos)
+        for char_list, job_features, user_input in jobs
+    ]
+
+
+def query_by_status(char_list, locations, features, user_input, db_path=DIALECTS_DB_PATH, table="dialects"):
+    """
+    📌 根據提供的漢字名單，查詢其在不同地點與語音特徵（如聲母/韻母）下的分佈情況。
+
+    功能包含：
+    - 從 dialects.db 中找出指定地點與漢字的資料
+    - 計算每種語音特徵值（如 b, p, m...）的字數、比例（去重後）
+    - 處理「多音字」的詳細音節資訊（保留所有對應的發音）
+    - 輸出欄位包含：分組值（特徵=值）
+
+    回傳：
+    - 每筆統計結果以字典方式輸出，最終轉為 DataFrame
+    """
+    return query_by_status_batch([(char_list, features, user_input)], locations, db_path=db_path, table=table)[0]
+
+
 def run_status(
         input_strings,
         db_path=CHARACTERS_DB_PATH,
@@ -260,7 +231,7 @@ def run_status(
            (
                原始輸入字串,           # 例如 "蟹攝"
                合併後的漢字清單,       # e.g., ["協", "些", "斜"]
-               合併後的多地位字清單,   # e.g., ["協"]
+               合併後的多地位字清單,   # e.g., ["協"]（按全表判斷，見 query_characters_by_path）
                每個 path 的明細清單     # list of dicts（含 path、characters、multi）
            )
     """
@@ -443,27 +414,25 @@ def sta2pho(
 
     if not test_inputs:
         print("ℹ️ inputs 為空，自動推導條件字串...")
-        conn = sqlite3.connect(db_path_char)
-        df_char = pd.read_sql_query("SELECT * FROM characters", conn)
-        conn.close()
+        char_index = load_characters_index(db_path_char)
 
         auto_inputs = []
         auto_features = []
 
         for feat in features:
             if feat == "聲母":
-                unique_vals = sorted(df_char["母"].dropna().unique())
+                unique_vals = char_index.values("母")
                 auto_inputs.extend([f"{v}母" for v in unique_vals])
                 auto_features.extend(["聲母"] * len(unique_vals))
 
             elif feat == "韻母":
-                unique_vals = sorted(df_char["攝"].dropna().unique())
+                unique_vals = char_index.values("攝")
                 auto_inputs.extend([f"{v}攝" for v in unique_vals])
                 auto_features.extend(["韻母"] * len(unique_vals))
 
             elif feat == "聲調":
-                clean_vals = sorted(df_char["清濁"].dropna().unique())
-                tone_vals = sorted(df_char["調"].dropna().unique())
+                clean_vals = char_index.values("清濁")
+                tone_vals = char_index.values("調")
                 for cv in clean_vals:
                     for tv in tone_vals:
                         auto_inputs.append(f"{cv}{tv}")
@@ -477,7 +446,8 @@ def sta2pho(
         # print(test_inputs)
         # print(f"🔧 產生輸入條件 {len(test_inputs)} 筆 ➤ 前5項：{test_inputs[:5]}")
 
-    all_results = []
+    # (漢字清單, 特徵欄位, 分組名稱)，全部條件收集完後統一計算
+    jobs = []
 
     if len(features) == 1:
         for user_input in test_inputs:
@@ -502,10 +472,7 @@ def sta2pho(
 
                     # print(f"\n🔧 開始分析『{path_str}』的特徵分布 ({features[0]})...\n")
                     # simplified_input = ''.join(re.findall(r'\[(.*?)\]', path_str))
-                    df = query_by_status(path_chars, unique_abbrs, [features[0]], path_str,
-                                         db_path=db_path_dialect)
-
-                    all_results.append(df)
+                    jobs.append((path_chars, [features[0]], path_str))
 
     else:
         for user_input, feature in zip(test_inputs, features):
@@ -529,24 +496,23 @@ def sta2pho(
 
                     # print(f"\n🔧 開始分析『{path_str}』的特徵分布 ({feature})...\n")
                     # simplified_input = ''.join(re.findall(r'\[(.*?)\]', path_str))
-                    df = query_by_status(path_chars, unique_abbrs, [feature], path_str, db_path=db_path_dialect)
+                    jobs.append((path_chars, [feature], path_str))
 
-                    all_results.append(df)
+    # 所有條件一次查詢 dialects 庫，按條件順序返回結果
+    all_results = query_by_status_batch(jobs, unique_abbrs, db_path=db_path_dialect)
 
     return all_results
 
 
 # 這函數沒啥用
 def extract_unique_values(db_path=CHARACTERS_DB_PATH, table="characters"):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-    conn.close()
+    index = load_characters_index(db_path, table)
 
     unique_values = {}
 
     for col in HIERARCHY_COLUMNS:
-        if col in df.columns:
-            values = df[col].dropna().unique()
+        if col in index.categories:
+            values = index.values(col)
             values = sorted(str(v).strip() for v in values if str(v).strip() != "")
             unique_values[col] = values
         else:
@@ -2,10 +2,13 @@ import sqlite3
 import os
 import glob
 
+from source.publish_db import enable_wal_files
+
 
 def init_wal_mode_for_db(db_path: str):
     """
     为指定数据库立即启用 WAL 模式并强制生成 .db-wal 和 .db-shm 文件
+    （发布到 data/current 的数据库由 source/publish_db.py 自动完成这一步）
     """
     if not os.path.exists(db_path):
         # 如果数据库不存在，创建一个空数据库
@@ -14,31 +17,13 @@ def init_wal_mode_for_db(db_path: str):
         conn.commit()
         conn.close()
 
-    # 连接并启用 WAL
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA journal_mode=WAL")
-
-    # 执行一次写操作，强制生成 .wal 和 .shm 文件
-    conn.execute("CREATE TABLE IF NOT EXISTS _wal_init (id INTEGER)")
-    conn.execute("INSERT INTO _wal_init (id) VALUES (1)")
-    conn.commit()
-
-    # 设置所有相关文件权限为 777
-    wal_path = db_path + "-wal"
-    shm_path = db_path + "-shm"
+    # 启用 WAL 并生成 .db-wal / .db-shm，权限设为 777
     try:
-        os.chmod(db_path, 0o777)
-        if os.path.exists(wal_path):
-            os.chmod(wal_path, 0o777)
-        if os.path.exists(shm_path):
-            os.chmod(shm_path, 0o777)
+        enable_wal_files(db_path)
         print(f"  权限已设置为 777")
-    except Exception as e:
+    except OSError as e:
         print(f"  ⚠ 权限设置失败: {e}")
 
-    # 不执行 checkpoint，保持 WAL 文件存在
-    conn.close()
-
     print(f"✓ {db_path}")
     wal_path = db_path + "-wal"
     shm_path = db_path + "-shm"
@@ -1,19 +1,125 @@
 """
 测试坐标转换：BD-09 → WGS-84
-对比新旧方法的差异
+对比新旧方法的差异，并校验数组版本与逐点计算一致
 """
-from source.change_coordinates import GPSUtil, bd09togcj02
+import math
+import random
 
+import numpy as np
 
-def test_coordinate_conversion():
-    # 测试数据：广州市中心（百度坐标系）
-    test_cases = [
-        ("广州", 113.280637, 23.125178),
-        ("北京", 116.413554, 39.911013),
-        ("上海", 121.480539, 31.235929),
-        ("深圳", 114.085947, 22.547),
+from source.change_coordinates import (
+    GPSUtil,
+    bd09togcj02,
+    bd09_to_gcj02_array,
+    bd09_to_gps84_array,
+    convert_bd09_column_to_gps84,
+    gcj02_to_bd09_array,
+    gcj02_to_gps84_array,
+    gps84_to_bd09_array,
+    gps84_to_gcj02_array,
+)
+
+# 测试数据：百度坐标系
+test_cases = [
+    ("广州", 113.280637, 23.125178),
+    ("北京", 116.413554, 39.911013),
+    ("上海", 121.480539, 31.235929),
+    ("深圳", 114.085947, 22.547),
+]
+
+
+def reference_bd09_to_gps84(bd_lat, bd_lon):
+    """逐点的 math 实现（改为数组计算之前的算法），作为对照"""
+    pi = 3.1415926535897932384626
+    x_pi = 3.14159265358979324 * 3000.0 / 180.0
+    a = 6378245.0
+    ee = 0.00669342162296594323
+
+    x = bd_lon - 0.0065
+    y = bd_lat - 0.006
+    z = math.sqrt(x * x + y * y) - 0.00002 * math.sin(y * x_pi)
+    theta = math.atan2(y, x) - 0.000003 * math.cos(x * x_pi)
+    lon = z * math.cos(theta)
+    lat = z * math.sin(theta)
+
+    if lon < 72.004 or lon > 137.8347 or lat < 0.8293 or lat > 55.8271:
+        return [round(lat, 6), round(lon, 6)]
+
+    x, y = lon - 105.0, lat - 35.0
+    d_lat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
+    d_lat += (20.0 * math.sin(6.0 * x * pi) + 20.0 * math.sin(2.0 * x * pi)) * 2.0 / 3.0
+    d_lat += (20.0 * math.sin(y * pi) + 40.0 * math.sin(y / 3.0 * pi)) * 2.0 / 3.0
+    d_lat += (160.0 * math.sin(y / 12.0 * pi) + 320 * math.sin(y * pi / 30.0)) * 2.0 / 3.0
+    d_lon = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
+    d_lon += (20.0 * math.sin(6.0 * x * pi) + 20.0 * math.sin(2.0 * x * pi)) * 2.0 / 3.0
+    d_lon += (20.0 * math.sin(x * pi) + 40.0 * math.sin(x / 3.0 * pi)) * 2.0 / 3.0
+    d_lon += (150.0 * math.sin(x / 12.0 * pi) + 300.0 * math.sin(x / 30.0 * pi)) * 2.0 / 3.0
+
+    rad_lat = lat / 180.0 * pi
+    magic = 1 - ee * math.sin(rad_lat) ** 2
+    sqrt_magic = math.sqrt(magic)
+    d_lat = (d_lat * 180.0) / ((a * (1 - ee)) / (magic * sqrt_magic) * pi)
+    d_lon = (d_lon * 180.0) / (a / sqrt_magic * math.cos(rad_lat) * pi)
+    return [round(lat * 2 - (lat + d_lat), 6), round(lon * 2 - (lon + d_lon), 6)]
+
+
+def random_points(count=5000, seed=0):
+    """覆盖中国范围内外的随机点（纬度, 经度）"""
+    rng = random.Random(seed)
+    return [(rng.uniform(-5.0, 60.0), rng.uniform(60.0, 150.0)) for _ in range(count)]
+
+
+def test_array_matches_reference():
+    points = random_points()
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+
+    wgs_lat, wgs_lon = bd09_to_gps84_array(lats, lons)
+    for (lat, lon), got_lat, got_lon in zip(points, wgs_lat.tolist(), wgs_lon.tolist()):
+        ref_lat, ref_lon = reference_bd09_to_gps84(lat, lon)
+        assert abs(got_lat - ref_lat) <= 1e-6 and abs(got_lon - ref_lon) <= 1e-6, (lat, lon)
+
+
+def test_array_matches_scalar_wrappers():
+    points = random_points(seed=1)
+    lats = np.array([lat for lat, _ in points])
+    lons = np.array([lon for _, lon in points])
+
+    pairs = [
+        (gps84_to_gcj02_array, GPSUtil.gps84_to_gcj02),
+        (gcj02_to_gps84_array, GPSUtil.gcj02_to_gps84),
+        (gcj02_to_bd09_array, GPSUtil.gcj02_to_bd09),
+        (bd09_to_gcj02_array, GPSUtil.bd09_to_gcj02),
+        (gps84_to_bd09_array, GPSUtil.gps84_to_bd09),
+        (bd09_to_gps84_array, GPSUtil.bd09_to_gps84),
     ]
+    for array_func, scalar_func in pairs:
+        out_lat, out_lon = array_func(lats, lons)
+        for i in range(0, len(points), 97):
+            lat, lon = scalar_func(lats[i], lons[i])
+            assert abs(out_lat[i] - lat) <= 1e-9 and abs(out_lon[i] - lon) <= 1e-9, (array_func.__name__, i)
+
+
+def test_out_of_china_points_unchanged():
+    lats = np.array([10.0, 0.5, 60.0])
+    lons = np.array([20.0, 100.0, 100.0])
+    gcj_lat, gcj_lon = gps84_to_gcj02_array(lats, lons)
+    assert np.array_equal(gcj_lat, lats) and np.array_equal(gcj_lon, lons)
 
+
+def test_convert_column():
+    values = [f"{lon},{lat}" for _, lon, lat in test_cases] + ["", None, f"{test_cases[0][1]}，{test_cases[0][2]}"]
+    converted = convert_bd09_column_to_gps84(values)
+
+    assert converted[len(test_cases)] is None
+    assert converted[len(test_cases) + 1] is None
+    assert converted[-1] == converted[0]
+    for (_, bd_lon, bd_lat), text in zip(test_cases, converted):
+        wgs_lat, wgs_lon = GPSUtil.bd09_to_gps84(bd_lat, bd_lon)
+        assert text == f"{wgs_lon},{wgs_lat}"
+
+
+def test_coordinate_conversion():
     print("=" * 80)
     print("坐标转换测试：BD-09 → WGS-84")
     print("=" * 80)
@@ -48,4 +154,9 @@ def test_coordinate_conversion():
 
 
 if __name__ == "__main__":
+    test_array_matches_reference()
+    test_array_matches_scalar_wrappers()
+    test_out_of_china_points_unchanged()
+    test_convert_column()
+    print("✅ 数组版本与逐点计算一致")
     test_coordinate_conversion()
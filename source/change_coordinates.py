@@ -1,126 +1,205 @@
-import math
 import re
 
+import numpy as np
 import pandas as pd
 
+PI = 3.1415926535897932384626
+X_PI = 3.14159265358979324 * 3000.0 / 180.0  # 用於 BD-09 和 GCJ-02 之間的轉換
+A = 6378245.0  # 地球半徑
+EE = 0.00669342162296594323  # 偏心率
+
+COORDINATE_SPLIT_PATTERN = re.compile(r'[，,]')
+
+
+# ---------- 數組版本：整列一次計算，標量接口均委託給這裡 ----------
+
+def transform_lat_array(x, y):
+    """根據經度和緯度計算轉換後的緯度差（x = 經度 - 105，y = 緯度 - 35）"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * np.sqrt(np.abs(x))
+    ret += (20.0 * np.sin(6.0 * x * PI) + 20.0 * np.sin(2.0 * x * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(y * PI) + 40.0 * np.sin(y / 3.0 * PI)) * 2.0 / 3.0
+    ret += (160.0 * np.sin(y / 12.0 * PI) + 320 * np.sin(y * PI / 30.0)) * 2.0 / 3.0
+    return ret
+
+
+def transform_lon_array(x, y):
+    """根據經度和緯度計算轉換後的經度差（x = 經度 - 105，y = 緯度 - 35）"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * np.sqrt(np.abs(x))
+    ret += (20.0 * np.sin(6.0 * x * PI) + 20.0 * np.sin(2.0 * x * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(x * PI) + 40.0 * np.sin(x / 3.0 * PI)) * 2.0 / 3.0
+    ret += (150.0 * np.sin(x / 12.0 * PI) + 300.0 * np.sin(x / 30.0 * PI)) * 2.0 / 3.0
+    return ret
+
+
+def out_of_china_array(lat, lon):
+    """超出中國範圍的點為 True"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return (lon < 72.004) | (lon > 137.8347) | (lat < 0.8293) | (lat > 55.8271)
+
+
+def _gcj02_shift_array(lat, lon):
+    """WGS-84 → GCJ-02 的偏移結果（不判斷是否在中國範圍內）"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    d_lat = transform_lat_array(lon - 105.0, lat - 35.0)
+    d_lon = transform_lon_array(lon - 105.0, lat - 35.0)
+
+    rad_lat = lat / 180.0 * PI
+    magic = np.sin(rad_lat)
+    magic = 1 - EE * magic * magic
+    sqrt_magic = np.sqrt(magic)
+
+    d_lat = (d_lat * 180.0) / ((A * (1 - EE)) / (magic * sqrt_magic) * PI)
+    d_lon = (d_lon * 180.0) / (A / sqrt_magic * np.cos(rad_lat) * PI)
+    return lat + d_lat, lon + d_lon
+
+
+def gps84_to_gcj02_array(lat, lon):
+    """WGS-84 → GCJ-02，中國範圍外的點原樣返回"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    mg_lat, mg_lon = _gcj02_shift_array(lat, lon)
+    outside = out_of_china_array(lat, lon)
+    return np.where(outside, lat, mg_lat), np.where(outside, lon, mg_lon)
+
+
+def gcj02_to_gps84_array(lat, lon):
+    """GCJ-02 → WGS-84（一次迭代的近似逆變換）"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    gps_lat, gps_lon = gps84_to_gcj02_array(lat, lon)
+    return lat * 2 - gps_lat, lon * 2 - gps_lon
+
+
+def gcj02_to_bd09_array(lat, lon):
+    x = np.asarray(lon, dtype=float)
+    y = np.asarray(lat, dtype=float)
+    z = np.sqrt(x * x + y * y) + 0.00002 * np.sin(y * X_PI)
+    theta = np.arctan2(y, x) + 0.000003 * np.cos(x * X_PI)
+    return z * np.sin(theta) + 0.006, z * np.cos(theta) + 0.0065
+
+
+def bd09_to_gcj02_array(lat, lon):
+    x = np.asarray(lon, dtype=float) - 0.0065
+    y = np.asarray(lat, dtype=float) - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * X_PI)
+    theta = np.arctan2(y, x) - 0.000003 * np.cos(x * X_PI)
+    return z * np.sin(theta), z * np.cos(theta)
+
+
+def gps84_to_bd09_array(lat, lon):
+    return gcj02_to_bd09_array(*gps84_to_gcj02_array(lat, lon))
+
+
+def bd09_to_gps84_array(lat, lon):
+    """BD-09 → WGS-84，結果保留六位小數"""
+    gps_lat, gps_lon = gcj02_to_gps84_array(*bd09_to_gcj02_array(lat, lon))
+    return np.round(gps_lat, 6), np.round(gps_lon, 6)
+
+
+def convert_bd09_column_to_gps84(values):
+    """
+    把「經度,緯度」(BD-09) 字符串列整列轉為 WGS-84，返回同長度的列表。
+    空值返回 None；格式不是兩段數字時拋出 ValueError（與逐行轉換一致）。
+    """
+    values = list(values)
+    positions = []
+    bd_lons = []
+    bd_lats = []
+    for position, coords in enumerate(values):
+        if pd.isna(coords) or coords.strip() == '':
+            continue
+        bd_lon, bd_lat = map(float, COORDINATE_SPLIT_PATTERN.split(str(coords).strip()))
+        positions.append(position)
+        bd_lons.append(bd_lon)
+        bd_lats.append(bd_lat)
+
+    converted = [None] * len(values)
+    if positions:
+        wgs_lat, wgs_lon = bd09_to_gps84_array(bd_lats, bd_lons)
+        for position, lon, lat in zip(positions, wgs_lon.tolist(), wgs_lat.tolist()):
+            converted[position] = f"{lon},{lat}"  # 存儲格式：經度,緯度
+    return converted
+
+
+def _pair(lat, lon):
+    return [float(lat), float(lon)]
+
 
 class GPSUtil:
-    pi = 3.1415926535897932384626
-    x_pi = 3.14159265358979324 * 3000.0 / 180.0  # 用於 BD-09 和 GCJ-02 之間的轉換
-    a = 6378245.0  # 地球半徑
-    ee = 0.00669342162296594323  # 偏心率
+    """標量接口（參數順序均為 lat, lon），內部委託給數組版本"""
+    pi = PI
+    x_pi = X_PI
+    a = A
+    ee = EE
 
     @staticmethod
     def transform_lat(x, y):
         """
         根據經度和緯度計算轉換後的緯度差。
         """
-        ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
-        ret += (20.0 * math.sin(6.0 * x * GPSUtil.pi) + 20.0 * math.sin(2.0 * x * GPSUtil.pi)) * 2.0 / 3.0
-        ret += (20.0 * math.sin(y * GPSUtil.pi) + 40.0 * math.sin(y / 3.0 * GPSUtil.pi)) * 2.0 / 3.0
-        ret += (160.0 * math.sin(y / 12.0 * GPSUtil.pi) + 320 * math.sin(y * GPSUtil.pi / 30.0)) * 2.0 / 3.0
-        return ret
+        return float(transform_lat_array(x, y))
 
     @staticmethod
     def transform_lon(x, y):
         """
         根據經度和緯度計算轉換後的經度差。
         """
-        ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
-        ret += (20.0 * math.sin(6.0 * x * GPSUtil.pi) + 20.0 * math.sin(2.0 * x * GPSUtil.pi)) * 2.0 / 3.0
-        ret += (20.0 * math.sin(x * GPSUtil.pi) + 40.0 * math.sin(x / 3.0 * GPSUtil.pi)) * 2.0 / 3.0
-        ret += (150.0 * math.sin(x / 12.0 * GPSUtil.pi) + 300.0 * math.sin(x / 30.0 * GPSUtil.pi)) * 2.0 / 3.0
-        return ret
+        return float(transform_lon_array(x, y))
 
     @staticmethod
     def out_of_china(lat, lon):
         """
         判斷是否超出中國範圍
         """
-        if lon < 72.004 or lon > 137.8347:
-            return True
-        if lat < 0.8293 or lat > 55.8271:
-            return True
-        return False
+        return bool(out_of_china_array(lat, lon))
 
     @staticmethod
     def gps84_to_gcj02(lat, lon):
         """
         將 WGS-84 (GPS) 坐標系轉換為 GCJ-02 (火星坐標系)
         """
-        if GPSUtil.out_of_china(lat, lon):
-            return [lat, lon]
-
-        dLat = GPSUtil.transform_lat(lon - 105.0, lat - 35.0)
-        dLon = GPSUtil.transform_lon(lon - 105.0, lat - 35.0)
-
-        radLat = lat / 180.0 * GPSUtil.pi
-        magic = math.sin(radLat)
-        magic = 1 - GPSUtil.ee * magic * magic
-        sqrtMagic = math.sqrt(magic)
-
-        dLat = (dLat * 180.0) / ((GPSUtil.a * (1 - GPSUtil.ee)) / (magic * sqrtMagic) * GPSUtil.pi)
-        dLon = (dLon * 180.0) / (GPSUtil.a / sqrtMagic * math.cos(radLat) * GPSUtil.pi)
-
-        mgLat = lat + dLat
-        mgLon = lon + dLon
-        return [mgLat, mgLon]
+        return _pair(*gps84_to_gcj02_array(lat, lon))
 
     @staticmethod
     def gcj02_to_gps84(lat, lon):
         """
         將 GCJ-02 (火星坐標系) 轉換為 WGS-84 (GPS) 坐標系
         """
-        gps = GPSUtil.transform(lat, lon)
-        lontitude = lon * 2 - gps[1]
-        latitude = lat * 2 - gps[0]
-        return [latitude, lontitude]
+        return _pair(*gcj02_to_gps84_array(lat, lon))
 
     @staticmethod
     def gcj02_to_bd09(lat, lon):
         """
         GCJ-02 轉換為 BD-09 (百度坐標系)
         """
-        x = lon
-        y = lat
-        z = math.sqrt(x * x + y * y) + 0.00002 * math.sin(y * GPSUtil.x_pi)
-        theta = math.atan2(y, x) + 0.000003 * math.cos(x * GPSUtil.x_pi)
-        tempLon = z * math.cos(theta) + 0.0065
-        tempLat = z * math.sin(theta) + 0.006
-        return [tempLat, tempLon]
+        return _pair(*gcj02_to_bd09_array(lat, lon))
 
     @staticmethod
     def bd09_to_gcj02(lat, lon):
         """
         BD-09 轉換為 GCJ-02 (火星坐標系)
         """
-        x = lon - 0.0065
-        y = lat - 0.006
-        z = math.sqrt(x * x + y * y) - 0.00002 * math.sin(y * GPSUtil.x_pi)
-        theta = math.atan2(y, x) - 0.000003 * math.cos(x * GPSUtil.x_pi)
-        tempLon = z * math.cos(theta)
-        tempLat = z * math.sin(theta)
-        return [tempLat, tempLon]
+        return _pair(*bd09_to_gcj02_array(lat, lon))
 
     @staticmethod
     def gps84_to_bd09(lat, lon):
         """
         WGS-84 轉換為 BD-09
         """
-        gcj02 = GPSUtil.gps84_to_gcj02(lat, lon)
-        return GPSUtil.gcj02_to_bd09(gcj02[0], gcj02[1])
+        return _pair(*gps84_to_bd09_array(lat, lon))
 
     @staticmethod
     def bd09_to_gps84(lat, lon):
         """
-        BD-09 轉換為 WGS-84 (GPS)
+        BD-09 轉換為 WGS-84 (GPS)，保留六位小數
         """
-        gcj02 = GPSUtil.bd09_to_gcj02(lat, lon)
-        gps84 = GPSUtil.gcj02_to_gps84(gcj02[0], gcj02[1])
-        # 保留六位小數
-        gps84[0] = GPSUtil.retain6(gps84[0])
-        gps84[1] = GPSUtil.retain6(gps84[1])
-        return gps84
+        return _pair(*bd09_to_gps84_array(lat, lon))
 
     @staticmethod
     def retain6(num):
@@ -134,23 +213,7 @@ class GPSUtil:
         """
         進行 GCJ-02 火星坐標系轉換的內部方法
         """
-        if GPSUtil.out_of_china(lat, lon):
-            return [lat, lon]
-
-        dLat = GPSUtil.transform_lat(lon - 105.0, lat - 35.0)
-        dLon = GPSUtil.transform_lon(lon - 105.0, lat - 35.0)
-
-        radLat = lat / 180.0 * GPSUtil.pi
-        magic = math.sin(radLat)
-        magic = 1 - GPSUtil.ee * magic * magic
-        sqrtMagic = math.sqrt(magic)
-
-        dLat = (dLat * 180.0) / ((GPSUtil.a * (1 - GPSUtil.ee)) / (magic * sqrtMagic) * GPSUtil.pi)
-        dLon = (dLon * 180.0) / (GPSUtil.a / sqrtMagic * math.cos(radLat) * GPSUtil.pi)
-
-        mgLat = lat + dLat
-        mgLon = lon + dLon
-        return [mgLat, mgLon]
+        return GPSUtil.gps84_to_gcj02(lat, lon)
 
 
 # * 百度坐标系 (BD-09) 与 火星坐标系 (GCJ-02)的转换
@@ -160,90 +223,39 @@ class GPSUtil:
 # * @returns {*[]}
 # */
 def bd09togcj02(bd_lon, bd_lat):
-    x_pi = 3.14159265358979324 * 3000.0 / 180.0
-    x = bd_lon - 0.0065
-    y = bd_lat - 0.006
-    z = math.sqrt(x * x + y * y) - 0.00002 * math.sin(y * x_pi)
-    theta = math.atan2(y, x) - 0.000003 * math.cos(x * x_pi)
-    gg_lng = z * math.cos(theta)
-    gg_lat = z * math.sin(theta)
-    return [gg_lng, gg_lat]
+    gg_lat, gg_lng = bd09_to_gcj02_array(bd_lat, bd_lon)
+    return [float(gg_lng), float(gg_lat)]
 
 
 # * 火星坐标系 (GCJ-02) 与百度坐标系 (BD-09) 的转换
 # * 即谷歌、高德 转 百度
 # */
 def gcj02tobd09(lng, lat):
-    x_PI = 3.14159265358979324 * 3000.0 / 180.0
-    z = math.sqrt(lng * lng + lat * lat) + 0.00002 * math.sin(lat * x_PI)
-    theta = math.atan2(lat, lng) + 0.000003 * math.cos(lng * x_PI)
-    bd_lng = z * math.cos(theta) + 0.0065
-    bd_lat = z * math.sin(theta) + 0.006
-    return [bd_lng, bd_lat]
+    bd_lat, bd_lng = gcj02_to_bd09_array(lat, lng)
+    return [float(bd_lng), float(bd_lat)]
 
 
-# wgs84转高德
+# wgs84转高德（不判斷是否在中國範圍內）
 def wgs84togcj02(lng, lat):
-    PI = 3.1415926535897932384626
-    ee = 0.00669342162296594323
-    a = 6378245.0
-    dlat = transformlat(lng - 105.0, lat - 35.0)
-    dlng = transformlng(lng - 105.0, lat - 35.0)
-    radlat = lat / 180.0 * PI
-    magic = math.sin(radlat)
-    magic = 1 - ee * magic * magic
-    sqrtmagic = math.sqrt(magic)
-    dlat = (dlat * 180.0) / ((a * (1 - ee)) / (magic * sqrtmagic) * PI)
-    dlng = (dlng * 180.0) / (a / sqrtmagic * math.cos(radlat) * PI)
-    mglat = lat + dlat
-    mglng = lng + dlng
-    return [mglng, mglat]
+    mglat, mglng = _gcj02_shift_array(lat, lng)
+    return [float(mglng), float(mglat)]
 
 
 # GCJ02/谷歌、高德 转换为 WGS84 gcj02towgs84
 def gcj02towgs84(localStr):
-    lng = float(re.split(r'[，,]', localStr)[0])
-    lat = float(re.split(r'[，,]', localStr)[1])
-    PI = 3.1415926535897932384626
-    ee = 0.00669342162296594323
-    a = 6378245.0
-    dlat = transformlat(lng - 105.0, lat - 35.0)
-    dlng = transformlng(lng - 105.0, lat - 35.0)
-    radlat = lat / 180.0 * PI
-    magic = math.sin(radlat)
-    magic = 1 - ee * magic * magic
-    sqrtmagic = math.sqrt(magic)
-    dlat = (dlat * 180.0) / ((a * (1 - ee)) / (magic * sqrtmagic) * PI)
-    dlng = (dlng * 180.0) / (a / sqrtmagic * math.cos(radlat) * PI)
-    mglat = lat + dlat
-    mglng = lng + dlng
-    return str(lng * 2 - mglng) + ',' + str(lat * 2 - mglat)
+    parts = COORDINATE_SPLIT_PATTERN.split(localStr)
+    lng = float(parts[0])
+    lat = float(parts[1])
+    mglat, mglng = _gcj02_shift_array(lat, lng)
+    return str(lng * 2 - float(mglng)) + ',' + str(lat * 2 - float(mglat))
 
 
 def transformlat(lng, lat):
-    PI = 3.1415926535897932384626
-    ret = -100.0 + 2.0 * lng + 3.0 * lat + 0.2 * lat * \
-          lat + 0.1 * lng * lat + 0.2 * math.sqrt(abs(lng))
-    ret += (20.0 * math.sin(6.0 * lng * PI) + 20.0 *
-            math.sin(2.0 * lng * PI)) * 2.0 / 3.0
-    ret += (20.0 * math.sin(lat * PI) + 40.0 *
-            math.sin(lat / 3.0 * PI)) * 2.0 / 3.0
-    ret += (160.0 * math.sin(lat / 12.0 * PI) + 320 *
-            math.sin(lat * PI / 30.0)) * 2.0 / 3.0
-    return ret
+    return float(transform_lat_array(lng, lat))
 
 
 def transformlng(lng, lat):
-    PI = 3.1415926535897932384626
-    ret = 300.0 + lng + 2.0 * lat + 0.1 * lng * lng + \
-          0.1 * lng * lat + 0.1 * math.sqrt(abs(lng))
-    ret += (20.0 * math.sin(6.0 * lng * PI) + 20.0 *
-            math.sin(2.0 * lng * PI)) * 2.0 / 3.0
-    ret += (20.0 * math.sin(lng * PI) + 40.0 *
-            math.sin(lng / 3.0 * PI)) * 2.0 / 3.0
-    ret += (150.0 * math.sin(lng / 12.0 * PI) + 300.0 *
-            math.sin(lng / 30.0 * PI)) * 2.0 / 3.0
-    return ret
+    return float(transform_lon_array(lng, lat))
 
 
 # 主函數
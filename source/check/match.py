@@ -3,7 +3,7 @@ import sqlite3
 import pydoc
 
 from common.config import PROCESSED_DATA_DIR, YINDIAN_DATA_DIR, QUERY_DB_PATH
-from source.match_fromdb import get_tsvs
+from source.match_fromdb import get_tsvs, get_abbreviation_index
 
 
 def _iter_tsv_paths():
@@ -35,8 +35,12 @@ def _check_query_db_ready(query_db_path):
     return True, ''
 
 
-def _check_one_file(path, query_db_path):
-    matched_paths, locations, partitions = get_tsvs(single=str(path), query_db_path=query_db_path)
+def _check_one_file(path, query_db_path, abbreviation_index=None):
+    matched_paths, locations, partitions = get_tsvs(
+        single=str(path),
+        query_db_path=query_db_path,
+        abbreviation_index=abbreviation_index,
+    )
     stem = path.stem
     source = path.parent.name
 
@@ -116,9 +120,10 @@ def run_match_check(query_db_path=QUERY_DB_PATH, show_output=True, use_pager=Tru
         _emit('   先运行：python build.py -t query')
         return rows
 
+    abbreviation_index = get_abbreviation_index(query_db_path)
     for path in _iter_tsv_paths():
         total += 1
-        row = _check_one_file(path, query_db_path=query_db_path)
+        row = _check_one_file(path, query_db_path=query_db_path, abbreviation_index=abbreviation_index)
         rows.append(row)
 
         if row['status'] == 'OK':
@@ -1,9 +1,8 @@
 import sys
 from pathlib import Path
 
-import pandas as pd
-
 from common.config import HAN_PATH
+from common.workbook_cache import read_excel_cached
 
 
 def normalize_coordinate_text(value):
@@ -18,7 +17,7 @@ def normalize_coordinate_text(value):
 
 
 def load_han_file_for_change_check(file_path):
-    df = pd.read_excel(file_path, sheet_name='檔案', dtype=object)
+    df = read_excel_cached(file_path, sheet_name='檔案', dtype=object)
     df.columns = [str(c).strip() for c in df.columns]
     missing_cols = [col for col in ['簡稱', '經緯度', '是否有人在做'] if col not in df.columns]
     if missing_cols:
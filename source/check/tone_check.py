@@ -3,9 +3,8 @@ import re
 from collections import defaultdict
 from pathlib import Path
 
-import pandas as pd
-
 from common.config import HAN_PATH, QUERY_DB_USER_PATH
+from common.workbook_cache import read_excel_cached
 from common.search_tones import search_tones
 
 TONE_CHECK_JSON_PATH = Path("data/dependency/tone_value_overrides.json")
@@ -37,7 +36,7 @@ def save_tone_overrides(overrides, json_path=TONE_CHECK_JSON_PATH):
 
 
 def load_tone_dataframe(excel_path=HAN_PATH):
-    df = pd.read_excel(excel_path, sheet_name='檔案', dtype=object).fillna('')
+    df = read_excel_cached(excel_path, sheet_name='檔案', dtype=object).fillna('')
     df.columns = [str(col).strip() for col in df.columns]
     df['簡稱'] = df['簡稱'].astype(str).str.strip()
     return df
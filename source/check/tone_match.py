@@ -7,7 +7,7 @@ import pandas as pd
 
 from common.config import HAN_PATH, YINDIAN_DATA_DIR, QUERY_DB_PATH
 from common.constants import exclude_files
-from source.match_fromdb import get_tsvs
+from source.match_fromdb import get_tsvs, get_abbreviation_index
 from source.check.tone_check import load_tone_dataframe, TONE_INDEX_TO_LABEL
 
 
@@ -128,7 +128,7 @@ def _load_workbook_map(excel_path):
     return workbook_df, workbook_map
 
 
-def _match_one_yindian_tsv_by_get_tsvs(path, query_db_path):
+def _match_one_yindian_tsv_by_get_tsvs(path, query_db_path, abbreviation_index=None):
     """
     使用 get_tsvs(single=...) 对单个 yindian TSV 做真实匹配。
 
@@ -143,6 +143,7 @@ def _match_one_yindian_tsv_by_get_tsvs(path, query_db_path):
         matched_paths, locations, partitions = get_tsvs(
             single=str(path),
             query_db_path=query_db_path,
+            abbreviation_index=abbreviation_index,
         )
     except Exception as exc:
         return {
@@ -202,11 +203,13 @@ def collect_yindian_tsv_match_rows_by_get_tsvs(query_db_path=QUERY_DB_PATH):
     5. 但必须调用 get_tsvs(single=...)，保持和最终写库匹配链路一致。
     """
     rows = []
+    abbreviation_index = get_abbreviation_index(query_db_path)
 
     for path in _iter_checked_yindian_tsv_paths():
         row = _match_one_yindian_tsv_by_get_tsvs(
             path,
             query_db_path=query_db_path,
+            abbreviation_index=abbreviation_index,
         )
         rows.append(row)
 
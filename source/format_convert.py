@@ -7,22 +7,43 @@
 """
 
 import csv
+import logging
 import os
 import re
+import sys
 from itertools import product
 
 import docx
 import pandas as pd
-from docx import Document
-from docx.table import Table
 from docx.text.paragraph import Paragraph
-from openpyxl import load_workbook
 from xlrd import open_workbook
 
 from common.config import WRITE_ERROR_LOG
 from common.constants import col_map
-from common.s2t import s2t_pro
+from common.s2t import get_s2t_converter
+from common.stream_reader import iter_docx_blocks, iter_sheet_rows, iter_xlsx_rows, open_xlsx_stream
 
+# 逐行明細（笛卡爾積、簡繁一對多等）記在 DEBUG 級，逐行的跳過提示記在 INFO 級
+logger = logging.getLogger(__name__)
+
+
+class _CurrentStdoutHandler(logging.StreamHandler):
+    """每次輸出時取當前的 sys.stdout，並行轉換時子進程重定向的終端輸出也能收到"""
+
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+def set_row_log_level(level):
+    """
+    設定各格式解析器逐行日誌的級別並輸出到終端，logging.DEBUG 顯示全部逐行明細。
+    只由轉換入口（build.py、convert_all_to_tsv）調用；導入本模塊不改動日誌配置。
+    """
+    if not logger.handlers:
+        logger.addHandler(_CurrentStdoutHandler())
+        logger.propagate = False
+    logger.setLevel(level)
 
 # def get_tsv_name(path):
 #     return os.path.splitext(path)[0] + ".tsv"
@@ -85,42 +106,38 @@ def xls_to_tsv(xls_path, page=0):
     tsv_path = get_tsv_name(xls_path)
     print(f"[INFO] Target TSV path: {tsv_path}")
 
-    lines = []
-    header_written = False
-    num_columns = 0
-
-    if xls_path.endswith(".xlsx"):
-        print("[INFO] Detected .xlsx file")
-        wb = load_workbook(xls_path, data_only=True, rich_text=True)
-        sheet = wb.worksheets[page]
-        print(f"[INFO] Loaded worksheet: {sheet.title}")
-        for row_idx, row in enumerate(sheet.rows):
-            cols = [process_xlsx_fs(cell.value) for cell in row[:50]]
-            if any(cols):
-                if not header_written:
-                    num_columns = len(cols)
-                    header_written = True
-                cols += [""] * (num_columns - len(cols))
-                lines.append("\t".join(cols[:num_columns]) + "\n")
-    else:
-        print("[INFO] Detected .xls file")
-        wb = open_workbook(xls_path)
-        sheet = wb.sheet_by_index(page)
-        print(f"[INFO] Loaded sheet: {sheet.name}")
-        for i in range(sheet.nrows):
-            row = sheet.row_values(i)
-            cols = [process_fs(cell) for cell in row]
-            if any(cols):
-                if not header_written:
-                    num_columns = len(cols)
-                    header_written = True
-                cols += [""] * (num_columns - len(cols))
-                lines.append("\t".join(cols[:num_columns]) + "\n")
-
-    print(f"[INFO] Writing {len(lines)} rows to TSV")
-    with open(tsv_path, "w", encoding="utf-8", newline="\n") as f:
-        f.writelines(lines)
+    # 逐行轉換、逐行寫出，不在內存中保留整張表
+    written = 0
+    num_columns = None
 
+    def write_row(f, cols):
+        nonlocal written, num_columns
+        if not any(cols):
+            return
+        if num_columns is None:
+            num_columns = len(cols)
+        cols += [""] * (num_columns - len(cols))
+        f.write("\t".join(cols[:num_columns]) + "\n")
+        written += 1
+
+    with open(tsv_path, "w", encoding="utf-8", newline="\n") as f:
+        if xls_path.endswith(".xlsx"):
+            print("[INFO] Detected .xlsx file")
+            with open_xlsx_stream(xls_path, rich_text=True) as wb:
+                sheet = wb.worksheets[page]
+                print(f"[INFO] Loaded worksheet: {sheet.title}")
+                for row in iter_sheet_rows(sheet, max_col=50, rich_text=True):
+                    write_row(f, [process_xlsx_fs(value) for value in row])
+        else:
+            print("[INFO] Detected .xls file")
+            wb = open_workbook(xls_path, on_demand=True)
+            sheet = wb.sheet_by_index(page)
+            print(f"[INFO] Loaded sheet: {sheet.name}")
+            for i in range(sheet.nrows):
+                write_row(f, [process_fs(cell) for cell in sheet.row_values(i)])
+            wb.release_resources()
+
+    print(f"[INFO] Wrote {written} rows to TSV")
     print(f"[INFO] Conversion complete: {tsv_path}")
     return tsv_path
 
@@ -150,52 +167,73 @@ def run2text(run):
     return text
 
 
+class StreamReplace:
+    """
+    流式的 str.replace：逐段 feed，跨段邊界的匹配也會被替換，
+    拼起來的結果與對整段文本調用 replace 相同。
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self._pending = ""
+
+    def feed(self, text):
+        buf = self._pending + text
+        out = []
+        pos = 0
+        idx = buf.find(self.old)
+        while idx != -1:
+            out.append(buf[pos:idx])
+            out.append(self.new)
+            pos = idx + len(self.old)
+            idx = buf.find(self.old, pos)
+        # 末尾不足一個匹配長度的部分可能與下一段拼成匹配，留到下次
+        cut = max(pos, len(buf) - len(self.old) + 1)
+        out.append(buf[pos:cut])
+        self._pending = buf[cut:]
+        return "".join(out)
+
+    def flush(self):
+        pending, self._pending = self._pending, ""
+        return pending
+
+
 def docx_to_tsv(doc):
     if not os.path.exists(doc):
         print("❌ 輸入檔案不存在，跳過")
         return
 
-    lines = []
-    Doc = Document(doc)
+    dirpath = os.path.dirname(doc)
+    basename = os.path.splitext(os.path.basename(doc))[0]
+    tsv_path = os.path.join(dirpath, basename + ".tsv")
+
+    # 合併所有行後的 "}\n{" → "" 和 "\n}" → "}\n" 改為邊寫邊替換，不在內存中拼接全文
+    merge_braces = StreamReplace("}\n{", "")
+    move_braces = StreamReplace("\n}", "}\n")
+    first = True
 
-    for idx, each in enumerate(Doc._body._element):
-        if isinstance(each, docx.oxml.table.CT_Tbl):
-            # print(f"[📐] 處理表格 第 {idx + 1} 區塊")
-            t = Table(each, Doc)
-            for row_num, row in enumerate(t.rows):
+    with open(tsv_path, "w", encoding="utf-8", newline="\n") as t:
+        for block in iter_docx_blocks(doc):
+            if isinstance(block, Paragraph):
+                raw = "".join(map(run2text, block.iter_inner_content()))
+                after = raw.replace("}~", "~}").replace("~{", "{~").replace("}{", "").replace("[}", "}[").replace("{h}",
+                                                                                                                  "h")
+            else:
                 行 = ""
-                cells = row.cells
-                for i, cell in enumerate(cells):
-                    if cell in cells[:i]: continue
+                for i, cell in enumerate(block):
+                    if cell in block[:i]: continue
                     for p in cell.paragraphs:
                         raw = "".join(map(run2text, p.iter_inner_content()))
                         行 += raw.replace("\t", "").replace("\n", "")
                 行 += "\t"
-
-                before = 行
                 after = 行.replace("}~", "~}").replace("~{", "{~").replace("}{", "").replace("[}", "}[").replace("{h}",
                                                                                                                  "h").strip()
-                # print(f"  [→ 表格第 {row_num + 1} 行] 原始：{before}")
-                # print(f"  [✓ 清洗後]：{after}")
-                lines.append(after)
-
-        elif isinstance(each, docx.oxml.text.paragraph.CT_P):
-            # print(f"[📄] 處理段落 第 {idx + 1} 區塊")
-            element = Paragraph(each, Doc)
-            raw = "".join(map(run2text, element.iter_inner_content()))
-            before = raw
-            after = raw.replace("}~", "~}").replace("~{", "{~").replace("}{", "").replace("[}", "}[").replace("{h}",
-                                                                                                              "h")
-            # print(f"  [→ 段落原始]：{before}")
-            # print(f"  [✓ 清洗後]：{after}")
-            lines.append(after)
-    行 = "\n".join(lines).replace("}\n{", "").replace("\n}", "}\n")
-    # print(f"[📦] 合併所有行後內容 頭 200 字預覽：\n{行[:200]}...")
-    dirpath = os.path.dirname(doc)
-    basename = os.path.splitext(os.path.basename(doc))[0]
-    tsv_path = os.path.join(dirpath, basename + ".tsv")
-    with open(tsv_path, "w", encoding="utf-8", newline="\n") as t:
-        t.write(行)
+
+            t.write(move_braces.feed(merge_braces.feed(after if first else "\n" + after)))
+            first = False
+
+        t.write(move_braces.feed(merge_braces.flush()) + move_braces.flush())
         print(f"[✅] 已寫入：{tsv_path}")
 
     return tsv_path
@@ -222,231 +260,308 @@ def convert_to_tsv_if_needed(filepath):
         return filepath
 
 
-# ========== 音典格式處理 ==========
-def process_音典(file, level=1, output_path=None):
-    print(f"[開始] 處理檔案：{file}")
+# ========== 逐行轉換管線 ==========
+# 多值欄位的分隔符（原先逐個替換成 ∥ 再切分，∥ 本身也算分隔符）
+FIELD_DELIMITER_PATTERN = re.compile(r"[;；/、,，∥]")
+# 標準欄名 → 小寫別名集合
+COLUMN_ALIASES = {std_key: frozenset(alias.lower() for alias in aliases) for std_key, aliases in col_map.items()}
 
-    # cc = OpenCC('s2t' if level == 1 else 't2s')
-    # def s2t(text):
-    #     return cc.convert(text)
+TIAOTIAO_GROUP_PATTERN = re.compile(r"(.)(?:\{(.*?)\}|\[(.*?)\])?")
 
-    file = convert_to_tsv_if_needed(file)
-    print(f"[轉換] 轉為 TSV 路徑：{file}")
+XIANZHI_COLON_PATTERN = re.compile(r":\[")
+XIANZHI_TONE_PATTERN = re.compile(r"\[(\d+)\]")
+XIANZHI_BRACKET_NOTE_PATTERN = re.compile(r"［([^\d]+.*?)］")
+XIANZHI_SYLLABLE_PATTERN = re.compile(r"[［\[](\d+[a-z]?)[］\]](.+?)(?=([［\[]\d|$))")
+XIANZHI_NOTE_PATTERN = re.compile(r"[{｛]([^{}｛｝]+)[}｝]")
+XIANZHI_INITIAL_PATTERN = re.compile(r"^([^\[]+)")
+XIANZHI_SEGMENT_PATTERN = re.compile(r"\[(\d+)]([^\[]+)")
 
-    rows = []
-    simplified_rows = []
+TSV_HEADER = ["#漢字", "音標", "解釋"]
+SIMPLIFIED_TSV_HEADER = ["#漢字", "音標", "解釋", "繁簡"]
 
-    with open(file, encoding="utf-8") as f:
-        lines = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
 
-    if not lines:
-        print("⚠️ 無有效數據，檔案內容為空或格式錯誤")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
-            f.write(f"⚠️ [{file}] 無有效數據，檔案內容為空或格式錯誤\t【format_convert->process_音典】\n")
-        return
+def split_field(field):
+    return [part.strip() for part in FIELD_DELIMITER_PATTERN.split(field) if part.strip()]
 
-    header = lines[0]
-    print(f"[分析] 表頭：{header}")
 
+def resolve_columns(header):
+    """表頭 → {標準欄名: 欄序號}，每個標準欄取第一個匹配別名的欄"""
     index = {}
-    for std_key, aliases in col_map.items():
+    for std_key, aliases in COLUMN_ALIASES.items():
         for i, name in enumerate(header):
-            if name.strip().lower() in [a.lower() for a in aliases]:
+            if name.strip().lower() in aliases:
                 index[std_key] = i
-                print(f"✅ 欄位對應：{std_key} → 第 {i + 1} 欄（{name}）")
                 break
+    return index
 
-    if '漢字' not in index or '音標' not in index:
-        print("❌ 欄位對應失敗，請確認有『漢字』與『音標』欄位")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
-            f.write(f"❌ [{file}]欄位對應失敗，請確認有『漢字』與『音標』欄位\t【format_convert->process_音典】\n")
-        return
 
-    print(f"[處理] 開始掃描資料行，共 {len(lines) - 1} 筆")
+def expand_pair(converter, word, phon, note, row_num):
+    """
+    一組漢字 / 音標：字數與音節數相同時逐字拆開，否則整組輸出。
+    產出 (字, 音標, 解釋, 是否經繁簡轉換)
+    """
+    clean_str, mapping = converter.convert(word)
+    phon_units = phon.split()
+
+    if len(word) == len(phon_units):
+        for (ch, candidates), unit in zip(mapping, phon_units):
+            for cand in candidates:
+                changed = cand != ch
+                if changed:
+                    logger.debug("[簡體一對多] 第 %s 行：%s → %s", row_num, ch, cand)
+                yield cand, unit, note, changed
+    else:
+        changed = clean_str != word
+        if changed:
+            logger.debug("[fallback] 第 %s 行：%s → %s", row_num, word, clean_str)
+        yield clean_str, phon, note, changed
 
-    delimiters = [';', '；', '/', '、', ',', '，']
 
-    def split_field(field):
-        for delim in delimiters:
-            field = field.replace(delim, '∥')  # 統一分隔符為 ∥
-        return [f.strip() for f in field.split('∥') if f.strip()]
+def iter_yindian_entries(rows, index, level=1):
+    """
+    音典格式的逐行轉換。rows 為 (行號, 欄位列表)，index 為 resolve_columns 的結果。
+    多值欄位拆開後做笛卡爾積 / 多對一 / 一對多，產出 (字, 音標, 解釋, 是否經繁簡轉換)。
+    """
+    converter = get_s2t_converter(level)
+    word_idx, phon_idx, note_idx = (index.get(key) for key in ('漢字', '音標', '解釋'))
 
-    def get_field(parts, field_name):
-        idx = index.get(field_name)
+    def get_field(parts, idx):
         if idx is not None and idx < len(parts):
             return parts[idx].strip()
         return ""
 
-    def process_pair(word, phon, note, row_num):
-        clean_str, mapping = s2t_pro(word, level)
-        mapping = dict(mapping)
-        phon_units = phon.strip().split()
-        word_len_match = len(word) == len(phon_units)
-
-        if word_len_match:
-            for ch, p in zip(word, phon_units):
-                candidates = mapping.get(ch, [ch])
-                for cand in candidates:
-                    rows.append([cand, p, note])
-                    if cand != ch:
-                        simplified_rows.append([cand, p, note, "簡"])
-                        print(f"[簡體一對多] 第 {row_num} 行：{ch} → {cand}")
-        else:
-            rows.append([clean_str, phon, note])
-            if clean_str != word:
-                simplified_rows.append([clean_str, phon, note, "簡"])
-                print(f"[fallback] 第 {row_num} 行：{word} → {clean_str}")
-
-    print(f"[處理] 開始掃描資料行，共 {len(lines) - 1} 筆")
-
-    for row_num, parts in enumerate(lines[1:], start=2):
-        word_raw = get_field(parts, '漢字')
-        phon_raw = get_field(parts, '音標')
-        note = get_field(parts, '解釋')
-
+    for row_num, parts in rows:
+        word_raw = get_field(parts, word_idx)
+        phon_raw = get_field(parts, phon_idx)
         if not word_raw or not phon_raw:
             continue
+        note = get_field(parts, note_idx)
 
         word_list = split_field(word_raw)
         phon_list = split_field(phon_raw)
-
         if not word_list or not phon_list:
-            print(f"⚠️ 跳過第 {row_num} 行，因為漢字或音標清單為空")
+            logger.info("⚠️ 跳過第 %s 行，因為漢字或音標清單為空", row_num)
             continue
 
         if len(word_list) > 1 and len(phon_list) > 1:
-            # ✅ 無論等長與否，始終做笛卡爾積
-            print(f"[笛卡爾積] 第 {row_num} 行：{word_list} × {phon_list}")
-            for word, phon in product(word_list, phon_list):
-                process_pair(word, phon, note, row_num)
-
-        elif len(word_list) > 1 and len(phon_list) == 1:
-            # ✅ 多對一
-            print(f"[多對一] 第 {row_num} 行：{word_list} × {phon_list[0]}")
-            for word in word_list:
-                process_pair(word, phon_list[0], note, row_num)
-
-        elif len(word_list) == 1 and len(phon_list) > 1:
-            # ✅ 一對多
-            print(f"[一對多] 第 {row_num} 行：{word_list[0]} × {phon_list}")
-            for phon in phon_list:
-                process_pair(word_list[0], phon, note, row_num)
-
+            # 無論等長與否，始終做笛卡爾積
+            logger.debug("[笛卡爾積] 第 %s 行：%s × %s", row_num, word_list, phon_list)
+            pairs = product(word_list, phon_list)
+        elif len(word_list) > 1:
+            logger.debug("[多對一] 第 %s 行：%s × %s", row_num, word_list, phon_list[0])
+            pairs = [(word, phon_list[0]) for word in word_list]
+        elif len(phon_list) > 1:
+            logger.debug("[一對多] 第 %s 行：%s × %s", row_num, word_list[0], phon_list)
+            pairs = [(word_list[0], phon) for phon in phon_list]
         else:
-            # fallback 合併處理
-            word = ''.join(word_list)
-            phon = ' '.join(phon_list)
-            # print(f"[fallback] 第 {row_num} 行：{word} → {phon}")
-            process_pair(word, phon, note, row_num)
+            pairs = [(word_list[0], phon_list[0])]
 
-    outpath = output_path or (os.path.splitext(file)[0] + ".tsv")
-    print(f"[輸出] 寫入主檔案：{outpath}")
+        for word, phon in pairs:
+            yield from expand_pair(converter, word, phon, note, row_num)
 
-    with open(outpath, "w", encoding="utf-8", newline="\n") as out:
+
+def iter_tiaotiao_entries(rows, level=1):
+    """
+    跳跳老鼠格式的逐行轉換：每行「音 | 字組」，字組中的字後可跟 {註} 或 [註]。
+    rows 為 (行號, 單元格值)，產出 (字, 音標, 解釋, 是否經繁簡轉換)。
+    """
+    converter = get_s2t_converter(level)
+
+    for line_num, line in rows:
+        if not line or str(line[0]).startswith("#"):
+            continue
+        parts = [str(c).strip() if c is not None else "" for c in line]
+        if len(parts) < 2:
+            logger.info("⚠️ 第 %s 行欄位不足，跳過：%s", line_num, parts)
+            continue
+        phon, 組 = parts[0], parts[1]
+        if not phon or not 組:
+            logger.info("⚠️ 第 %s 行缺音或字，跳過", line_num)
+            continue
+
+        matches = TIAOTIAO_GROUP_PATTERN.findall(組)
+        logger.debug("🔍 第 %s 行組拆分：%s", line_num, matches)
+        parsed = [(字, 註1 or 註2 or "") for 字, 註1, 註2 in matches]
+        for 字, 註 in parsed:
+            logger.debug("🧩 字：%s，音：%s，註：%s", 字, phon, 註)
+
+        conversions = converter.convert_many([字 for 字, _ in parsed])
+        for (字, 註), (_, mapping) in zip(parsed, conversions):
+            candidates = dict(mapping).get(字, [字])  # 支援多候選
+            for cand in candidates:
+                changed = cand != 字
+                if changed:
+                    logger.debug("🔁 字形轉換：%s → %s", 字, cand)
+                yield cand, phon, 註, changed
+
+
+def normalize_xianzhi_line(行):
+    """縣志行預處理：空行返回 None，註解行原樣返回，其餘統一括號與調號標記"""
+    行 = 行.strip()
+    if not 行:
+        return None
+    if 行.startswith("#"):
+        return 行
+    行 = XIANZHI_COLON_PATTERN.sub("\t[", 行)
+    行 = 行.replace("(", "{").replace(")", "}")
+    行 = XIANZHI_TONE_PATTERN.sub(r"［\1］", 行)
+    行 = XIANZHI_BRACKET_NOTE_PATTERN.sub(r"[\1]", 行)
+    return 行
+
+
+def iter_xianzhi_entries(lines, level=1, stats=None):
+    """
+    縣志格式的逐行轉換：每行「拼音 [調號]字{註}字…」。
+    產出 (字, 音標, 解釋, 是否經繁簡轉換)；stats 不為 None 時累計 total / skipped 行數。
+    """
+    converter = get_s2t_converter(level)
+    stats = stats if stats is not None else {}
+    stats.setdefault("total", 0)
+    stats.setdefault("skipped", 0)
+
+    for lineno, raw_line in enumerate(lines, 1):
+        stats["total"] += 1
+        line = normalize_xianzhi_line(raw_line)
+        if line is None or line.startswith("#漢字"):
+            stats["skipped"] += 1
+            continue
+        if line.startswith("#"):
+            continue
+
+        parts = line.split("\t")
+        if len(parts) < 2:
+            logger.info("⚠️ 跳過行 %s（分欄不足）: %s", lineno, raw_line.strip())
+            stats["skipped"] += 1
+            continue
+
+        拼音 = parts[0].strip()
+        for cell in parts[1:]:
+            matches = XIANZHI_SYLLABLE_PATTERN.findall(cell)
+            if not matches:
+                logger.info("⚠️ 無音節匹配 行 %s: %s", lineno, cell)
+                continue
+
+            for 調號, 義項, _ in matches:
+                logger.debug("🔎 行 %s：拼音=%s, 調號=%s, 義項=%s", lineno, 拼音, 調號, 義項)
+                音標 = f"{拼音}{調號}"
+
+                # 逐字掃描義項，若某字後緊跟註釋，就綁定在那個字上
+                i = 0
+                while i < len(義項):
+                    字 = 義項[i]
+                    註 = ""
+                    if i + 1 < len(義項) and 義項[i + 1] in "{｛":
+                        m = XIANZHI_NOTE_PATTERN.match(義項, i + 1)
+                        if m:
+                            註 = m.group(1)
+                            i += len(m.group(0))  # 跳過整個 {註釋}
+                    i += 1
+                    字 = 字.strip()
+                    if not 字:
+                        logger.info("⚠️ 空白字 行 %s 義項：%s", lineno, 義項)
+                        continue
+
+                    _, mapping = converter.convert(字)
+                    for cand in dict(mapping).get(字, [字]):  # 支援多候選繁體字
+                        changed = cand != 字
+                        if changed:
+                            logger.debug("🔁 字形轉換：%s → %s", 字, cand)
+                        yield cand, 音標, 註, changed
+
+
+def write_entries(outpath, entries, simplified_rows=None):
+    """
+    把 (字, 音標, 解釋, 是否經繁簡轉換) 邊生成邊寫入 TSV，返回寫入行數。
+    simplified_rows 不為 None 時收集經繁簡轉換的行（帶「簡」標記）。
+    先寫到同目錄的臨時文件，全部寫完才替換 outpath：解析中途出錯時保留上一次完整的輸出。
+    """
+    count = 0
+    tmp_path = f"{outpath}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as out:
+            writer = csv.writer(out, delimiter="\t")
+            writer.writerow(TSV_HEADER)
+            for 字, 音, 註, changed in entries:
+                writer.writerow((字, 音, 註))
+                count += 1
+                if changed and simplified_rows is not None:
+                    simplified_rows.append([字, 音, 註, "簡"])
+        os.replace(tmp_path, outpath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def write_simplified_rows(simp_path, simplified_rows):
+    with open(simp_path, "w", encoding="utf-8", newline="\n") as out:
         writer = csv.writer(out, delimiter="\t")
-        writer.writerow(["#漢字", "音標", "解釋"])
-        writer.writerows(rows)
+        writer.writerow(SIMPLIFIED_TSV_HEADER)
+        writer.writerows(simplified_rows)
 
-    # simp_path = os.path.splitext(file)[0] + ".簡.tsv"
-    # if simplified_rows:
-    #     print(f"[簡體] 共發現 {len(simplified_rows)} 筆簡體詞彙，寫入：{simp_path}")
-    #     with open(simp_path, "w", encoding="utf-8", newline="\n") as out:
-    #         writer = csv.writer(out, delimiter="\t")
-    #         writer.writerow(["#漢字", "音標", "解釋", "繁簡"])
-    #         writer.writerows(simplified_rows)
+
+# ========== 音典格式處理 ==========
+def process_音典(file, level=1, output_path=None, error_log=None):
+    print(f"[開始] 處理檔案：{file}")
+    error_log = error_log or WRITE_ERROR_LOG
+
+    file = convert_to_tsv_if_needed(file)
+    print(f"[轉換] 轉為 TSV 路徑：{file}")
+
+    with open(file, encoding="utf-8") as f:
+        lines = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+
+    if not lines:
+        print("⚠️ 無有效數據，檔案內容為空或格式錯誤")
+        with open(error_log, "a", encoding="utf-8") as f:
+            f.write(f"⚠️ [{file}] 無有效數據，檔案內容為空或格式錯誤\t【format_convert->process_音典】\n")
+        return
+
+    header = lines[0]
+    print(f"[分析] 表頭：{header}")
+
+    index = resolve_columns(header)
+    for std_key, i in index.items():
+        print(f"✅ 欄位對應：{std_key} → 第 {i + 1} 欄（{header[i]}）")
+
+    if '漢字' not in index or '音標' not in index:
+        print("❌ 欄位對應失敗，請確認有『漢字』與『音標』欄位")
+        with open(error_log, "a", encoding="utf-8") as f:
+            f.write(f"❌ [{file}]欄位對應失敗，請確認有『漢字』與『音標』欄位\t【format_convert->process_音典】\n")
+        return
+
+    print(f"[處理] 開始掃描資料行，共 {len(lines) - 1} 筆")
+
+    outpath = output_path or (os.path.splitext(file)[0] + ".tsv")
+    print(f"[輸出] 寫入主檔案：{outpath}")
+    write_entries(outpath, iter_yindian_entries(enumerate(lines[1:], start=2), index, level))
 
     print(f"✅ 全部處理完成：{outpath}")
 
 
 # ========== 跳跳老鼠格式處理 ==========
-def process_跳跳老鼠(file, level=1, output_path=None):
+def process_跳跳老鼠(file, level=1, output_path=None, error_log=None):
     print(f"📄 開始處理文件：{file}")
-    rows = []
     simplified_rows = []
 
-    # 選擇繁→簡或簡→繁
-    # converter = OpenCC('s2t' if level == 1 else 't2s')
-    # def s2t(text):
-    #     return converter.convert(text)
-
-    # 讀取 Excel（僅第一張表）
-    wb = load_workbook(file, data_only=True)
-    sheet = wb.active
-
-    def parse_row(line, line_num):
-        parts = [str(c).strip() if c is not None else "" for c in line]
-        if len(parts) < 2:
-            print(f"⚠️ 第 {line_num} 行欄位不足，跳過：{parts}")
-            return []
-        phon = parts[0]
-        組 = parts[1]
-        if not phon or not 組:
-            print(f"⚠️ 第 {line_num} 行缺音或字，跳過")
-            return []
-        result = []
-        matches = re.findall(r"(.)(?:\{(.*?)\}|\[(.*?)\])?", 組)
-        print(f"🔍 第 {line_num} 行組拆分：{matches}")
-        for 字, 註1, 註2 in matches:
-            註 = 註1 or 註2 or ""
-            print(f"🧩 字：{字}，音：{phon}，註：{註}")
-            result.append((字, phon, 註))
-        return result
-
-    for i, row in enumerate(sheet.iter_rows(values_only=True), start=1):
-        if not row or str(row[0]).startswith("#"):
-            continue
-        parsed = parse_row(row, i)
-        for 字, 音, 註 in parsed:
-            clean_str, mapping = s2t_pro(字, level)
-            mapping = dict(mapping)
-            candidates = mapping.get(字, [字])  # 支援多候選
-
-            for cand in candidates:
-                rows.append([cand, 音, 註])
-                if cand != 字:
-                    simplified_rows.append([cand, 音, 註, "簡"])
-                    print(f"🔁 字形轉換：{字} → {cand}")
+    # 讀取 Excel（僅活動工作表，逐行流式解析）
+    rows = enumerate(iter_xlsx_rows(file, sheet=None), start=1)
 
     outpath = output_path or os.path.splitext(file)[0] + ".tsv"
-    with open(outpath, "w", encoding="utf-8", newline="\n") as out:
-        writer = csv.writer(out, delimiter="\t")
-        writer.writerow(["#漢字", "音標", "解釋"])
-        writer.writerows(rows)
+    count = write_entries(outpath, iter_tiaotiao_entries(rows, level), simplified_rows)
     print(f"✅ 主檔輸出完成：{outpath}")
 
     simp_path = os.path.splitext(file)[0] + ".簡.tsv"
     if simplified_rows:
-        with open(simp_path, "w", encoding="utf-8", newline="\n") as out:
-            writer = csv.writer(out, delimiter="\t")
-            writer.writerow(["#漢字", "音標", "解釋", "繁簡"])
-            writer.writerows(simplified_rows)
+        write_simplified_rows(simp_path, simplified_rows)
         print(f"[簡體] 共發現 {len(simplified_rows)} 筆簡體詞彙，寫入：{simp_path}")
 
-    print(f"🎉 全部處理完成，共 {len(rows)} 條記錄")
-    # print(f"✅ 輸出：{outpath}")
+    print(f"🎉 全部處理完成，共 {count} 條記錄")
 
 
 # ========== 縣志格式處理 ==========
 def process_縣志_excel(file, level=1, output_path=None):
-    # cc = OpenCC('s2t')
-    rows = []
     simplified_rows = []
-    debug = True
-
-    # def s2t(text, level=1):
-    #     return cc.convert(text)
-
-    def process_lines(行):
-        行 = 行.strip()
-        if not 行:
-            return None
-        if 行.startswith("#"):
-            return 行
-        行 = re.sub(r":\[", "\t[", 行)
-        行 = 行.replace("(", "{").replace(")", "}")
-        行 = re.sub(r"\[(\d+)\]", r"［\1］", 行)
-        行 = re.sub(r"［([^\d]+.*?)］", r"[\1]", 行)
-        return 行
 
     ext = os.path.splitext(file)[1].lower()
     if ext in [".xlsx", ".xls"]:
@@ -469,87 +584,64 @@ def process_縣志_excel(file, level=1, output_path=None):
         else:
             raise UnicodeDecodeError("❌ 無法讀取文件，請確認編碼格式")
 
-    total, skipped, simplified_count = 0, 0, 0
-
-    for lineno, line in enumerate(lines, 1):
-        total += 1
-        raw_line = line
-        line = process_lines(line)
-        if line is None:
-            skipped += 1
-            continue
+    stats = {}
+    outpath = output_path or os.path.splitext(file)[0] + ".tsv"
+    write_entries(outpath, iter_xianzhi_entries(lines, level, stats), simplified_rows)
+    print(f"✅ 主檔輸出完成：{outpath}")
 
-        if line.startswith("#漢字"):
-            skipped += 1
-            continue
-        if line.startswith("#"):
-            continue
+    simp_path = os.path.splitext(file)[0] + ".簡.tsv"
+    if simplified_rows:
+        write_simplified_rows(simp_path, simplified_rows)
+        print(f"[簡體] 共發現 {len(simplified_rows)} 筆簡體詞彙，寫入：{simp_path}")
 
-        parts = line.split("\t")
-        if len(parts) < 2:
-            if debug:
-                print(f"⚠️ 跳過行 {lineno}（分欄不足）: {raw_line.strip()}")
-            skipped += 1
-            continue
+    print(f"📊 行數統計：總行數 {stats['total']}, 跳過 {stats['skipped']} 行, 標註簡體 {len(simplified_rows)} 條")
 
-        拼音 = parts[0].strip()
-        for cell in parts[1:]:
-            matches = re.findall(r"[［\[](\d+[a-z]?)[］\]](.+?)(?=([［\[]\d|$))", cell)
-            if not matches:
-                if debug:
-                    print(f"⚠️ 無音節匹配 行 {lineno}: {cell}")
-                continue
 
-            for 調號, 義項, _ in matches:
-                if debug:
-                    print(f"🔎 行 {lineno}：拼音={拼音}, 調號={調號}, 義項={義項}")
+def parse_xianzhi_word_blocks(text):
+    """縣志 word 轉出的文本：「#韻母」行設定當前韻母，其後每行「聲母[調號]字{註}…」"""
+    results = []
+    current_vowel = None  # e.g., 'i', 'u'
 
-                # 逐字掃描義項，若某字後緊跟註釋，就綁定在那個字上
-                i = 0
-                while i < len(義項):
-                    字 = 義項[i]
-                    註 = ""
-                    if i + 1 < len(義項) and 義項[i + 1] in "{｛":
-                        m = re.match(r"[{｛]([^{}｛｝]+)[}｝]", 義項[i + 1:])
-                        if m:
-                            註 = m.group(1)
-                            i += len(m.group(0))  # 跳過整個 {註釋}
-                    i += 1
-                    字 = 字.strip()
-                    if not 字:
-                        if debug:
-                            print(f"⚠️ 空白字 行 {lineno} 義項：{義項}")
-                        continue
-                    clean_str, mapping = s2t_pro(字, level)
-                    mapping = dict(mapping)
-                    candidates = mapping.get(字, [字])  # 支援多候選繁體字
-
-                    音標 = f"{拼音}{調號}"
-                    for cand in candidates:
-                        row = [cand, 音標, 註]
-                        rows.append(row)
-                        if cand != 字:
-                            simplified_rows.append(row + ["簡"])
-                            simplified_count += 1
-                            if debug:
-                                print(f"🔁 字形轉換：{字} → {cand}")
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
 
-    outpath = output_path or os.path.splitext(file)[0] + ".tsv"
-    with open(outpath, "w", encoding="utf-8", newline="\n") as out:
-        writer = csv.writer(out, delimiter="\t")
-        writer.writerow(["#漢字", "音標", "解釋"])
-        writer.writerows(rows)
-    print(f"✅ 主檔輸出完成：{outpath}")
+        if line.startswith("#"):
+            current_vowel = line[1:]
+            continue
 
-    simp_path = os.path.splitext(file)[0] + ".簡.tsv"
-    if simplified_rows:
-        with open(simp_path, "w", encoding="utf-8", newline="\n") as out:
-            writer = csv.writer(out, delimiter="\t")
-            writer.writerow(["#漢字", "音標", "解釋", "繁簡"])
-            writer.writerows(simplified_rows)
-        print(f"[簡體] 共發現 {len(simplified_rows)} 筆簡體詞彙，寫入：{simp_path}")
+        match = XIANZHI_INITIAL_PATTERN.match(line)
+        if not match or not current_vowel:
+            continue
 
-    print(f"📊 行數統計：總行數 {total}, 跳過 {skipped} 行, 標註簡體 {simplified_count} 條")
+        initial = match.group(1).strip()
+        for tone, content in XIANZHI_SEGMENT_PATTERN.findall(line):
+            syllable = f"{initial}{current_vowel}{tone}"
+            chars = []
+            explanations = {}
+            temp = ""
+            in_brace = False
+            current_char = ""
+
+            for c in content:
+                if c == "{":
+                    in_brace = True
+                    temp = ""
+                elif c == "}":
+                    in_brace = False
+                    explanations[current_char] = temp
+                    temp = ""
+                elif in_brace:
+                    temp += c
+                else:
+                    current_char = c
+                    chars.append(c)
+
+            for char in chars:
+                results.append((char, syllable, explanations.get(char, "")))
+
+    return results
 
 
 def process_縣志_word(file, level=1, output_path=None):
@@ -558,161 +650,29 @@ def process_縣志_word(file, level=1, output_path=None):
     with open(tsv_path, encoding="utf-8") as f:
         raw = f.read()
 
-    def parse_entry_blocks(text):
-        results = []
-
-        current_vowel = None  # e.g., 'i', 'u'
-
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-
-            if line.startswith("#"):
-                current_vowel = line[1:]
-                continue
-
-            match = re.match(r"^([^\[]+)", line)
-            if not match or not current_vowel:
-                continue
-
-            initial = match.group(1).strip()
-            segments = re.findall(r"\[(\d+)]([^\[]+)", line)
-
-            for tone, content in segments:
-                syllable = f"{initial}{current_vowel}{tone}"
-                chars = []
-                explanations = {}
-                temp = ""
-                in_brace = False
-                current_char = ""
-
-                for c in content:
-                    if c == "{":
-                        in_brace = True
-                        temp = ""
-                    elif c == "}":
-                        in_brace = False
-                        explanations[current_char] = temp
-                        temp = ""
-                    elif in_brace:
-                        temp += c
-                    else:
-                        current_char = c
-                        chars.append(c)
-
-                for char in chars:
-                    explanation = explanations.get(char, "")
-                    results.append((char, syllable, explanation))
-
-        return results
-    data = parse_entry_blocks(raw)
+    data = parse_xianzhi_word_blocks(raw)
     outpath = output_path or os.path.splitext(file)[0] + ".tsv"
-    df = pd.DataFrame(data, columns=["#漢字", "音標", "解釋"])
+    df = pd.DataFrame(data, columns=TSV_HEADER)
     df.to_csv(outpath, sep="\t", index=False)
-    # print(f"[✅] 轉換完成，輸出路徑：{outpath}")
 
     with open(outpath, encoding="utf-8") as f:
         lines = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
-        # print("lines:",lines)
 
     index = {'漢字': 0, '音標': 1, '解釋': 2}
     print(f"[處理] 開始掃描資料行，共 {len(lines) - 1} 筆")
 
-    delimiters = [';', '；', '/', '、', ',', '，']
-
-    rows = []
     simplified_rows = []
+    write_entries(outpath, iter_yindian_entries(enumerate(lines[1:], start=2), index, level), simplified_rows)
 
-    def split_field(field):
-        for delim in delimiters:
-            field = field.replace(delim, '∥')
-        return [f.strip() for f in field.split('∥') if f.strip()]
-
-    def get_field(parts, field_name):
-        idx = index.get(field_name)
-        if idx is not None and idx < len(parts):
-            return parts[idx].strip()
-        return ""
-
-    def process_pair(word, phon, note, row_num):
-        clean_str, mapping = s2t_pro(word, level)
-        mapping = dict(mapping)
-        phon_units = phon.strip().split()
-        word_len_match = len(word) == len(phon_units)
-
-        if word_len_match:
-            for ch, p in zip(word, phon_units):
-                candidates = mapping.get(ch, [ch])
-                for cand in candidates:
-                    rows.append([cand, p, note])
-                    if cand != ch:
-                        simplified_rows.append([cand, p, note, "簡"])
-                        print(f"[簡體一對多] 第 {row_num} 行：{ch} → {cand}")
-        else:
-            rows.append([clean_str, phon, note])
-            if clean_str != word:
-                simplified_rows.append([clean_str, phon, note, "簡"])
-                print(f"[fallback] 第 {row_num} 行：{word} → {clean_str}")
-
-    print(f"[處理] 開始掃描資料行，共 {len(lines) - 1} 筆")
-
-    for row_num, parts in enumerate(lines[1:], start=2):
-        word_raw = get_field(parts, '漢字')
-        phon_raw = get_field(parts, '音標')
-        note = get_field(parts, '解釋')
-
-        if not word_raw or not phon_raw:
-            continue
-
-        word_list = split_field(word_raw)
-        phon_list = split_field(phon_raw)
-
-        if not word_list or not phon_list:
-            print(f"⚠️ 跳過第 {row_num} 行，因為漢字或音標清單為空")
-            continue
-
-        if len(word_list) > 1 and len(phon_list) > 1:
-            print(f"[笛卡爾積] 第 {row_num} 行：{word_list} × {phon_list}")
-            for word, phon in product(word_list, phon_list):
-                process_pair(word, phon, note, row_num)
-
-        elif len(word_list) > 1 and len(phon_list) == 1:
-            print(f"[多對一] 第 {row_num} 行：{word_list} × {phon_list[0]}")
-            for word in word_list:
-                process_pair(word, phon_list[0], note, row_num)
-
-        elif len(word_list) == 1 and len(phon_list) > 1:
-            print(f"[一對多] 第 {row_num} 行：{word_list[0]} × {phon_list}")
-            for phon in phon_list:
-                process_pair(word_list[0], phon, note, row_num)
-
-        else:
-            word = ''.join(word_list)
-            phon = ' '.join(phon_list)
-            # print(f"[fallback] 第 {row_num} 行：{word} → {phon}")
-            process_pair(word, phon, note, row_num)
-
-    # Step 5: 輸出最終 TSV
-    # final_outpath = output_path or (os.path.splitext(file)[0] + ".tsv")
-    with open(outpath, "w", encoding="utf-8", newline="\n") as out:
-        writer = csv.writer(out, delimiter="\t")
-        writer.writerow(["#漢字", "音標", "解釋"])
-        writer.writerows(rows)
-
-    # Step 6: 輸出簡體資料
     simp_path = os.path.splitext(file)[0] + ".簡.tsv"
     if simplified_rows:
         print(f"[簡體] 共發現 {len(simplified_rows)} 筆簡體詞彙，寫入：{simp_path}")
-        with open(simp_path, "w", encoding="utf-8", newline="\n") as out:
-            writer = csv.writer(out, delimiter="\t")
-            writer.writerow(["#漢字", "音標", "解釋", "繁簡"])
-            writer.writerows(simplified_rows)
+        write_simplified_rows(simp_path, simplified_rows)
 
     print(f"✅ 全部處理完成：{outpath}")
 
 
-def process_縣志(file, level=1, output_path=None):
+def process_縣志(file, level=1, output_path=None, error_log=None):
     ext = os.path.splitext(file)[1].lower()
     if ext in [".xlsx", ".xls"]:
         process_縣志_excel(file, level, output_path)
@@ -1,47 +1,36 @@
 import csv
-import math
 import os
-import re
 
 import pandas as pd
 
-from common.search_tones import search_tones
-from common.constants import col_map, vowel_pattern, TONE_MAP
+from common.search_tones import build_tone_map, load_tone_maps, search_tones, tone_map_for
+from common.constants import col_map, TONE_MAP
+from common.ipa_segmenter import (
+    PLACEHOLDER_HANZI_PATTERN,
+    is_skipped_syllable,
+    parse_syllable,
+)
 from source.match_fromdb import get_tsvs
 
 
-def extract_all_from_files(file_path: str, get_tone: bool = True, preserve_empty_rows: bool = False, query_db_path: str = None) -> pd.DataFrame:
+def extract_all_from_files(file_path: str, get_tone: bool = True, preserve_empty_rows: bool = False, query_db_path: str = None,
+                           shortnames: list = None) -> pd.DataFrame:
     from common.config import QUERY_DB_PATH
 
     # 如果沒有指定 query_db_path，使用默認值
     if query_db_path is None:
         query_db_path = QUERY_DB_PATH
 
-    def build_tone_map_yindian(result):
-        tone_map = {}
-
-        for row in result:
-            total_data = row.get("總數據", [])
-
-            for cell in total_data:
-                if not cell:
-                    continue
-
-                # 提取所有 [tag]字 的形式，如 [1a]陰平、[7B]上陰入
-                cell = re.sub(r'[-/ʔˀ]', '', str(cell))
-                tag_value_pairs = re.findall(r"\[([0-9]{1,2}[a-zA-Z]?)\](?:\d+)?([^\[\],\d]*)", cell)
-
-                for tag, name in tag_value_pairs:
-                    name = name.strip()
-                    if tag and name and tag not in tone_map:
-                        tone_map[tag] = name
-
-        return tone_map
-
     if get_tone:
-        shortname = get_tsvs(single=file_path, query_db_path=query_db_path)[1]
-        result = search_tones(locations=shortname, regions=None, get_raw=True, db_path=query_db_path)
-        tone_map_yindian = build_tone_map_yindian(result)
+        if shortnames is None:
+            shortnames = get_tsvs(single=file_path, query_db_path=query_db_path)[1]
+        tone_maps = load_tone_maps(query_db_path)
+        if tone_maps is not None:
+            tone_map_yindian = tone_map_for(shortnames, tone_maps)
+        else:
+            # 舊的 query 庫沒有 tone_map 表：逐個方言點查詢
+            result = search_tones(locations=shortnames, regions=None, get_raw=True, db_path=query_db_path)
+            tone_map_yindian = build_tone_map(cell for row in result for cell in row.get("總數據", []))
     else:
         tone_map_yindian = TONE_MAP
 
@@ -102,167 +91,43 @@ def extract_all_from_files(file_path: str, get_tone: bool = True, preserve_empty
     # tone_map = tone_map_yindian if "2" in [tone_shi, tone_qiong] else tone_map_jyutping
 
     results = []
-
-    for _, row in df.iterrows():
-        hanzi = row.get("漢字", "").strip()
-        phonetic = row.get("音標", "").strip()
-        note = row.get("解釋", "").strip()
-        if isinstance(phonetic, str):
-            phonetic = phonetic.strip()
-        if not hanzi or not phonetic or phonetic == "0" or hanzi == "0":
+    empty_row = {
+        '汉字': '',
+        '音标': '',
+        '声母': '',
+        '韵母': '',
+        '声调': '',
+        '註釋': ''
+    }
+
+    def column_values(name):
+        return df[name].tolist() if name in df.columns else [""] * len(df)
+
+    for hanzi, phonetic, note in zip(column_values("漢字"), column_values("音標"), column_values("解釋")):
+        hanzi = hanzi.strip()
+        phonetic = phonetic.strip()
+        note = note.strip()
+        if (not hanzi or not phonetic or phonetic == "0" or hanzi == "0"
+                or PLACEHOLDER_HANZI_PATTERN.search(hanzi) or phonetic[0].isdigit()):
             if preserve_empty_rows:
-                results.append({
-                    '汉字': '',
-                    '音标': '',
-                    '声母': '',
-                    '韵母': '',
-                    '声调': '',
-                    '註釋': ''
-                })
-                continue
-            continue
-        if re.search(r"[□■⬜⬛☐☑☒▯▢▣█�]", hanzi):
-            if preserve_empty_rows:
-                results.append({
-                    '汉字': '',
-                    '音标': '',
-                    '声母': '',
-                    '韵母': '',
-                    '声调': '',
-                    '註釋': ''
-                })
-                continue
-            continue
-        if phonetic and (isinstance(phonetic, float) and math.isnan(phonetic)):
-            if preserve_empty_rows:
-                results.append({
-                    '汉字': '',
-                    '音标': '',
-                    '声母': '',
-                    '韵母': '',
-                    '声调': '',
-                    '註釋': ''
-                })
-                continue
-            continue
-        if isinstance(phonetic, str) and phonetic and phonetic[0].isdigit():
-            if preserve_empty_rows:
-                results.append({
-                    '汉字': '',
-                    '音标': '',
-                    '声母': '',
-                    '韵母': '',
-                    '声调': '',
-                    '註釋': ''
-                })
-                continue
+                results.append(dict(empty_row))
             continue
 
         phonetic_variants = phonetic.split("/") if "/" in phonetic and phonetic.strip() != '/' else [phonetic]
 
         for phon in phonetic_variants:
             phon = phon.strip()  # 先清乾淨
-            if not phon:  # 若為空，跳過（這一步是關鍵防炸）
-                continue
-            if re.match(r'^[\d\/?\'"’”、|；：，。:;,.]+$', phon):
+            if is_skipped_syllable(phon):  # 空音節或純數字/標點（這一步是關鍵防炸）
                 continue
 
-            # 提取聲母
-            consonant = ""
-            rhyme_start = 0
-            if phon and phon[0] in {"∅", "Ø"}:
-                consonant = "ʔ"
-            else:
-                if not re.search(vowel_pattern, re.split(r"\d", phon)[0]):
-                    vowel_fallback = r"([ʐɣmnŋɲȵƞʋvʒlḷfzr])"
-                    # if phon[0] in ['l', 'f']:
-                    #     consonant = phon[0]
-                    if re.match(r"^[mn]ŋ", phon):
-                        consonant = phon[0]
-                        rhyme_start = 1
-                    elif re.match(vowel_fallback, phon[0]):
-                        consonant = "/"
-                    elif not re.search(vowel_fallback, phon):
-                        # consonant = f"報錯：{phon}"
-                        consonant = ""
-                    else:
-                        for char in phon:
-                            if re.match(vowel_fallback, char) or re.match(r'\d', char):
-                                break
-                            consonant += char
-                else:
-                    if re.match(vowel_pattern, phon[0]):
-                        consonant = "/"
-                    elif 'j' in phon[1:] or 'ʲ' in phon[1:]:
-                        for char in phon:
-                            if re.match(vowel_pattern, char) or char in ('j', 'ʲ'):
-                                break
-                            consonant += char
-                    else:
-                        for char in phon:
-                            if re.match(vowel_pattern, char):
-                                break
-                            consonant += char
-                consonant = re.sub(r"\d", "", consonant)
-
-            # 韻母提取
-            all_rhymes = []
-            tmp_phon = phon[1:] if phon.startswith(("∅", "Ø")) else phon[rhyme_start:]
-            if 'j' not in tmp_phon[1:] and 'ʲ' not in tmp_phon[1:]:
-                vowel_found = False
-                for c in tmp_phon:
-                    if re.match(vowel_pattern, c) and not vowel_found:
-                        vowel_found = True
-                        all_rhymes.append(c)
-                    elif vowel_found and (c.isdigit() or c.isspace()):
-                        break
-                    elif vowel_found:
-                        all_rhymes.append(c)
-                if not vowel_found and any(c in tmp_phon for c in "ʐzflḷɣmnŋȵɲƞʋvʒr"):
-                    match = re.search(r".*?([ʐzflḷɣrmnŋɲȵƞʋvʒ].*?)(?=\d|\s|$)", tmp_phon)
-                    if match:
-                        all_rhymes += list(match.group(1))
-            else:
-                match = re.search(rf"[{vowel_pattern.strip('[]')}jʲ][^\d\s]*", tmp_phon)
-                if match:
-                    all_rhymes = list(match.group(0))
-
-            rhyme = ''.join(c for c in all_rhymes if not (c.isdigit() or re.match(r'[一-鿿]', c)))
-            for old, new in {
-                'ε': 'ɛ', "α": "ɑ", "ʯ": "ʮ", "∅": "ø", "ο": "o", "ǝ": "ə", "о": "o", "у": "y", "е": "e",
-                "ã": "ã", "ẽ": "ẽ", "ĩ": "ĩ", "ī": "ĩ", "ā": "ã", "ỹ": "ỹ", "õ": "õ", "ʱ": "ʰ", "ˡ": "ʰ"
-            }.items():
-                rhyme = rhyme.replace(old, new)
-
-            for old, new in {
-                '∫': 'ʃ', 'th': 'tʰ', 'kh': 'kʰ', 'ph': 'pʰ',
-                'tsh': 'tsʰ', "ς": "ɕ", 'ts': 'ʦ', 'tʃ': 'ʧ', 'tɕ': 'ʨ',
-                "∨": "v", "ł": "ɬ", "tʰs": "ʦʰ", "(ʔ)": "ʔ", "∅": "ʔ", "Ǿ": "ʔ"
-            }.items():
-                consonant = consonant.replace(old, new)
+            consonant, rhyme, tone_code = parse_syllable(phon)
 
             if not get_tone:
-                results.append({
-                    '汉字': hanzi,
-                    '音标': phon,
-                    '声母': consonant,
-                    '韵母': rhyme,
-                    '声调': '',
-                    '註釋': note
-                })
-                continue
-
-            # 提取聲調
-            if "輕聲" in phon:
+                tone = ''
+            elif tone_code == "輕聲":
                 tone = "輕聲"
             else:
-                tone_match = re.search(r"([A-Da-d0-9]+)", phon[::-1])
-                tone_code = tone_match.group(1) if tone_match else ""
-                if tone_code:
-                    # 使用正則表達式刪除末尾的字母，直到遇到數字
-                    tone_code = re.sub(r'[a-dA-D]+$', '', tone_code)
-                tone_code = tone_code[::-1] if tone_code else ""
-                tone = tone_map.get(tone_code, tone_map.get(tone_code, "未知")) if tone_code else ""
+                tone = tone_map.get(tone_code, "未知") if tone_code else ""
 
             results.append({
                 '汉字': hanzi,
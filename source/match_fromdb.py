@@ -2,16 +2,16 @@ import os
 import sqlite3
 from pathlib import Path
 
-import opencc
 import pandas as pd
 
 from common.config import QUERY_DB_PATH, PROCESSED_DATA_DIR
 from common.constants import custom_variant_dict
+from common.s2t import get_opencc
 
-# 創建全局 OpenCC 實例，避免重複初始化
-converter_s2t = opencc.OpenCC('s2t.json')
-converter_t2s = opencc.OpenCC('t2s.json')
-converter_variant = opencc.OpenCC('tw2sp.json')
+# 進程內共用的轉換服務（首次使用時才載入 OpenCC 詞典，結果記憶化）
+converter_s2t = get_opencc('s2t.json')
+converter_t2s = get_opencc('t2s.json')
+converter_variant = get_opencc('tw2sp.json')
 
 
 # # 建立雙向映射
@@ -21,36 +21,143 @@ converter_variant = opencc.OpenCC('tw2sp.json')
 #     custom_variant_bidict[v] = k
 
 
-def get_tsvs(output_dir=PROCESSED_DATA_DIR, partition_name='全部', single=None, query_db_path=None):
-    def apply_custom_variant(text):
-        for old, new in custom_variant_dict.items():
-            text = text.replace(old, new)
-        return text
+def apply_custom_variant(text):
+    for old, new in custom_variant_dict.items():
+        text = text.replace(old, new)
+    return text
 
-    def resolve_single_strict_match(loc, sort_order_abbr):
+
+class AbbreviationIndex:
+    """
+    query 庫 dialects 表簡稱的匹配索引。
+
+    建立時一次性算好每個簡稱的原文、簡體、繁體、異體、自定義異體鍵，
+    之後 TSV 文件名 → 簡稱的每一步匹配都是字典查找。
+    匹配優先級與 get_tsvs 的逐步匹配完全一致。
+    """
+
+    def __init__(self, abbreviation_df):
+        # 檢查簡稱是否有重複
+        duplicated_abbr = abbreviation_df[abbreviation_df.duplicated(subset=['簡稱'], keep=False)]
+        if not duplicated_abbr.empty:
+            print("[錯誤] 偵測到以下簡稱有重複，請處理後再執行：")
+            print(duplicated_abbr[['簡稱']].drop_duplicates())
+            raise SystemExit("中止執行：發現重複簡稱。")
+
+        abbr_partition_df = abbreviation_df.dropna(subset=["簡稱", "音典分區"])
+        self.sort_order_abbr = abbr_partition_df["簡稱"].tolist()
+        partition_raw = abbr_partition_df["音典分區"].tolist()
+        self.partition_map = {
+            name: (region.split('-')[0] if '-' in region else region)
+            for name, region in zip(self.sort_order_abbr, partition_raw)
+        }
+        self.abbr_set = set(self.sort_order_abbr)
+
+        valid_abbr = [x for x in self.sort_order_abbr if isinstance(x, str) and x]
+
+        # 嚴格匹配用：轉換後的鍵 → 所有命中的簡稱（按排序）
+        valid_simp = converter_t2s.convert_many(valid_abbr)
+        valid_trad = converter_s2t.convert_many(valid_abbr)
+        self.simp_groups = {}
+        self.trad_groups = {}
+        for abbr, abbr_simp, abbr_trad in zip(valid_abbr, valid_simp, valid_trad):
+            self.simp_groups.setdefault(abbr_simp, []).append(abbr)
+            self.trad_groups.setdefault(abbr_trad, []).append(abbr)
+
+        # 逐步匹配用：與原先 zip(sort_order_abbr, 轉換列表) 的取第一個命中保持一致
+        self.trad_first = {}
+        for abbr, abbr_trad in zip(self.sort_order_abbr, valid_trad):
+            self.trad_first.setdefault(abbr_trad, abbr)
+        self.simp_first = {}
+        for abbr, abbr_simp in zip(self.sort_order_abbr, valid_simp):
+            self.simp_first.setdefault(abbr_simp, abbr)
+
+        # 異體 / 自定義異體：字典推導式後者覆蓋前者
+        self.variant_map = dict(zip(converter_variant.convert_many(valid_abbr), valid_abbr))
+        self.custom_map = {apply_custom_variant(abbr): abbr for abbr in valid_abbr}
+
+    @classmethod
+    def from_db(cls, query_db_path=None):
+        db_path = query_db_path if query_db_path else QUERY_DB_PATH
+        with sqlite3.connect(db_path) as conn:
+            abbreviation_df = pd.read_sql_query("SELECT 簡稱, 音典分區 FROM dialects", conn)
+        return cls(abbreviation_df)
+
+    def resolve_strict(self, loc):
+        """原文 / 簡體 / 繁體 唯一命中才返回簡稱，否則 None"""
         if not isinstance(loc, str) or not loc:
             return None
 
-        exact_matches = [abbr for abbr in sort_order_abbr if abbr == loc]
-        if len(exact_matches) == 1:
-            return exact_matches[0]
+        if loc in self.abbr_set:
+            return loc
 
-        simp_matches = [
-            abbr for abbr in sort_order_abbr
-            if isinstance(abbr, str) and abbr and converter_t2s.convert(abbr) == converter_t2s.convert(loc)
-        ]
+        simp_matches = self.simp_groups.get(converter_t2s.convert(loc), [])
         if len(simp_matches) == 1:
             return simp_matches[0]
 
-        trad_matches = [
-            abbr for abbr in sort_order_abbr
-            if isinstance(abbr, str) and abbr and converter_s2t.convert(abbr) == converter_s2t.convert(loc)
-        ]
+        trad_matches = self.trad_groups.get(converter_s2t.convert(loc), [])
         if len(trad_matches) == 1:
             return trad_matches[0]
 
         return None
 
+    def resolve(self, loc):
+        """
+        依次嘗試：原文 → 簡轉繁一致 → 轉簡體一致 → 異體簡化 → 自定義異體。
+        返回 (簡稱, 步驟號)，無匹配時返回 (None, None)。
+        """
+        if not isinstance(loc, str) or not loc:
+            return None, None
+
+        if loc in self.abbr_set:
+            return loc, 1
+
+        abbr = self.trad_first.get(loc)
+        if abbr is not None:
+            return abbr, 2
+
+        abbr = self.simp_first.get(converter_t2s.convert(loc))
+        if abbr is not None:
+            return abbr, 3
+
+        abbr = self.variant_map.get(converter_variant.convert(loc))
+        if abbr is not None:
+            return abbr, 4
+
+        abbr = self.custom_map.get(apply_custom_variant(loc))
+        if abbr is not None:
+            return abbr, 5
+
+        return None, None
+
+
+_abbreviation_index_cache = {}
+
+
+def get_abbreviation_index(query_db_path=None):
+    """
+    取得 query 庫的簡稱索引，同一進程內按數據庫路徑緩存；
+    數據庫文件被重寫（mtime/大小變化）後自動重建。
+    """
+    db_path = os.path.abspath(query_db_path if query_db_path else QUERY_DB_PATH)
+    try:
+        stat = os.stat(db_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+
+    cached = _abbreviation_index_cache.get(db_path)
+    if cached is not None and signature is not None and cached[0] == signature:
+        return cached[1]
+
+    index = AbbreviationIndex.from_db(db_path)
+    if signature is not None:
+        _abbreviation_index_cache[db_path] = (signature, index)
+    return index
+
+
+def get_tsvs(output_dir=PROCESSED_DATA_DIR, partition_name='全部', single=None, query_db_path=None,
+             abbreviation_index=None):
     # Use the Path object for the directory
     output_dir = Path(output_dir)
     if single:
@@ -76,31 +183,14 @@ def get_tsvs(output_dir=PROCESSED_DATA_DIR, partition_name='全部', single=None
     original_locations = list(name_to_path.keys())
     # print(f"[調試] 自動載入的原始地點：{original_locations}")
 
-    # === 從資料庫讀取簡稱表 ===
-    db_path = query_db_path if query_db_path else QUERY_DB_PATH
-    with sqlite3.connect(db_path) as conn:
-        abbreviation_df = pd.read_sql_query("SELECT 簡稱, 音典分區 FROM dialects", conn)
-
-    # print(f"[調試] 載入的簡稱數量：{len(abbreviation_df)}")
-
-    # 檢查簡稱是否有重複
-    duplicated_abbr = abbreviation_df[abbreviation_df.duplicated(subset=['簡稱'], keep=False)]
-    if not duplicated_abbr.empty:
-        print("[錯誤] 偵測到以下簡稱有重複，請處理後再執行：")
-        print(duplicated_abbr[['簡稱']].drop_duplicates())
-        raise SystemExit("中止執行：發現重複簡稱。")
-
-    abbr_partition_df = abbreviation_df.dropna(subset=["簡稱", "音典分區"])
-    sort_order_abbr = abbr_partition_df["簡稱"].tolist()
-    partition_raw = abbr_partition_df["音典分區"].tolist()
-    partition_map = {
-        name: (region.split('-')[0] if '-' in region else region)
-        for name, region in zip(sort_order_abbr, partition_raw)
-    }
+    # === 簡稱索引（同一次運行內共用，不再逐個文件讀庫） ===
+    index = abbreviation_index if abbreviation_index is not None else get_abbreviation_index(query_db_path)
+    sort_order_abbr = index.sort_order_abbr
+    partition_map = index.partition_map
 
     if single:
         single_name = original_locations[0]
-        strict_match = resolve_single_strict_match(single_name, sort_order_abbr)
+        strict_match = index.resolve_strict(single_name)
         if strict_match is not None:
             current_partition = partition_map.get(strict_match, '')
             if partition_name.strip() != "全部":
@@ -110,9 +200,6 @@ def get_tsvs(output_dir=PROCESSED_DATA_DIR, partition_name='全部', single=None
                     return [str(Path(single))], [], []
             return [str(Path(single))], [strict_match], [current_partition]
 
-    # 使用全局的 OpenCC 實例（已在模塊級別初始化）
-
-    unmatched_locations_step1 = []
     # 篩選分區處理
     partition_filter_set = None
     if partition_name.strip() != "全部":
@@ -122,93 +209,23 @@ def get_tsvs(output_dir=PROCESSED_DATA_DIR, partition_name='全部', single=None
 
     matched_abbr_to_path = {}  # abbr -> tsv_path
 
-    # Step 1: 匹配原始名稱
-    for loc in original_locations:
-        if loc in sort_order_abbr:
-            matched_abbr_to_path[loc] = name_to_path[loc]  # 立刻將路徑對應
-            # print(f"Step1 匹配：{loc} -> 簡簿 => {name_to_path[loc]}")
-        else:
-            unmatched_locations_step1.append(loc)
-
-    # Step 1.5: 優先處理簡繁完全一致匹配，避免帶年份/前綴的條目被寬鬆規則誤命中
-    sort_order_abbr_trad = [
-        converter_s2t.convert(x) for x in sort_order_abbr
-        if isinstance(x, str) and x  # 確保是非空字符串
-    ]
-    unmatched_locations_step2 = []
-    for loc in unmatched_locations_step1:
-        # print(f"Step2 檢查：{loc}")  # 調試輸出
-        if not isinstance(loc, str) or not loc:
-            unmatched_locations_step2.append(loc)
-            continue
-        for abbr, abbr_trad in zip(sort_order_abbr, sort_order_abbr_trad):
-            if loc == abbr_trad:
-                matched_abbr_to_path[abbr] = name_to_path[loc]  # 使用原始檔名對應到簡稱
-                # print(f"Step2 匹配：{abbr} -> 簡轉繁 => {loc} => {name_to_path[loc]}")  # ✅
-                break
-        else:
-            unmatched_locations_step2.append(loc)
-
-    # Step 3: 簡轉簡體匹配
-    sort_order_abbr_simp = [
-        converter_t2s.convert(x) for x in sort_order_abbr
-        if isinstance(x, str) and x  # 確保是非空字符串
-    ]
-    unmatched_locations_step3 = []
-    for loc in unmatched_locations_step2:
-        # print(f"Step3 檢查：{loc}")  # 調試輸出
-        if not isinstance(loc, str) or not loc:
-            unmatched_locations_step3.append(loc)
-            continue
-        loc_simp = converter_t2s.convert(loc)
-        for abbr, abbr_simp in zip(sort_order_abbr, sort_order_abbr_simp):
-            if loc_simp == abbr_simp:
-                matched_abbr_to_path[abbr] = name_to_path[loc]  # 使用原始檔名對應到簡稱
-                # print(f"Step3 匹配：{loc}(轉簡體) -> 簡簿(轉簡體) => {abbr} => {name_to_path[loc]}")  # ✅
-                break
-        else:
-            unmatched_locations_step3.append(loc)
-
-    # Step 4: 異體字簡化匹配
-    abbr_variant_map = {
-        converter_variant.convert(abbr): abbr
-        for abbr in sort_order_abbr
-        if isinstance(abbr, str) and abbr  # 確保是非空字符串
-    }
-    unmatched_locations_step4 = []
-    for loc in unmatched_locations_step3:
-        # print(f"Step4 檢查：{loc}")  # 調試輸出
-        if not isinstance(loc, str) or not loc:
-            unmatched_locations_step4.append(loc)
-            continue
-        loc_var = converter_variant.convert(loc)
-        if loc_var in abbr_variant_map:
-            abbr = abbr_variant_map[loc_var]
-            matched_abbr_to_path[abbr] = name_to_path[loc]
-            # print(f"Step4 匹配：{loc}(異體簡化為 {loc_var}) -> 簡簿(異體簡化) => {abbr} => {name_to_path[loc]}")
-        else:
-            unmatched_locations_step4.append(loc)
-
-    # Step 5: 自定義異體字匹配
-    abbr_custom_map = {
-        apply_custom_variant(abbr): abbr
-        for abbr in sort_order_abbr
-        if isinstance(abbr, str) and abbr  # 確保是非空字符串
-    }
-    unmatched_locations = []
-    for loc in unmatched_locations_step4:
-        # print(f"Step5 檢查：{loc}")  # 調試輸出
-        if not isinstance(loc, str) or not loc:
-            unmatched_locations.append(loc)
-            continue
-        loc_custom = apply_custom_variant(loc)
-        if loc_custom in abbr_custom_map:
-            abbr = abbr_custom_map[loc_custom]
-            matched_abbr_to_path[abbr] = name_to_path[loc]
-            # print(f"Step5 匹配：{loc}(自定義轉為 {loc_custom}) -> 簡簿(自定義) => {abbr} => {name_to_path[loc]}")
-        else:
-            unmatched_locations.append(loc)
-            # print(f"未匹配：{loc}(自定義轉為 {loc_custom})")  # 調試輸出
+    # Step 1~5: 原文 → 簡轉繁 → 轉簡體 → 異體簡化 → 自定義異體
+    # 按步驟順序寫入 matched_abbr_to_path，多個文件命中同一簡稱時的覆蓋順序與逐步匹配一致
+    # 文件名批量預轉換，之後的逐個匹配（含 Step 6 的五重轉換）都是緩存命中
+    for converter in (converter_s2t, converter_t2s, converter_variant):
+        converter.convert_many(original_locations)
+    pending = list(original_locations)
+    resolved = {loc: index.resolve(loc) for loc in pending}
+    for step in range(1, 6):
+        still_pending = []
+        for loc in pending:
+            abbr, matched_step = resolved[loc]
+            if matched_step == step:
+                matched_abbr_to_path[abbr] = name_to_path[loc]
+            else:
+                still_pending.append(loc)
+        pending = still_pending
+    unmatched_locations = pending
 
     # Step 6: 按順序處理匹配結果
     sorted_matched = [
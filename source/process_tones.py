@@ -4,6 +4,7 @@ import re
 import pandas as pd
 
 from common.config import APPEND_PATH, PROCESSED_DATA_DIR, WRITE_ERROR_LOG
+from common.workbook_cache import read_excel_cached
 
 
 def extract_tone_maps(shortname: str, dialect_excel=APPEND_PATH):
@@ -12,7 +13,7 @@ def extract_tone_maps(shortname: str, dialect_excel=APPEND_PATH):
     tone_bian = {}  # 其他調、輕聲（[9], [10]）
 
     try:
-        df = pd.read_excel(dialect_excel)
+        df = read_excel_cached(dialect_excel)
     except Exception as e:
         print(f"❗ 無法讀取 {dialect_excel}：{e}")
         return {}, {}, {}
@@ -68,11 +69,12 @@ def extract_tone_maps(shortname: str, dialect_excel=APPEND_PATH):
     return tone
 
 
-def convert_tones(tone: dict, shortname: str):
+def convert_tones(tone: dict, shortname: str, error_log=None):
+    error_log = error_log or WRITE_ERROR_LOG
     tsv_file_path = os.path.join(PROCESSED_DATA_DIR, f"{shortname}.tsv")
     if not os.path.exists(tsv_file_path):
         print(f"错误：找不到文件 {tsv_file_path}")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write(f"❌ [{shortname}] 找不到文件 {tsv_file_path}\t【process_tones->convert_tones】\n")
         return
 
@@ -80,7 +82,7 @@ def convert_tones(tone: dict, shortname: str):
 
     if '#漢字' not in tsv_df.columns or '音標' not in tsv_df.columns:
         print("错误：文件缺少必要的 '#漢字' 或 '音標' 列！")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write(f"❌ [{shortname}] 缺少 #漢字 或 音標\t【process_tones->convert_tones】\n")
         return
 
@@ -128,7 +130,7 @@ def convert_tones(tone: dict, shortname: str):
             return new_ipa
         else:
             print(f"[DEBUG] 未匹配：{ipa}")
-            with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+            with open(error_log, "a", encoding="utf-8") as f:
                 f.write(f"⚠️ [{shortname}] 未匹配音標：{ipa}\t【process_tones->convert_tones】\n")
             return ipa  # ❗保留原音標
 
@@ -148,11 +150,12 @@ def convert_tones(tone: dict, shortname: str):
     return tsv_df
 
 
-def tone_jyut2yindian(shortname: str):
+def tone_jyut2yindian(shortname: str, error_log=None):
+    error_log = error_log or WRITE_ERROR_LOG
     tsv_file_path = os.path.join(PROCESSED_DATA_DIR, f"{shortname}.tsv")
     if not os.path.exists(tsv_file_path):
         print(f"错误：找不到文件 {tsv_file_path}")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write(f"❌ [{shortname}] 找不到文件 {tsv_file_path}\t【process_tones->tone_jyut2yindian】\n")
         return
 
@@ -160,7 +163,7 @@ def tone_jyut2yindian(shortname: str):
 
     if '#漢字' not in tsv_df.columns or '音標' not in tsv_df.columns:
         print("错误：文件缺少必要的 '#漢字' 或 '音標' 列！")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write(f"❌ [{shortname}] 缺少 #漢字 或 音標\t【process_tones->tone_jyut2yindian】\n")
         return
 
@@ -259,7 +262,7 @@ def tone_jyut2yindian(shortname: str):
     # 輸出錯誤紀錄
     if error_logs:
         os.makedirs("data", exist_ok=True)
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write("\n".join(error_logs))
-        print(f"⚠️ 錯誤紀錄已寫入：{WRITE_ERROR_LOG}（共 {len(error_logs)} 條）")
+        print(f"⚠️ 錯誤紀錄已寫入：{error_log}（共 {len(error_logs)} 條）")
 
@@ -0,0 +1,236 @@
+"""
+把生成的數據庫發佈給後端（藍綠切換）。
+
+構建流程會就地改寫 data/ 下的數據庫（to_sql 覆蓋表、DROP + RENAME 等），
+後端不能直接讀這些文件。發佈時：
+    1. 用 VACUUM INTO 把每個庫的一致快照寫入 data/releases/.<版本>.partial/
+    2. 在副本上做 integrity_check 和 ANALYZE，切換到 WAL 並預先生成 -wal / -shm 文件
+    3. 全部通過後把目錄改名為 data/releases/<版本>/，再原子替換 data/current 符號鏈接
+後端只讀 data/current/*.db，只會看到上一個或下一個完整版本。
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+from common.config import (
+    CHARACTERS_DB_PATH,
+    CURRENT_RELEASE_PATH,
+    DIALECTS_DB_ADMIN_PATH,
+    DIALECTS_DB_USER_PATH,
+    KEEP_RELEASES,
+    QUERY_DB_ADMIN_PATH,
+    QUERY_DB_USER_PATH,
+    RELEASES_DIR,
+)
+
+PUBLISH_DB_PATHS = (
+    QUERY_DB_ADMIN_PATH,
+    DIALECTS_DB_ADMIN_PATH,
+    QUERY_DB_USER_PATH,
+    DIALECTS_DB_USER_PATH,
+    CHARACTERS_DB_PATH,
+)
+RELEASE_MANIFEST = "release.json"
+PARTIAL_PREFIX = "."
+PARTIAL_SUFFIX = ".partial"
+
+
+def enable_wal_files(db_path, mode=0o777):
+    """
+    把數據庫切換到 WAL，並預先生成 .db-wal 和 .db-shm（空文件），設好權限。
+    後端進程往往沒有在目錄中創建文件的權限，需要這兩個文件事先存在。
+    最後一個連接關閉時 SQLite 會刪掉 -wal / -shm，所以在關閉之後再創建：
+    空的 -wal 即沒有未合併的幀，-shm 會在第一個連接打開時重新初始化。
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    for path in (db_path + "-wal", db_path + "-shm"):
+        if not os.path.exists(path):
+            open(path, "wb").close()
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        os.chmod(path, mode)
+
+
+def _snapshot_database(src_path, dest_path, vacuum=True):
+    """
+    寫出 src_path 的一致快照。vacuum=True 時用 VACUUM INTO，複製的同時整理碎片；
+    否則用在線備份接口按頁複製。兩者都在讀事務中進行，不受構建進程同時寫入的影響。
+    """
+    src = sqlite3.connect(src_path)
+    try:
+        if vacuum:
+            src.execute("VACUUM INTO ?", (dest_path,))
+        else:
+            dest = sqlite3.connect(dest_path)
+            src.backup(dest)
+            dest.close()
+    finally:
+        src.close()
+
+
+def _check_and_analyze(db_path):
+    """
+    integrity_check 通過後執行 ANALYZE，為查詢規劃器生成統計信息。
+
+    Returns:
+        list: integrity_check 報告的問題，空列表表示通過
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if problems == ["ok"]:
+            conn.execute("ANALYZE")
+            conn.commit()
+            return []
+        return problems
+    finally:
+        conn.close()
+
+
+def _release_dirs(releases_dir):
+    """已完成的發佈版本目錄名（按版本號即時間順序）"""
+    if not os.path.isdir(releases_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(releases_dir)
+        if not name.startswith(PARTIAL_PREFIX) and os.path.isdir(os.path.join(releases_dir, name))
+    )
+
+
+def current_release(current_path=CURRENT_RELEASE_PATH):
+    """當前服務版本的目錄（絕對路徑），還沒有發佈過時返回 None"""
+    if not os.path.lexists(current_path):
+        return None
+    return os.path.realpath(current_path)
+
+
+def _new_version(releases_dir):
+    base = time.strftime("%Y%m%d-%H%M%S")
+    version, n = base, 1
+    while os.path.exists(os.path.join(releases_dir, version)):
+        n += 1
+        version = f"{base}-{n}"
+    return version
+
+
+def _switch_current(release_dir, current_path):
+    """
+    讓 current_path 指向 release_dir：先建臨時符號鏈接，再 os.replace 覆蓋，整個切換是原子的。
+    系統不允許創建符號鏈接時（如未開啟開發者模式的 Windows），退回為逐個 .db 文件替換。
+    """
+    parent = os.path.dirname(os.path.abspath(current_path))
+    target = os.path.relpath(release_dir, parent)
+    tmp_link = os.path.join(parent, f"{PARTIAL_PREFIX}{os.path.basename(current_path)}{PARTIAL_SUFFIX}")
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+
+    if not os.path.isdir(current_path) or os.path.islink(current_path):
+        try:
+            os.symlink(target, tmp_link, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            pass
+        else:
+            os.replace(tmp_link, current_path)
+            return True
+
+    print(f"⚠️ 無法使用符號鏈接，改為逐個替換 {current_path} 下的數據庫文件（單個文件的替換仍是原子的）")
+    os.makedirs(current_path, exist_ok=True)
+    for name in os.listdir(release_dir):
+        if not name.endswith(".db"):
+            continue
+        tmp_path = os.path.join(current_path, f"{PARTIAL_PREFIX}{name}{PARTIAL_SUFFIX}")
+        shutil.copy2(os.path.join(release_dir, name), tmp_path)
+        os.replace(tmp_path, os.path.join(current_path, name))
+        for suffix in ("-wal", "-shm"):
+            if not os.path.exists(os.path.join(current_path, name + suffix)):
+                shutil.copy2(os.path.join(release_dir, name + suffix), os.path.join(current_path, name + suffix))
+    return False
+
+
+def _prune_releases(releases_dir, keep, protect):
+    """只保留最近 keep 個版本，protect 中的目錄（當前 / 上一個服務版本）不刪；順帶清掉中斷的發佈留下的臨時目錄"""
+    for name in os.listdir(releases_dir):
+        if name.startswith(PARTIAL_PREFIX) and name.endswith(PARTIAL_SUFFIX):
+            shutil.rmtree(os.path.join(releases_dir, name), ignore_errors=True)
+
+    removed = []
+    for name in _release_dirs(releases_dir)[:-max(keep, 1)]:
+        path = os.path.join(releases_dir, name)
+        if os.path.realpath(path) in protect:
+            continue
+        shutil.rmtree(path)
+        removed.append(name)
+    return removed
+
+
+def publish_databases(db_paths=PUBLISH_DB_PATHS, releases_dir=RELEASES_DIR, current_path=CURRENT_RELEASE_PATH,
+                      keep=KEEP_RELEASES, vacuum=True):
+    """
+    把 db_paths 發佈為一個新版本並切換 current_path。
+    源文件不存在時沿用當前版本中的同名庫，保證每個版本都是完整的一套。
+    任何一個庫的完整性檢查失敗都不會切換，舊版本繼續服務。
+
+    Returns:
+        str: 新版本目錄；檢查失敗或沒有可發佈的數據庫時返回 None
+    """
+    os.makedirs(releases_dir, exist_ok=True)
+    previous = current_release(current_path)
+    version = _new_version(releases_dir)
+    partial_dir = os.path.join(releases_dir, f"{PARTIAL_PREFIX}{version}{PARTIAL_SUFFIX}")
+    release_dir = os.path.join(releases_dir, version)
+    os.makedirs(partial_dir)
+
+    print(f"📦 發佈數據庫版本：{version}")
+    manifest = {"version": version, "created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "databases": {}}
+    try:
+        for src_path in db_paths:
+            name = os.path.basename(src_path)
+            if not os.path.exists(src_path):
+                fallback = os.path.join(previous, name) if previous else None
+                if not fallback or not os.path.exists(fallback):
+                    print(f"  ⏭️  {name}：不存在，跳過")
+                    continue
+                print(f"  ⚠️ {name}：源文件不存在，沿用當前版本")
+                src_path = fallback
+
+            start = time.time()
+            dest_path = os.path.join(partial_dir, name)
+            _snapshot_database(src_path, dest_path, vacuum=vacuum)
+            problems = _check_and_analyze(dest_path)
+            if problems:
+                print(f"  ❌ {name} 完整性檢查失敗，取消發佈：")
+                for problem in problems[:20]:
+                    print(f"     {problem}")
+                shutil.rmtree(partial_dir)
+                return None
+            enable_wal_files(dest_path)
+            size = os.path.getsize(dest_path)
+            manifest["databases"][name] = {"source": os.path.abspath(src_path), "size": size}
+            print(f"  ✅ {name}：{size / 1024 / 1024:.1f} MB，{time.time() - start:.2f}秒")
+
+        if not manifest["databases"]:
+            print("⚠️ 沒有可發佈的數據庫")
+            shutil.rmtree(partial_dir)
+            return None
+
+        with open(os.path.join(partial_dir, RELEASE_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(partial_dir, release_dir)
+    except BaseException:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+
+    linked = _switch_current(release_dir, current_path)
+    print(f"🔀 {current_path} → {release_dir}" + ("" if linked else "（逐文件替換）"))
+
+    protect = {os.path.realpath(release_dir)}
+    if previous:
+        protect.add(previous)
+    removed = _prune_releases(releases_dir, keep, protect)
+    if removed:
+        print(f"🧹 已刪除舊版本：{removed}")
+    return release_dir
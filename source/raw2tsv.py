@@ -1,14 +1,24 @@
-import os
+import contextlib
 import glob
+import hashlib
+import io
+import json
+import logging
+import os
 import re
+import tempfile
+import time
 import tkinter as tk
+from concurrent.futures import ProcessPoolExecutor
 from tkinter import filedialog
-import pandas as pd
 
+import source.format_convert as format_convert
 from source.convert_jyut import process_yutping_file, build_replace_table
 from source.format_convert import process_音典, process_跳跳老鼠, process_縣志
 from source.process_tones import extract_tone_maps, convert_tones, tone_jyut2yindian
-from common.config import APPEND_PATH, RAW_DATA_DIR, PROCESSED_DATA_DIR, WRITE_ERROR_LOG
+from common.config import APPEND_PATH, RAW_DATA_DIR, PROCESSED_DATA_DIR, WRITE_ERROR_LOG, CONVERT_MANIFEST_PATH
+from common.stream_reader import read_sheet_headers, rewrite_xlsx_header
+from common.workbook_cache import read_excel_cached
 
 # 處理函數定義
 format_handlers = {
@@ -20,7 +30,17 @@ format_handlers = {
 
 # 讀取 Append_files.xlsx.xlsx
 dialect_path = APPEND_PATH
-df_meta = pd.read_excel(dialect_path)
+df_meta = read_excel_cached(dialect_path)
+
+# 粵拼 → IPA 替換表只依賴常量，整個進程共用一份
+_replace_table = None
+
+
+def get_replace_table():
+    global _replace_table
+    if _replace_table is None:
+        _replace_table = build_replace_table()
+    return _replace_table
 
 
 def get_simplified_level(name, simplified_setting):
@@ -55,9 +75,9 @@ def process_columns_name(file, col_letters):
     """
     print(f"[音典列名] 處理 {file}，使用設定：{col_letters}")
     try:
-        df = pd.read_excel(file, sheet_name=None)  # 讀取所有工作表
-        for sheet_name, sheet_df in df.items():
-            header = sheet_df.columns.tolist()
+        # 只解析各工作表的表頭行，不載入數據
+        for sheet_name, header_row in read_sheet_headers(file).items():
+            header = [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(header_row)]
             print(f"[DEBUG] Sheet「{sheet_name}」原表頭：{header}")
 
             # 根據括號判斷是否為粵拼列
@@ -99,6 +119,7 @@ def process_columns_name(file, col_letters):
 
             # 建立重命名對應
             rename_map = {}
+            new_names = {}
             for i, new_name in enumerate(target_names):
                 letter = letters[i]
                 if letter.isalpha() and len(letter) == 1:
@@ -106,6 +127,7 @@ def process_columns_name(file, col_letters):
                     if 0 <= idx < len(header):
                         old_name = header[idx]
                         rename_map[old_name] = new_name
+                        new_names[idx] = new_name
                         print(f"[DEBUG] 欄位重命名：{letter} → 第 {idx + 1} 欄（{old_name} → {new_name}）")
                     else:
                         print(f"[WARNING] 字母 {letter} 超出欄位範圍（共 {len(header)} 欄）")
@@ -114,9 +136,7 @@ def process_columns_name(file, col_letters):
 
             # 寫入結果
             if rename_map:
-                new_df = sheet_df.rename(columns=rename_map)
-                with pd.ExcelWriter(file, mode='a', if_sheet_exists='replace', engine='openpyxl') as writer:
-                    new_df.to_excel(writer, sheet_name=sheet_name, index=False)
+                rewrite_xlsx_header(file, sheet_name, new_names)
                 print(f"🛠️ {os.path.basename(file)} 中 Sheet「{sheet_name}」已重命名欄位：{rename_map}")
             break  # 只處理第一個符合的 sheet
     except Exception as e:
@@ -183,17 +203,18 @@ def build_config_map(meta_df):
     }
 
 
-def process_single_file(file, shortname, config, output_folder):
+def process_single_file(file, shortname, config, output_folder, error_log=None):
     """
-    處理單個文件
+    處理單個文件，錯誤紀錄追加到 error_log（默認 WRITE_ERROR_LOG）
     """
+    error_log = error_log or WRITE_ERROR_LOG
     basename = os.path.basename(file)
     file_format = config["format_map"].get(shortname)
     pinyin_setting = config["pinyin_setting"].get(shortname, "")
 
     if file_format not in format_handlers:
         print(f"❌ 找不到對應處理函數：「{file_format}」，略過 {shortname}")
-        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+        with open(error_log, "a", encoding="utf-8") as f:
             f.write(f"❌ [{shortname}] 找不到對應處理函數：「{file_format}」\n")
         return
 
@@ -207,8 +228,7 @@ def process_single_file(file, shortname, config, output_folder):
     # 如果設定指定處理粵拼欄位，則進行 IPA 轉換
     if pinyin_setting in ["粵拼", "粤拼"]:
         print(f"🔧 檢測到拼音欄位設定為 {pinyin_setting}，執行 粵拼轉IPA 處理...")
-        replace_df = build_replace_table()
-        process_yutping_file(file, replace_df, convert_tone=False, debug=True)
+        process_yutping_file(file, get_replace_table(), convert_tone=False, debug=True)
 
     output_path = os.path.join(output_folder, f"{shortname}.tsv")
     level = get_simplified_level(shortname, config["simplified_setting"])
@@ -216,7 +236,7 @@ def process_single_file(file, shortname, config, output_folder):
     # ✅ 第一步：先處理格式並輸出 .tsv
     print(f"🚀 處理文件：{basename}，格式：{file_format}")
     func = format_handlers[file_format]
-    func(file, level, output_path)
+    func(file, level, output_path, error_log=error_log)
 
     # ✅ 第二步：處理 tone 替換
     if config["tone_setting"].get(shortname) == "☑":
@@ -226,7 +246,7 @@ def process_single_file(file, shortname, config, output_folder):
         print("🎯 tone_ru =", tone["ru"])
         print("🎯 tone_bian =", tone["bian"])
 
-        converted_df = convert_tones(tone, shortname)
+        converted_df = convert_tones(tone, shortname, error_log=error_log)
         # print(converted_df)
         if not converted_df.empty:
             print("✅ 轉換結果預覽：")
@@ -237,37 +257,197 @@ def process_single_file(file, shortname, config, output_folder):
     # ⭐ 粵拼轉 yindian tone（只在 tone_setting 為 ☑ 且 pinyin_setting 是 粵拼）
     if config["tone_setting"].get(shortname) == "☐" and config["pinyin_setting"].get(shortname) in ["粵拼", "粤拼"]:
         print(f"🎼 進行粵拼調號轉換為 Yindian：{shortname}")
-        tone_jyut2yindian(shortname)
+        tone_jyut2yindian(shortname, error_log=error_log)
+
+
+def _config_fingerprints(meta_df):
+    """簡稱 → 補充表中該簡稱所有行的內容哈希（字表格式、繁簡、調值欄等任一變化都會改變）"""
+    rows_by_abbr = {}
+    for row in meta_df.to_dict("records"):
+        rows_by_abbr.setdefault(row.get("簡稱"), []).append({str(k): str(v) for k, v in row.items()})
+    return {
+        abbr: hashlib.sha1(json.dumps(rows, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        for abbr, rows in rows_by_abbr.items()
+    }
+
+
+def load_convert_manifest(manifest_path=None):
+    manifest_path = manifest_path or CONVERT_MANIFEST_PATH
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_convert_manifest(manifest, manifest_path=None):
+    manifest_path = manifest_path or CONVERT_MANIFEST_PATH
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _source_stat(file):
+    """來源文件的 [大小, mtime_ns]，記入轉換清單"""
+    stat = os.stat(file)
+    return [stat.st_size, stat.st_mtime_ns]
 
 
-def convert_all_to_tsv():
+def is_conversion_up_to_date(shortname, file, output_path, fingerprint, manifest):
+    """輸出 TSV 存在，且來源文件（路徑、大小、修改時間）與配置行都與上次成功轉換時相同"""
+    entry = manifest.get(shortname)
+    if not entry or not os.path.exists(output_path):
+        return False
+    if entry.get("source") != os.path.abspath(file) or entry.get("config") != fingerprint:
+        return False
+    return entry.get("source_stat") == _source_stat(file)
+
+
+def _slice_config(config, shortname):
+    """只把該簡稱的配置傳給子進程"""
+    return {key: {shortname: mapping.get(shortname)} for key, mapping in config.items()}
+
+
+def convert_file_group(tasks):
+    """
+    子進程入口：依次轉換共用同一來源文件的方言點（來源文件可能被就地改寫，不能並行）。
+    每個方言點的終端輸出與錯誤紀錄分別收集，由主進程按配置順序輸出。
+
+    Returns:
+        list: [(簡稱, 終端輸出, 錯誤紀錄, 是否生成輸出), ...]
+    """
+    results = []
+    for shortname, file, config, output_folder in tasks:
+        fd, log_path = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        output_path = os.path.join(output_folder, f"{shortname}.tsv")
+        started = time.time()
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                process_single_file(file, shortname, config, output_folder, error_log=log_path)
+            with open(log_path, encoding="utf-8") as f:
+                errors = f.read()
+        finally:
+            os.remove(log_path)
+        produced = os.path.exists(output_path) and os.path.getmtime(output_path) >= started - 1
+        results.append((shortname, buffer.getvalue(), errors, produced))
+    return results
+
+
+def convert_all_to_tsv(jobs=1, force=False):
+    """
+    把補充表中「已做」的原始字表轉為 processed/*.tsv。
+
+    Args:
+        jobs: >1 時以進程池並行轉換；錯誤紀錄仍按補充表順序寫入 WRITE_ERROR_LOG
+        force: 忽略轉換清單，全部重新轉換
+    """
     data_folder = RAW_DATA_DIR
     output_folder = PROCESSED_DATA_DIR
     os.makedirs(output_folder, exist_ok=True)
 
-    meta_df = pd.read_excel(APPEND_PATH)
+    # 未經 build.py 設定時，逐行日誌按 INFO 級輸出到終端
+    if not format_convert.logger.handlers:
+        format_convert.set_row_log_level(logging.INFO)
+
+    meta_df = read_excel_cached(APPEND_PATH)
     config = build_config_map(meta_df)
     matched_files = match_files_from_excel(meta_df, data_folder)
+    fingerprints = _config_fingerprints(meta_df)
+    manifest = {} if force else load_convert_manifest()
     # 🔽 一開始就清空錯誤紀錄
     with open(WRITE_ERROR_LOG, "w", encoding="utf-8") as f:
         f.write("以下是错误信息：\n")
 
+    # 按補充表順序排好計劃：("log", 訊息) 或 ("convert", 簡稱, 文件)
+    plan = []
+    skipped_up_to_date = 0
     for shortname, pattern_name in config["file_map"].items():
         # 僅處理「已做」的項目，其餘跳過
         if config["include_setting"].get(shortname) != "已做":
             print(f"⏩ 跳過（不是『已做』）：{shortname}")
-            with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
-                f.write(f"⏩ [{shortname}] 跳過（不是『已做』）\n")
+            plan.append(("log", f"⏩ [{shortname}] 跳過（不是『已做』）\n"))
             continue
 
         file = matched_files.get(pattern_name)
         if not file:
             print(f"⚠️ 未匹配任何文件：{shortname}")
-            with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
-                f.write(f"⚠️ [{shortname}] 未匹配任何文件\n")
+            plan.append(("log", f"⚠️ [{shortname}] 未匹配任何文件\n"))
+            continue
+
+        output_path = os.path.join(output_folder, f"{shortname}.tsv")
+        if is_conversion_up_to_date(shortname, file, output_path, fingerprints.get(shortname), manifest):
+            skipped_up_to_date += 1
             continue
 
-        process_single_file(file, shortname, config, output_folder)
+        plan.append(("convert", shortname, file))
+
+    if skipped_up_to_date:
+        print(f"⏭️  {skipped_up_to_date} 個字表的輸出比來源新且配置未變，跳過轉換")
+
+    # 要重新轉換的條目先從清單中刪掉並存盤：轉換中途崩潰時，下次不會把留下的輸出當作最新
+    for item in plan:
+        if item[0] == "convert":
+            manifest.pop(item[1], None)
+    save_convert_manifest(manifest)
+
+    def record(shortname, file):
+        # 轉換後再取來源狀態：欄位重命名、粵拼轉換會就地改寫來源文件
+        manifest[shortname] = {
+            "source": os.path.abspath(file),
+            "source_stat": _source_stat(file),
+            "config": fingerprints.get(shortname),
+        }
+
+    if not jobs or jobs <= 1:
+        for item in plan:
+            if item[0] == "log":
+                with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as f:
+                    f.write(item[1])
+                continue
+            _, shortname, file = item
+            output_path = os.path.join(output_folder, f"{shortname}.tsv")
+            started = time.time()
+            process_single_file(file, shortname, config, output_folder)
+            if os.path.exists(output_path) and os.path.getmtime(output_path) >= started - 1:
+                record(shortname, file)
+        save_convert_manifest(manifest)
+        return
+
+    # 共用同一來源文件的方言點歸為一組，在同一個子進程內按順序處理
+    groups = {}
+    for item in plan:
+        if item[0] == "convert":
+            _, shortname, file = item
+            task = (shortname, file, _slice_config(config, shortname), output_folder)
+            groups.setdefault(os.path.abspath(file), []).append(task)
+
+    print(f"🚀 並行轉換 {sum(len(tasks) for tasks in groups.values())} 個字表（{jobs} 個進程）")
+    # 子進程沿用主進程設定的逐行日誌級別
+    with ProcessPoolExecutor(max_workers=jobs, initializer=format_convert.set_row_log_level,
+                             initargs=(format_convert.logger.level,)) as executor:
+        futures = {key: executor.submit(convert_file_group, tasks) for key, tasks in groups.items()}
+        group_results = {}
+        with open(WRITE_ERROR_LOG, "a", encoding="utf-8") as log_file:
+            for item in plan:
+                if item[0] == "log":
+                    log_file.write(item[1])
+                    continue
+                _, shortname, file = item
+                key = os.path.abspath(file)
+                if key not in group_results:
+                    group_results[key] = iter(futures[key].result())
+                result_shortname, output, errors, produced = next(group_results[key])
+                print(output, end="")
+                log_file.write(errors)
+                log_file.flush()
+                if produced:
+                    record(result_shortname, file)
+
+    save_convert_manifest(manifest)
 
 
 if __name__ == "__main__":
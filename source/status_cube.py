@@ -0,0 +1,220 @@
+"""
+中古地位 × 方言點的語音特徵分布預聚合表（status_features）。
+
+後端最常見的查詢是「某個地位（如 [知]{組}）在這些方言點的聲母 / 韻母 / 聲調分布」，
+逐次計算要把 characters.db 的字和 dialects 表的幾百萬行讀音連起來分組。
+這裡在構建時按單個層級欄位（攝 / 呼 / 等 / 韻 / 入 / 調 / 清濁 / 系 / 組 / 母）預先算好：
+    (簡稱, 層級欄位, 層級值, 特徵, 特徵值) → 字數、總字數、對應字
+查詢時只按主鍵前綴查索引。字數、總字數都是去重後的漢字數，與 query_by_status 的統計口徑相同：
+    總字數 = 該地位在該點有讀音的字數；字數 = 其中有讀音取這個特徵值的字數（一字多讀可計入多個特徵值）
+
+刷新以簡稱為單位：只重算指定的方言點，以及與 dialects 表 / characters.db 對不上的方言點。
+"""
+import hashlib
+import os
+import sqlite3
+
+import pandas as pd
+
+from common.config import CHARACTERS_DB_PATH, DIALECTS_DB_PATH
+from common.constants import HIERARCHY_COLUMNS
+from common.db_pool import IN_JSON, get_read_connection, json_param
+
+STATUS_CUBE_TABLE = "status_features"
+# 每個方言點在表中的數據是用哪一版 characters 表算的
+STATUS_CUBE_SOURCES_TABLE = "status_features_sources"
+STATUS_CUBE_COLUMNS = tuple(HIERARCHY_COLUMNS)
+STATUS_CUBE_FEATURES = ("聲母", "韻母", "聲調")
+CHARACTERS_TABLE = "characters"
+
+
+def _characters_signature(conn, columns):
+    """
+    已掛載的 characters 表中參與聚合的欄位內容的哈希。
+    不用文件大小 / 修改時間：sync_dialects_flags 會往 CHARACTERS_DB_PATH 追加日誌，每次構建都會改動文件。
+    """
+    digest = hashlib.sha1()
+    for row in conn.execute(f"SELECT 漢字, {', '.join(columns)} FROM status_chars.{CHARACTERS_TABLE} ORDER BY rowid"):
+        digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def has_status_cube(db_path):
+    """方言庫中是否已有預聚合表"""
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (STATUS_CUBE_TABLE,)
+        ).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def _create_cube_tables(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATUS_CUBE_TABLE} (
+            層級欄位 TEXT NOT NULL,
+            層級值 TEXT NOT NULL,
+            特徵 TEXT NOT NULL,
+            簡稱 TEXT NOT NULL,
+            特徵值 TEXT NOT NULL,
+            字數 INTEGER NOT NULL,
+            總字數 INTEGER NOT NULL,
+            對應字 TEXT NOT NULL,
+            PRIMARY KEY (層級欄位, 層級值, 特徵, 簡稱, 特徵值)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{STATUS_CUBE_TABLE}_abbr ON {STATUS_CUBE_TABLE}(簡稱)")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATUS_CUBE_SOURCES_TABLE} (
+            簡稱 TEXT PRIMARY KEY,
+            地位庫簽名 TEXT NOT NULL
+        )
+    """)
+
+
+def _stale_abbrs(conn, current, signature):
+    """
+    與 dialects 表（current 為其中全部簡稱）/ characters.db 對不上的方言點。
+
+    Returns:
+        tuple: (需要重算的簡稱集合, 已不在 dialects 表中、只需刪除的簡稱集合)
+    """
+    recorded = dict(conn.execute(f"SELECT 簡稱, 地位庫簽名 FROM {STATUS_CUBE_SOURCES_TABLE}"))
+    refresh = {abbr for abbr in current if recorded.get(abbr) != signature}
+    removed = set(recorded) - current
+    return refresh, removed
+
+
+def _aggregate_scope(conn, columns, features):
+    """對 temp.status_cube_scope 中的方言點，逐個層級欄位寫入預聚合行"""
+    for column in columns:
+        conn.execute("DELETE FROM temp.status_cube_chars")
+        conn.execute(f"""
+            INSERT INTO temp.status_cube_chars (漢字, 層級值)
+            SELECT DISTINCT 漢字, {column} FROM status_chars.{CHARACTERS_TABLE}
+            WHERE 漢字 IS NOT NULL AND {column} IS NOT NULL AND {column} != ''
+        """)
+
+        conn.execute("DELETE FROM temp.status_cube_totals")
+        conn.execute("""
+            INSERT INTO temp.status_cube_totals (簡稱, 層級值, 總字數)
+            SELECT d.簡稱, c.層級值, COUNT(DISTINCT d.漢字)
+            FROM dialects d JOIN temp.status_cube_chars c ON c.漢字 = d.漢字
+            WHERE d.簡稱 IN (SELECT 簡稱 FROM temp.status_cube_scope)
+            GROUP BY d.簡稱, c.層級值
+        """)
+
+        for feature in features:
+            conn.execute(f"""
+                INSERT INTO {STATUS_CUBE_TABLE} (層級欄位, 層級值, 特徵, 簡稱, 特徵值, 字數, 總字數, 對應字)
+                SELECT ?, r.層級值, ?, r.簡稱, r.特徵值, COUNT(DISTINCT r.漢字), t.總字數, group_concat(DISTINCT r.漢字)
+                FROM (
+                    SELECT d.簡稱, c.層級值, d.漢字, d.{feature} AS 特徵值
+                    FROM dialects d JOIN temp.status_cube_chars c ON c.漢字 = d.漢字
+                    WHERE d.簡稱 IN (SELECT 簡稱 FROM temp.status_cube_scope) AND d.{feature} IS NOT NULL
+                ) r
+                JOIN temp.status_cube_totals t ON t.簡稱 = r.簡稱 AND t.層級值 = r.層級值
+                GROUP BY r.簡稱, r.層級值, r.特徵值
+            """, (column, feature))
+
+
+def build_status_cube(db_path=DIALECTS_DB_PATH, characters_db_path=CHARACTERS_DB_PATH, abbrs=None,
+                      columns=STATUS_CUBE_COLUMNS, features=STATUS_CUBE_FEATURES):
+    """
+    建立或刷新方言庫中的 status_features 表。
+
+    Args:
+        abbrs: None 時整表重建；否則只重算這些簡稱，
+               外加 dialects 表中新出現、已刪除或 characters.db 變化後未重算的方言點
+
+    Returns:
+        int: 本次重算的方言點數
+    """
+    if not os.path.exists(characters_db_path):
+        print(f"⚠️ 找不到中古地位庫 {characters_db_path}，跳過地位特徵預聚合")
+        return 0
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS status_chars", (characters_db_path,))
+        signature = _characters_signature(conn, columns)
+        conn.execute("CREATE TEMP TABLE status_cube_scope (簡稱 TEXT PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE status_cube_chars (漢字 TEXT, 層級值 TEXT)")
+        conn.execute("CREATE INDEX temp.idx_status_cube_chars ON status_cube_chars(漢字)")
+        conn.execute("CREATE TEMP TABLE status_cube_totals (簡稱 TEXT, 層級值 TEXT, 總字數 INTEGER, "
+                     "PRIMARY KEY (簡稱, 層級值))")
+
+        full = abbrs is None or not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (STATUS_CUBE_TABLE,)
+        ).fetchone()
+
+        current = {row[0] for row in conn.execute("SELECT DISTINCT 簡稱 FROM dialects") if row[0] is not None}
+
+        conn.execute("BEGIN")
+        if full:
+            conn.execute(f"DROP TABLE IF EXISTS {STATUS_CUBE_TABLE}")
+            conn.execute(f"DROP TABLE IF EXISTS {STATUS_CUBE_SOURCES_TABLE}")
+            _create_cube_tables(conn)
+            refresh, removed = set(current), set()
+        else:
+            refresh, removed = _stale_abbrs(conn, current, signature)
+            refresh |= {abbr for abbr in abbrs if abbr in current}
+            removed |= {abbr for abbr in abbrs if abbr not in current}
+
+        conn.executemany("INSERT INTO temp.status_cube_scope VALUES (?)", ((abbr,) for abbr in refresh | removed))
+        conn.execute(f"DELETE FROM {STATUS_CUBE_TABLE} WHERE 簡稱 IN (SELECT 簡稱 FROM temp.status_cube_scope)")
+        conn.execute(
+            f"DELETE FROM {STATUS_CUBE_SOURCES_TABLE} WHERE 簡稱 IN (SELECT 簡稱 FROM temp.status_cube_scope)"
+        )
+        if refresh:
+            _aggregate_scope(conn, columns, features)
+            conn.executemany(
+                f"INSERT INTO {STATUS_CUBE_SOURCES_TABLE} (簡稱, 地位庫簽名) VALUES (?, ?)",
+                ((abbr, signature) for abbr in refresh)
+            )
+        conn.commit()
+
+        rows = conn.execute(f"SELECT COUNT(*) FROM {STATUS_CUBE_TABLE}").fetchone()[0]
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    scope = "全量重建" if full else "增量刷新"
+    print(f"✅ 地位特徵預聚合（{scope}）：重算 {len(refresh)} 個方言點，刪除 {len(removed)} 個，表中共 {rows} 行")
+    return len(refresh)
+
+
+def query_status_cube(locations, column, value, feature, db_path=DIALECTS_DB_PATH):
+    """
+    讀取單個地位（[value]{column}）在 locations 的 feature 分布。
+
+    回傳：
+    - DataFrame：地點、特徵類別、特徵值、字數、總字數、佔比、對應字，按地點順序、特徵值排序
+    """
+    rows = get_read_connection(db_path).execute(f"""
+        SELECT 簡稱, 特徵值, 字數, 總字數, 對應字 FROM {STATUS_CUBE_TABLE}
+        WHERE 層級欄位 = ? AND 層級值 = ? AND 特徵 = ? AND 簡稱 {IN_JSON}
+    """, (column, value, feature, json_param(dict.fromkeys(locations)))).fetchall()
+
+    order = {loc: i for i, loc in enumerate(dict.fromkeys(locations))}
+    rows.sort(key=lambda row: (order[row[0]], row[1]))
+    return pd.DataFrame(
+        [
+            {
+                "地點": abbr,
+                "特徵類別": feature,
+                "特徵值": fval,
+                "字數": count,
+                "總字數": total,
+                "佔比": round(count / total, 4) if total else 0.0,
+                "對應字": chars.split(","),
+            }
+            for abbr, fval, count, total, chars in rows
+        ],
+        columns=["地點", "特徵類別", "特徵值", "字數", "總字數", "佔比", "對應字"],
+    )
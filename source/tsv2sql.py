@@ -1,6 +1,9 @@
+import hashlib
 import os
-import re
 import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 import traceback
 import time
@@ -22,19 +25,26 @@ from common.wenbai_rules import (
     merge_wenbai_markers,
     split_wenbai_marker,
 )
-from source.change_coordinates import GPSUtil
+from source.change_coordinates import convert_bd09_column_to_gps84
 from common.config import (HAN_PATH, APPEND_PATH, QUERY_DB_PATH, DIALECTS_DB_PATH, CHARACTERS_DB_PATH, \
                            MISSING_DATA_LOG, WRITE_INFO_LOG, YINDIAN_DATA_DIR, UPDATE_DATA_DIR, QUERY_DB_ADMIN_PATH,
-                           QUERY_DB_USER_PATH, DIALECTS_DB_ADMIN_PATH, DIALECTS_DB_USER_PATH)
+                           QUERY_DB_USER_PATH, DIALECTS_DB_ADMIN_PATH, DIALECTS_DB_USER_PATH,
+                           SYLLABLE_CACHE_PATH, BASE_DIR)
 from source.character_table_specs import (
     ADDITIONAL_CHARACTER_TABLE_SPECS,
     LEGACY_CHARACTER_TABLE_NAMES,
     PHONOLOGY_TABLE_SPEC,
 )
 from source.match_fromdb import scan_tsv_with_conflict_resolution
-from common.s2t import simplified2traditional, traditional2simplified
+from common.s2t import get_opencc
 from source.get_new import extract_all_from_files
-from source.match_fromdb import get_tsvs
+from common.ipa_segmenter import RULES_SIGNATURE, SYLLABLE_CACHE, load_syllable_cache
+from common.workbook_cache import read_excel_cached
+from common.search_tones import TONE_MAP_TABLE, build_tone_map_table, load_tone_maps, tone_map_for
+from common.location_index import LOCATION_PINYIN_TABLE, build_location_pinyin_table
+from source.status_cube import build_status_cube, has_status_cube
+from common.db_pool import close_read_connections
+from source.match_fromdb import get_tsvs, get_abbreviation_index
 
 
 def apply_polyphonic_labels(merged_df, group_columns):
@@ -50,6 +60,15 @@ def apply_polyphonic_labels(merged_df, group_columns):
     return result
 
 
+def _first_row_positions(abbr_column):
+    """簡稱 → 該簡稱第一次出現的行號（空值不參與匹配）"""
+    positions = {}
+    for position, abbr in enumerate(abbr_column.tolist()):
+        if not pd.isna(abbr):
+            positions.setdefault(abbr, position)
+    return positions
+
+
 def build_dialect_database(mode='admin'):
     """
     構建方言查詢數據庫
@@ -96,7 +115,7 @@ def build_dialect_database(mode='admin'):
 
     # --- 讀取 Append_files.xlsx ---
     print(f"⏳ 正在讀取並校驗 {other_file.name} ...")
-    df_other = pd.read_excel(other_file, sheet_name="檔案", header=0)
+    df_other = read_excel_cached(other_file, sheet_name="檔案", header=0)
     df_other.columns = df_other.columns.str.strip()  # 先去空格
 
     # 【執行校驗】
@@ -111,7 +130,7 @@ def build_dialect_database(mode='admin'):
     # --- 讀取 漢字音典表 ---
     print(f"⏳ 正在讀取並校驗 {han_file.name} ...")
     # 跳過第 2 行（即 index 0）
-    df_han = pd.read_excel(han_file, sheet_name="檔案", header=0, engine='openpyxl', keep_default_na=False)
+    df_han = read_excel_cached(han_file, sheet_name="檔案", header=0, engine='openpyxl', keep_default_na=False)
     df_han = df_han.drop(index=0).reset_index(drop=True)
     df_han.columns = df_han.columns.str.strip()  # 先去空格
 
@@ -127,22 +146,7 @@ def build_dialect_database(mode='admin'):
         """
         對 '經緯度' 列進行坐標轉換：BD-09 (百度) → WGS-84 (GPS)
         """
-        new_coordinates = []
-        for coords in df['經緯度']:
-            # 如果經緯度為空，跳過
-            if pd.isna(coords) or coords.strip() == '':
-                new_coordinates.append(None)  # 如果是空值，將經緯度設為 None
-                continue
-
-            # 確保 coords 是字符串類型
-            coords = str(coords).strip()
-
-            # 分割經緯度（格式：經度,緯度）
-            bd_lon, bd_lat = map(float, re.split(r'[，,]', coords))
-
-            # BD-09 → WGS-84 轉換（注意：GPSUtil 參數順序是 lat, lon）
-            wgs_lat, wgs_lon = GPSUtil.bd09_to_gps84(bd_lat, bd_lon)
-            new_coordinates.append(f"{wgs_lon},{wgs_lat}")  # 存儲格式：經度,緯度
+        new_coordinates = convert_bd09_column_to_gps84(df['經緯度'])
 
         # 更新 '經緯度' 列
         df['經緯度'] = new_coordinates
@@ -168,19 +172,17 @@ def build_dialect_database(mode='admin'):
     print(f"\n⏳ 根據 TSV 來源選擇元數據...")
     # 建立 簡稱 -> TSV來源 的映射（處理繁簡轉換）
     tsv_name_to_source = {}
-    for filename, source in sources.items():
-        variants = [filename]
-        try:
-            variants.append(simplified2traditional(filename))
-        except:
-            pass
-        try:
-            variants.append(traditional2simplified(filename))
-        except:
-            pass
-
-        for variant in variants:
-            tsv_name_to_source[variant] = source
+    filenames = list(sources)
+    try:
+        trad_names = get_opencc('s2t.json').convert_many(filenames)
+        simp_names = get_opencc('t2s.json').convert_many(filenames)
+    except Exception:
+        trad_names = simp_names = [None] * len(filenames)
+    for filename, trad_name, simp_name in zip(filenames, trad_names, simp_names):
+        source = sources[filename]
+        for variant in (filename, trad_name, simp_name):
+            if variant is not None:
+                tsv_name_to_source[variant] = source
 
     print(f"   建立了 {len(tsv_name_to_source)} 個簡稱映射")
     print(f"\n⏳ 匹配元數據與 TSV 文件...")
@@ -203,54 +205,31 @@ def build_dialect_database(mode='admin'):
         else:
             print(f"   警告：APPEND_PATH 中沒有 isUser 列，使用所有簡稱")
 
-    for idx, abbr in enumerate(all_abbr, 1):
+    # 每個簡稱在兩張表中第一次出現的行號（取代逐個簡稱整表掃描）
+    han_first_row = _first_row_positions(df_han['簡稱'])
+    other_first_row = _first_row_positions(df_other['簡稱'])
+
+    ordered_abbr = [
+        abbr for abbr in dict.fromkeys(df_han['簡稱'].tolist() + df_other['簡稱'].tolist())
+        if abbr in all_abbr
+    ]
+    for idx, abbr in enumerate(ordered_abbr, 1):
         # 每處理 100 個簡稱打印一次進度
-        if idx % 100 == 0 or idx == len(all_abbr):
-            print(f"   處理進度: {idx}/{len(all_abbr)}")
-
-        # 檢查是否有對應的 TSV 文件
-        source = tsv_name_to_source.get(abbr)
-
-        # 根據 TSV 來源選擇元數據
-        if source == 'yindian':
-            # 有 yindian TSV：優先使用 HAN_PATH
-            rows_han = df_han[df_han['簡稱'] == abbr]
-            if not rows_han.empty:
-                selected_row = rows_han.iloc[0]
-            else:
-                # HAN 中沒有，嘗試 APPEND
-                rows_other = df_other[df_other['簡稱'] == abbr]
-                if not rows_other.empty:
-                    selected_row = rows_other.iloc[0]
-                else:
-                    continue
-
-        elif source == 'processed':
-            # 有 processed TSV：優先使用 APPEND_PATH
-            rows_other = df_other[df_other['簡稱'] == abbr]
-            if not rows_other.empty:
-                selected_row = rows_other.iloc[0]
-            else:
-                # APPEND 中沒有，嘗試 HAN
-                rows_han = df_han[df_han['簡稱'] == abbr]
-                if not rows_han.empty:
-                    selected_row = rows_han.iloc[0]
-                else:
-                    continue
+        if idx % 100 == 0 or idx == len(ordered_abbr):
+            print(f"   處理進度: {idx}/{len(ordered_abbr)}")
 
+        # 根據 TSV 來源選擇元數據：processed TSV 優先使用 APPEND_PATH，
+        # yindian TSV 或沒有 TSV 時優先使用 HAN_PATH，缺失時退回另一張表
+        if tsv_name_to_source.get(abbr) == 'processed':
+            candidates = ((df_other, other_first_row), (df_han, han_first_row))
         else:
-            # 沒有 TSV 文件：優先使用 HAN_PATH，如果 HAN 沒有則使用 APPEND
-            rows_han = df_han[df_han['簡稱'] == abbr]
-            if not rows_han.empty:
-                selected_row = rows_han.iloc[0]
-            else:
-                rows_other = df_other[df_other['簡稱'] == abbr]
-                if not rows_other.empty:
-                    selected_row = rows_other.iloc[0]
-                else:
-                    continue
+            candidates = ((df_han, han_first_row), (df_other, other_first_row))
 
-        final_rows.append(selected_row)
+        for df_source, first_row in candidates:
+            position = first_row.get(abbr)
+            if position is not None:
+                final_rows.append(df_source.iloc[position])
+                break
 
     # 5. 建立最終 DataFrame
     print(f"\n⏳ 建立最終 DataFrame（共 {len(final_rows)} 個方言點）...")
@@ -292,6 +271,12 @@ def build_dialect_database(mode='admin'):
         conn.execute("CREATE INDEX IF NOT EXISTS idx_query_partition_storage ON dialects(音典分區, 存儲標記);")
         # 優化：地圖集分區+存儲標記複合索引（用於match_input_tip.py）
         conn.execute("CREATE INDEX IF NOT EXISTS idx_query_atlas_storage ON dialects(地圖集二分區, 存儲標記);")
+        # 預先展開各方言點的調號 → 調類名映射，寫庫階段一次讀入內存
+        tone_map_count = build_tone_map_table(conn)
+        print(f"⏳ 已生成 {TONE_MAP_TABLE} 表：{tone_map_count} 條調號映射")
+        # 預先計算全部地名的拼音，供 match_input_tip 的地點檢索使用
+        pinyin_count = build_location_pinyin_table(conn)
+        print(f"⏳ 已生成 {LOCATION_PINYIN_TABLE} 表：{pinyin_count} 個地名拼音")
 
     print(f"✅ SQLite 資料庫已建立，dialects 表已更新完成。")
 
@@ -299,7 +284,296 @@ def build_dialect_database(mode='admin'):
     return tsv_paths
 
 
-def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_path=None):
+def prepare_dialect_rows(path, query_db_path=None, append_filter=None, merge_polyphonic=False):
+    """
+    解析單個 TSV：匹配簡稱、提取聲韻調、拆分文白標記並整理成待插入的行。
+    只做 CPU 計算，不碰 dialects 數據庫，可在子進程中執行。
+    merge_polyphonic 為 True 時，在內存中直接完成重複讀音合併與多音字標記，
+    結果與寫庫後再跑 process_polyphonic_annotations 一致。
+
+    Returns:
+        dict: status 為 'ok' / 'unmatched' / 'filtered' / 'error'
+    """
+    result = {
+        "path": path,
+        "tsv_name": None,
+        "status": "ok",
+        "row_count": 0,
+        "rows": [],
+        "missing_logs": [],
+        "error": "",
+        "syllable_cache_hits": 0,
+        "syllable_cache_misses": 0,
+        "syllable_entries": {},
+    }
+
+    # 獲取 TSV 文件的簡稱
+    try:
+        tsv_result = get_tsvs(single=path, query_db_path=query_db_path)
+        if tsv_result is None or len(tsv_result) < 2 or not tsv_result[1]:
+            result["status"] = "unmatched"
+            return result
+        tsv_name = tsv_result[1][0]
+    except (IndexError, TypeError):
+        result["status"] = "unmatched"
+        return result
+
+    result["tsv_name"] = tsv_name
+
+    # 如果 append 为 True，则进行筛选 (update mode processes all files)
+    if append_filter and tsv_name not in append_filter:
+        result["status"] = "filtered"
+        return result
+
+    try:
+        hits_before, misses_before = SYLLABLE_CACHE.counters()
+        # 子進程的緩存不與主進程共享，新解析的音節回傳給主進程合併
+        with SYLLABLE_CACHE.recording_new_entries() as new_entries:
+            df = extract_all_from_files(path, query_db_path=query_db_path, shortnames=tsv_result[1])
+        hits_after, misses_after = SYLLABLE_CACHE.counters()
+        result["syllable_cache_hits"] = hits_after - hits_before
+        result["syllable_cache_misses"] = misses_after - misses_before
+        result["syllable_entries"] = new_entries
+        result["row_count"] = len(df)
+
+        df = df.fillna("")
+        df["漢字"] = df["汉字"].astype(str).str.strip()
+        split_results = df["音标"].apply(split_wenbai_marker)
+        df["音節"] = split_results.str[0]
+        df["多音字"] = split_results.str[1]
+        df["聲母"] = df["声母"].astype(str).str.strip()
+        df["韻母"] = df["韵母"].astype(str).str.strip()
+        df["聲調"] = df["声调"].astype(str).str.strip()
+        df["註釋"] = df["註釋"].astype(str).str.strip() if "註釋" in df.columns else ""
+        note_wenbai_marks = df["註釋"].apply(detect_wenbai_from_note)
+        df["多音字"] = [
+            merge_wenbai_markers(primary_marker, note_marker)
+            for primary_marker, note_marker in zip(df["多音字"], note_wenbai_marks)
+        ]
+        df["註釋"] = df["註釋"].apply(clean_wenbai_note)
+
+        # 🚀 优化：使用向量化操作过滤数据，避免 iterrows()
+        # 1. 过滤：至少有一个音韵特征不为空
+        has_any = (df["聲母"] != "") | (df["韻母"] != "") | (df["聲調"] != "")
+        df_valid = df[has_any].copy()
+
+        # 2. 检测缺失数据（有部分音韵特征但不完整）
+        has_all = (df_valid["聲母"] != "") & (df_valid["韻母"] != "") & (df_valid["聲調"] != "")
+        df_missing = df_valid[~has_all]
+
+        # 3. 批量记录缺失数据日志（避免频繁文件I/O）
+        result["missing_logs"] = [
+            f"❗ 缺資料：char={row.漢字}, 音節={row.音節}, 聲母='{row.聲母}', 韻母='{row.韻母}', 聲調='{row.聲調}'"
+            for row in df_missing.itertuples(index=False)
+        ]
+
+        # 4. 🚀 使用 itertuples() 替代 iterrows()（快10-100倍）
+        result["rows"] = [
+            (tsv_name, row.漢字, row.音節, row.聲母, row.韻母, row.聲調, row.註釋, row.多音字)
+            for row in df_valid.itertuples(index=False)
+        ]
+
+        # 5. 按漢字穩定排序（等同寫庫後 ORDER BY 漢字, rowid），同一方言點的行按漢字聚簇寫入
+        result["rows"].sort(key=lambda row: row[1])
+        if merge_polyphonic:
+            result["rows"] = list(_iter_merged_dialect_rows(result["rows"]))
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+
+    return result
+
+
+def _iter_dialect_batches(tsv_paths, query_db_path, append_filter=None, jobs=1, syllable_cache_path=None,
+                          merge_paths=frozenset()):
+    """
+    按 tsv_paths 順序逐個產出 (序號, prepare_dialect_rows 結果)。
+    jobs > 1 時由進程池並行解析，但產出順序始終與輸入一致，寫庫結果可重現。
+    syllable_cache_path 不為空時，子進程啟動先載入持久化的音節緩存。
+    merge_paths 中的文件在解析時直接完成多音字合併。
+    """
+    tasks = [(idx, path, path in merge_paths) for idx, path in enumerate(tsv_paths, 1) if path != "_"]
+
+    if jobs is None or jobs <= 1 or len(tasks) <= 1:
+        for idx, path, merge in tasks:
+            yield idx, prepare_dialect_rows(path, query_db_path, append_filter, merge)
+        return
+
+    print(f"🚀 並行解析：{jobs} 個進程")
+    # 只預先提交有限數量的任務，避免已解析但未寫入的行堆積在內存中
+    window = jobs * 2
+    with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=load_syllable_cache,
+            initargs=(syllable_cache_path,),
+    ) as executor:
+        pending = deque()
+        task_iter = iter(tasks)
+
+        for idx, path, merge in islice(task_iter, window):
+            pending.append((idx, executor.submit(prepare_dialect_rows, path, query_db_path, append_filter, merge)))
+
+        while pending:
+            idx, future = pending.popleft()
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                next_idx, next_path, next_merge = next_task
+                pending.append((next_idx, executor.submit(
+                    prepare_dialect_rows, next_path, query_db_path, append_filter, next_merge
+                )))
+            yield idx, future.result()
+
+
+# 全量構建先寫入暫存庫（正式庫路徑 + STAGING_SUFFIX），全部完成後整體替換正式庫
+STAGING_SUFFIX = ".staging"
+# 暫存庫中記錄已寫入方言點的進度表，中斷後據此續建
+BUILD_PROGRESS_TABLE = "build_progress"
+# 累計寫入這麼多行才提交一次事務
+COMMIT_BATCH_ROWS = 1_000_000
+
+
+def _set_bulk_write_pragmas(conn):
+    """
+    批量寫入用 WAL 日誌 + synchronous=NORMAL：
+    崩潰或斷電時最多丟失最後一個未提交的事務，數據庫本身不會損壞。
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def _restore_journal_mode(conn):
+    """把 WAL 合併回主文件並改回 DELETE 日誌模式，發佈出去的庫只有一個文件"""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode = DELETE")
+
+
+def staging_db_path(db_path):
+    return db_path + STAGING_SUFFIX
+
+
+def discard_staging_db(staging_path):
+    """刪除暫存庫及其 WAL / 共享內存 / 回滾日誌文件"""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(staging_path + suffix):
+            os.remove(staging_path + suffix)
+
+
+def finalize_staging_db(staging_path, db_path):
+    """刪除進度表、合併 WAL 後，用 os.replace 原子替換正式庫：讀者只會看到舊庫或完整的新庫"""
+    conn = sqlite3.connect(staging_path)
+    conn.execute(f"DROP TABLE IF EXISTS {BUILD_PROGRESS_TABLE}")
+    conn.commit()
+    _restore_journal_mode(conn)
+    conn.close()
+    # 本進程的只讀連接會在下次使用時發現文件已替換而重連；先關掉，Windows 下打開的文件不能被替換
+    close_read_connections(db_path)
+    os.replace(staging_path, db_path)
+    print(f"✅ 暫存庫已替換正式庫：{db_path}")
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def compute_build_signature(query_db_path):
+    """
+    影響提取結果、又不體現在 TSV 本身的輸入的哈希：音節拆分規則（RULES_SIGNATURE）和 query 庫的調號映射。
+    記入進度表；續建時與本次不同，說明暫存庫中已寫入的行用的是舊規則 / 舊調號，不能沿用。
+    """
+    tone_maps = load_tone_maps(query_db_path) or {}
+    digest = hashlib.sha1(RULES_SIGNATURE.encode("utf-8"))
+    for abbr in sorted(tone_maps):
+        digest.update(repr((abbr, sorted(tone_maps[abbr].items()))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def staging_matches_build(staging_path, signature):
+    """暫存庫的進度表是否全部由同一構建簽名寫入（沒有暫存庫或進度表為空時也算符合）"""
+    if not os.path.exists(staging_path):
+        return True
+    conn = sqlite3.connect(staging_path)
+    try:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (BUILD_PROGRESS_TABLE,)
+        ).fetchone():
+            return True
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({BUILD_PROGRESS_TABLE})")}
+        if "構建簽名" not in columns:
+            # 舊版進度表沒有簽名，無從核對
+            return False
+        recorded = {row[0] for row in conn.execute(f"SELECT DISTINCT 構建簽名 FROM {BUILD_PROGRESS_TABLE}")}
+        return recorded <= {signature}
+    finally:
+        conn.close()
+
+
+def _load_build_progress(conn):
+    """
+    讀取（必要時創建）進度表。
+
+    Returns:
+        dict: {相對路徑: (文件大小, 修改時間ns, 簡稱)}
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BUILD_PROGRESS_TABLE} (
+            路徑 TEXT PRIMARY KEY,
+            文件大小 INTEGER,
+            修改時間 INTEGER,
+            簡稱 TEXT,
+            構建簽名 TEXT
+        )
+    """)
+    rows = conn.execute(f"SELECT 路徑, 文件大小, 修改時間, 簡稱 FROM {BUILD_PROGRESS_TABLE}").fetchall()
+    return {path: (size, mtime, abbr) for path, size, mtime, abbr in rows}
+
+
+def _resume_build_progress(conn, tsv_paths):
+    """
+    對照進度表與本次的 TSV 列表：已刪除或內容變化的文件所屬簡稱整個作廢（刪行、刪進度），
+    其餘已完成的文件跳過。
+
+    Returns:
+        (已完成的相對路徑集合, 已完成的簡稱列表)
+    """
+    progress = _load_build_progress(conn)
+    if not progress:
+        return set(), []
+
+    current = {_manifest_key(path): path for path in tsv_paths if path != "_"}
+    stale = {
+        abbr for key, (size, mtime, abbr) in progress.items()
+        if key not in current or _file_signature(current[key]) != (size, mtime)
+    }
+    if stale:
+        conn.executemany("DELETE FROM dialects WHERE 簡稱 = ?", [(abbr,) for abbr in stale])
+        conn.executemany(f"DELETE FROM {BUILD_PROGRESS_TABLE} WHERE 簡稱 = ?", [(abbr,) for abbr in stale])
+        conn.commit()
+        print(f"⚠️ 續建：{len(stale)} 個方言點的 TSV 已變化或刪除，重新寫入：{sorted(stale)}")
+
+    done = {key for key, (_, _, abbr) in progress.items() if abbr not in stale}
+    done_簡稱 = []
+    for _, _, abbr in progress.values():
+        if abbr not in stale and abbr not in done_簡稱:
+            done_簡稱.append(abbr)
+    print(f"⏩ 續建：跳過 {len(done)} 個已寫入的 TSV（{len(done_簡稱)} 個方言點）")
+    return done, done_簡稱
+
+
+def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_path=None, jobs=1,
+                    syllable_cache_path=None, syllable_stats=None, merge_polyphonic=False, track_progress=False,
+                    build_signature=None):
+    """
+    merge_polyphonic 為 True 時，每個方言點在寫庫前就完成重複讀音合併與多音字標記，
+    不再需要寫庫後的 process_polyphonic_annotations。
+    多個 TSV 匹配到同一簡稱時，這些方言點寫完後再統一做一次 selective 合併。
+
+    寫入在 WAL 模式下進行，每累計 COMMIT_BATCH_ROWS 行提交一次事務。
+    track_progress 為 True 時（全量構建寫暫存庫），每個 TSV 寫完即在同一事務中記入進度表；
+    進度表非空說明上次構建中斷，已完成的 TSV 直接跳過，從中斷處繼續。
+    進度行同時記下 build_signature，調用方續建前先用 staging_matches_build 核對。
+    """
     log_dirs = {
         os.path.dirname(MISSING_DATA_LOG),
         os.path.dirname(WRITE_INFO_LOG),
@@ -311,12 +585,14 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    #  优化：设置 SQLite 性能参数
-    cursor.execute("PRAGMA synchronous = OFF")  # 关闭同步写入
-    cursor.execute("PRAGMA journal_mode = MEMORY")  # 使用内存日志
-    cursor.execute("PRAGMA temp_store = MEMORY")  # 临时数据存内存
+    _set_bulk_write_pragmas(conn)
+
+    done_paths, done_簡稱 = set(), []
+    if track_progress:
+        # 進度與數據在同一事務中提交，進度表非空時 dialects 表必然存在
+        done_paths, done_簡稱 = _resume_build_progress(conn, tsv_paths)
 
-    if not append and not update:  # MODIFIED: Don't drop if update mode
+    if not append and not update and not done_paths:  # MODIFIED: Don't drop if update mode
         cursor.execute("DROP TABLE IF EXISTS dialects")
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS dialects (
@@ -334,16 +610,13 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
 
     log_lines = []
     update_簡稱_list = []  # Track which 簡稱 to update
-    processed_簡稱 = []  # Track which 簡稱 were actually processed
+    processed_簡稱 = list(done_簡稱)  # Track which 簡稱 were actually processed（含續建時已完成的）
     missing_data_logs = []  # 🚀 优化：批量收集缺失数据日志
 
-    def clean_join(series):
-        return ", ".join(x.strip() for x in series.dropna().astype(str).unique() if x and x.strip())
-
     # 只有当 append=True 时，才进行筛选
     if append:
         try:
-            df_append = pd.read_excel(APPEND_PATH, sheet_name="檔案")
+            df_append = read_excel_cached(APPEND_PATH, sheet_name="檔案")
             update_rows = df_append[df_append['待更新'] == 1]
             update_簡稱_list = update_rows['簡稱'].dropna().unique().tolist()
         except:
@@ -352,9 +625,11 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
     elif update:
         # NEW: For update mode, extract 簡稱 from TSV filenames
         print(f"📌 update 模式：正在提取待更新的方言點...")
+        abbreviation_index = get_abbreviation_index(query_db_path)
         for path in tsv_paths:
             try:
-                tsv_result = get_tsvs(single=path, query_db_path=query_db_path)
+                tsv_result = get_tsvs(single=path, query_db_path=query_db_path,
+                                      abbreviation_index=abbreviation_index)
                 if tsv_result and len(tsv_result) >= 2 and tsv_result[1]:
                     tsv_name = tsv_result[1][0]
                     if tsv_name not in update_簡稱_list:
@@ -372,73 +647,63 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
         conn.commit()
         print(f"✅ 已刪除 {len(update_簡稱_list)} 個方言點的舊數據")
 
-    for idx, path in enumerate(tsv_paths, 1):
-        if path == "_":
-            continue
-
-        # 獲取 TSV 文件的簡稱
-        try:
-            tsv_result = get_tsvs(single=path, query_db_path=query_db_path)
-            if tsv_result is None or len(tsv_result) < 2 or not tsv_result[1]:
-                # 無法匹配簡稱，跳過該文件
-                print(f"\n [{idx}/{len(tsv_paths)}] [跳過] 無法匹配簡稱：{os.path.basename(path)}")
-                continue
-            tsv_name = tsv_result[1][0]
-        except (IndexError, TypeError) as e:
+    merge_paths = frozenset()
+    shared_簡稱 = []
+    if merge_polyphonic:
+        abbreviation_index = get_abbreviation_index(query_db_path)
+        path_簡稱 = {
+            path: _resolve_tsv_shortname(path, query_db_path, abbreviation_index)
+            for path in tsv_paths if path != "_"
+        }
+        path_counts = {}
+        for abbr in path_簡稱.values():
+            path_counts[abbr] = path_counts.get(abbr, 0) + 1
+        shared_簡稱 = [abbr for abbr, count in path_counts.items() if abbr is not None and count > 1]
+        merge_paths = frozenset(path for path, abbr in path_簡稱.items() if abbr not in shared_簡稱)
+
+    append_filter = update_簡稱_list if append else None
+    # 已完成的 TSV 換成 "_" 佔位，不再解析，序號保持不變
+    pending_paths = ["_" if path != "_" and _manifest_key(path) in done_paths else path for path in tsv_paths]
+    uncommitted_rows = 0
+    for idx, result in _iter_dialect_batches(pending_paths, query_db_path, append_filter, jobs, syllable_cache_path,
+                                             merge_paths):
+        tsv_name = result["tsv_name"]
+        status = result["status"]
+
+        if syllable_stats is not None:
+            syllable_stats["hits"] = syllable_stats.get("hits", 0) + result["syllable_cache_hits"]
+            syllable_stats["misses"] = syllable_stats.get("misses", 0) + result["syllable_cache_misses"]
+        if jobs and jobs > 1:
+            SYLLABLE_CACHE.update(result["syllable_entries"])
+
+        if status == "unmatched":
             # 無法匹配簡稱，跳過該文件
-            print(f"\n [{idx}/{len(tsv_paths)}] [跳過] 無法匹配簡稱：{os.path.basename(path)}")
+            print(f"\n [{idx}/{len(tsv_paths)}] [跳過] 無法匹配簡稱：{os.path.basename(result['path'])}")
             continue
 
         now_process = f"\n [{idx}/{len(tsv_paths)}] 正在處理：{tsv_name}"
         print(now_process)
         missing_data_logs.append(now_process)  # 🚀 优化：收集日志，稍后批量写入
 
-        # 如果 append 为 True，则进行筛选 (update mode processes all files)
-        if append and update_簡稱_list and tsv_name not in update_簡稱_list:
+        if status == "filtered":
             print(f"跳過：{tsv_name} (不在待更新清單中)")
             continue
 
+        if status == "error":
+            log_lines.append(f" {tsv_name} 寫入失敗：\n{result['error']}")
+            print(f" 錯誤處理 {tsv_name}：\n{result['error']}")
+            continue
+
+        print(f"  📄 提取資料表：{result['row_count']} 行")
+        missing_data_logs.extend(result["missing_logs"])
+
+        # 每個 TSV 一個保存點：寫入失敗只回滾這個文件，不影響同一事務中的其他方言點。
+        # 保存點須嵌套在顯式事務內，否則 RELEASE 會直接提交
+        if not conn.in_transaction:
+            cursor.execute("BEGIN")
+        cursor.execute("SAVEPOINT dialect_file")
         try:
-            df = extract_all_from_files(path, query_db_path=query_db_path)
-            print(f"  📄 提取資料表：{len(df)} 行")
-
-            df = df.fillna("")
-            df["漢字"] = df["汉字"].astype(str).str.strip()
-            split_results = df["音标"].apply(split_wenbai_marker)
-            df["音節"] = split_results.str[0]
-            df["多音字"] = split_results.str[1]
-            df["聲母"] = df["声母"].astype(str).str.strip()
-            df["韻母"] = df["韵母"].astype(str).str.strip()
-            df["聲調"] = df["声调"].astype(str).str.strip()
-            df["註釋"] = df["註釋"].astype(str).str.strip() if "註釋" in df.columns else ""
-            note_wenbai_marks = df["註釋"].apply(detect_wenbai_from_note)
-            df["多音字"] = [
-                merge_wenbai_markers(primary_marker, note_marker)
-                for primary_marker, note_marker in zip(df["多音字"], note_wenbai_marks)
-            ]
-            df["註釋"] = df["註釋"].apply(clean_wenbai_note)
-
-            # 🚀 优化：使用向量化操作过滤数据，避免 iterrows()
-            # 1. 过滤：至少有一个音韵特征不为空
-            has_any = (df["聲母"] != "") | (df["韻母"] != "") | (df["聲調"] != "")
-            df_valid = df[has_any].copy()
-
-            # 2. 检测缺失数据（有部分音韵特征但不完整）
-            has_all = (df_valid["聲母"] != "") & (df_valid["韻母"] != "") & (df_valid["聲調"] != "")
-            df_missing = df_valid[~has_all]
-
-            # 3. 批量记录缺失数据日志（避免频繁文件I/O）
-            if len(df_missing) > 0:
-                for row in df_missing.itertuples(index=False):
-                    missing_data_logs.append(
-                        f"❗ 缺資料：char={row.漢字}, 音節={row.音節}, 聲母='{row.聲母}', 韻母='{row.韻母}', 聲調='{row.聲調}'"
-                    )
-
-            # 4. 🚀 使用 itertuples() 替代 iterrows()（快10-100倍）
-            batch_data = [
-                (tsv_name, row.漢字, row.音節, row.聲母, row.韻母, row.聲調, row.註釋, row.多音字)
-                for row in df_valid.itertuples(index=False)
-            ]
+            batch_data = result["rows"]
             insert_count = len(batch_data)
 
             # 批量插入所有数据
@@ -447,8 +712,18 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
                     INSERT INTO dialects (簡稱, 漢字, 音節, 聲母, 韻母, 聲調, 註釋, 多音字)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', batch_data)
+            if track_progress:
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO {BUILD_PROGRESS_TABLE} (路徑, 文件大小, 修改時間, 簡稱, 構建簽名) "
+                    f"VALUES (?, ?, ?, ?, ?)",
+                    (_manifest_key(result["path"]), *_file_signature(result["path"]), tsv_name, build_signature)
+                )
+            cursor.execute("RELEASE dialect_file")
 
-            conn.commit()
+            uncommitted_rows += insert_count
+            if uncommitted_rows >= COMMIT_BATCH_ROWS:
+                conn.commit()
+                uncommitted_rows = 0
             log_lines.append(f"{tsv_name} 寫入了 {insert_count} 筆。")
             # print(f" {tsv_name} 完成：共寫入 {insert_count} 筆。")
 
@@ -457,10 +732,13 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
                 processed_簡稱.append(tsv_name)
 
         except Exception as e:
+            cursor.execute("ROLLBACK TO dialect_file")
+            cursor.execute("RELEASE dialect_file")
             error_detail = traceback.format_exc()
             log_lines.append(f" {tsv_name} 寫入失敗：\n{error_detail}")
             print(f" 錯誤處理 {tsv_name}：\n{error_detail}")
 
+    conn.commit()
     conn.close()
     print(f"\n📦 所有資料已寫入：{db_path}")
 
@@ -469,15 +747,9 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
         with open(MISSING_DATA_LOG, "a", encoding="utf-8") as f:
             f.write("\n".join(missing_data_logs) + "\n")
 
-    #  优化：重新连接并恢复正常模式，然后创建索引
+    # 合併 WAL 並恢复 DELETE 模式
     conn_all = sqlite3.connect(db_path)
-    cursor = conn_all.cursor()
-
-    # 恢复正常同步模式
-    cursor.execute("PRAGMA synchronous = NORMAL")
-    cursor.execute("PRAGMA journal_mode = DELETE")
-
-    conn_all.commit()
+    _restore_journal_mode(conn_all)
     conn_all.close()  # 🔧 修复：关闭数据库连接，避免锁定
 
     # print("\n 寫入總結：")
@@ -488,47 +760,181 @@ def process_all2sql(tsv_paths, db_path, append=False, update=False, query_db_pat
         f.write("\n".join(log_lines))
     # print(f"\n📝 已寫入紀錄至：{log_path}")
 
+    if shared_簡稱:
+        print(f"⚠️ 以下簡稱匹配到多個 TSV，寫庫後統一合併：{shared_簡稱}")
+        process_polyphonic_annotations_selective(db_path, [abbr for abbr in shared_簡稱 if abbr in processed_簡稱])
+
     return processed_簡稱  # Return list of processed dialects
 
 
-def ensure_dialects_indexes(conn):
-    print("※ 開始創建索引 ※")
+# dialects 表索引。已去掉作為其他索引前綴的冗餘單列/雙列索引：
+#   簡稱 → 簡稱,漢字,音節；漢字 → 漢字,簡稱；多音字 → 多音字,簡稱,漢字；簡稱,漢字 → 簡稱,漢字,音節
+DIALECTS_INDEXES = (
     # 基础单列索引（FastAPI 后端频繁查询的字段）
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr ON dialects(簡稱);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_char ON dialects(漢字);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_syllable ON dialects(音節);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_polyphonic ON dialects(多音字);")
-
+    ("idx_dialects_syllable", "音節"),
     # 复合索引，优化多字段查询和 GROUP BY
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_char_abbr ON dialects(漢字, 簡稱);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr_char ON dialects(簡稱, 漢字);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr_char_syllable ON dialects(簡稱, 漢字, 音節);")
-
+    ("idx_dialects_char_abbr", "漢字, 簡稱"),
+    ("idx_dialects_abbr_char_syllable", "簡稱, 漢字, 音節"),
     # 【优先级高】用于音韵特征查询（分别优化聲母/韻母/聲調查询）
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr_initial ON dialects(簡稱, 聲母);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr_final ON dialects(簡稱, 韻母);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_abbr_tone ON dialects(簡稱, 聲調);")
-
+    ("idx_dialects_abbr_initial", "簡稱, 聲母"),
+    ("idx_dialects_abbr_final", "簡稱, 韻母"),
+    ("idx_dialects_abbr_tone", "簡稱, 聲調"),
     # 【优先级高】优化多音字查询（WHERE 多音字='1' AND 簡稱=? AND 漢字 IN ...）
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_dialects_polyphonic_full ON dialects(多音字, 簡稱, 漢字);")
+    ("idx_dialects_polyphonic_full", "多音字, 簡稱, 漢字"),
+)
+REDUNDANT_DIALECTS_INDEXES = (
+    "idx_dialects_abbr",
+    "idx_dialects_char",
+    "idx_dialects_polyphonic",
+    "idx_dialects_abbr_char",
+)
+# 建索引時的頁緩存（KB），排序越少落盤越快
+INDEX_BUILD_CACHE_KB = 512 * 1024
+
+
+def ensure_dialects_indexes(conn, cache_size_kb=INDEX_BUILD_CACHE_KB):
+    """
+    數據全部寫入後一次性建立 dialects 索引，並刪除舊版本遺留的冗餘索引。
+    逐個輸出建索引耗時與佔用空間。
+
+    Returns:
+        list: [(索引名, 耗時秒數, 佔用字節數)]
+    """
+    print("※ 開始創建索引 ※")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    previous_cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute(f"PRAGMA cache_size = -{int(cache_size_kb)}")
+
+    for name in REDUNDANT_DIALECTS_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='dialects'")
+    }
+    stats = []
+    for name, columns in DIALECTS_INDEXES:
+        if name in existing:
+            continue
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        start = time.time()
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON dialects({columns});")
+        duration = time.time() - start
+        pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        size = ((pages_after - freelist_after) - (pages_before - freelist_before)) * page_size
+        stats.append((name, duration, size))
+        print(f"  {name}({columns}): {duration:.2f}秒，{size / 1024 / 1024:.1f} MB")
+
+    conn.execute(f"PRAGMA cache_size = {previous_cache_size}")
     print("✅ 索引創建完成")
+    return stats
+
+
+_DIALECT_ROW_SELECT = "SELECT 簡稱, 漢字, 音節, 聲母, 韻母, 聲調, 註釋, 多音字 FROM dialects"
+_DIALECT_ROW_INSERT = "INSERT INTO {table} (簡稱, 漢字, 音節, 聲母, 韻母, 聲調, 註釋, 多音字) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def _merge_notes(notes):
+    """聚合註釋：去空、去重（保持首次出現順序）、用分號連接"""
+    merged = []
+    for note in notes:
+        if note is None:
+            continue
+        note = str(note).strip()
+        if note and note not in merged:
+            merged.append(note)
+    return ';'.join(merged)
+
+
+def merge_char_rows(rows):
+    """
+    合併同一 (簡稱, 漢字) 的所有讀音行，並標記多音字。
+
+    - 同一 (音節, 多音字) 下聲韻調一致 → 合併成一行，註釋去重拼接
+    - 聲韻調不一致 → 保留所有行
+    - 合併後音節不止一個 → 多音字為空的行補 '1'（文白標記 2/3 保留）
+    """
+    groups = {}
+    inconsistent = []
+    for row in rows:
+        if row[2] is None or row[7] is None:
+            # 分組鍵缺失的行不參與合併
+            inconsistent.append(row)
+            continue
+        groups.setdefault((row[2], row[7]), []).append(row)
+
+    consistent = []
+    for key in sorted(groups):
+        group = groups[key]
+        phonetic_keys = {f"{row[3]}|{row[4]}|{row[5]}" for row in group}
+        if len(phonetic_keys) == 1:
+            first = group[0]
+            consistent.append(first[:6] + (_merge_notes(row[6] for row in group), first[7]))
+        else:
+            inconsistent.extend(group)
+
+    # 不一致的行按讀入順序保留
+    if inconsistent:
+        order = {id(row): idx for idx, row in enumerate(rows)}
+        inconsistent.sort(key=lambda row: order[id(row)])
+    merged = consistent + inconsistent
+
+    if len({row[2] for row in merged if row[2] is not None}) > 1:
+        merged = [
+            row[:7] + ('1',) if ('' if row[7] is None else str(row[7])).strip() == '' else row
+            for row in merged
+        ]
+    return merged
+
+
+def _iter_merged_dialect_rows(cursor):
+    """
+    單次流式遍歷已按 (簡稱, 漢字) 排序的讀音行，逐個 (簡稱, 漢字) 產出合併結果。
+    內存只保留當前一個字的讀音。
+    """
+    current_key = None
+    bucket = []
+    for row in cursor:
+        key = (row[0], row[1])
+        if key != current_key and bucket:
+            yield from merge_char_rows(bucket)
+            bucket = []
+        current_key = key
+        bucket.append(row)
+    if bucket:
+        yield from merge_char_rows(bucket)
+
+
+def _insert_in_chunks(conn, table, rows, chunk_size=50000):
+    insert_sql = _DIALECT_ROW_INSERT.format(table=table)
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            conn.executemany(insert_sql, chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        conn.executemany(insert_sql, chunk)
+        total += len(chunk)
+    return total
 
 
-# 🚀 优化版本：分批處理，避免內存溢出
 def process_polyphonic_annotations(db_path: str):
+    """
+    合併重複讀音的註釋並標記多音字。
+    按 (簡稱, 漢字) 排序流式讀出，邊合併邊寫入 dialects_temp，內存佔用與數據量無關。
+    """
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    #  优化：设置 SQLite 性能参数
-    cursor.execute("PRAGMA synchronous = OFF")
-    cursor.execute("PRAGMA journal_mode = MEMORY")
-
-    # 先獲取所有唯一的簡稱
-    cursor.execute("SELECT DISTINCT 簡稱 FROM dialects")
-    locations = [row[0] for row in cursor.fetchall()]
-    total_locations = len(locations)
+    _set_bulk_write_pragmas(conn)
 
-    print(f"📍 共有 {total_locations} 個地點待處理\n")
+    total_rows = cursor.execute("SELECT COUNT(*) FROM dialects").fetchone()[0]
+    total_locations = cursor.execute("SELECT COUNT(DISTINCT 簡稱) FROM dialects").fetchone()[0]
+    print(f"📍 共有 {total_locations} 個地點待處理（{total_rows} 筆數據）\n")
 
     # 創建臨時表存儲處理後的結果
     cursor.execute("DROP TABLE IF EXISTS dialects_temp")
@@ -545,104 +951,29 @@ def process_polyphonic_annotations(db_path: str):
         )
     ''')
 
-    # 分批處理地點（每次處理 20 個）
-    batch_size = 50
-    total_batches = (total_locations + batch_size - 1) // batch_size
+    read_cursor = conn.cursor()
+    read_cursor.execute(f"{_DIALECT_ROW_SELECT} ORDER BY 簡稱, 漢字, rowid")
 
-    for batch_idx in range(0, total_locations, batch_size):
-        batch_locations = locations[batch_idx:batch_idx + batch_size]
-        batch_num = batch_idx // batch_size + 1
+    def with_progress(rows):
+        previous = None
+        count = 0
+        for row in rows:
+            if row[0] != previous:
+                previous = row[0]
+                count += 1
+                if count % 50 == 1 or count == total_locations:
+                    print(f"  [{count}/{total_locations}] 正在處理：{previous}")
+            yield row
 
-        print(f"\n[批次 {batch_num}/{total_batches}] 正在處理 {len(batch_locations)} 個地點...")
-        print(f"  地點：{', '.join(batch_locations[:5])}{'...' if len(batch_locations) > 5 else ''}")
-
-        # 讀取當前批次所有地點的數據
-        placeholders = ','.join(['?' for _ in batch_locations])
-        df = pd.read_sql_query(
-            f"SELECT * FROM dialects WHERE 簡稱 IN ({placeholders}) ORDER BY 簡稱, 漢字",
-            conn,
-            params=batch_locations
-        )
-
-        if len(df) == 0:
-            continue
-
-        print(f"  讀取了 {len(df)} 筆數據")
-
-        # 🚀 創建音韻特徵組合鍵
-        df['_phonetic_key'] = (df['聲母'].astype(str) + '|' +
-                               df['韻母'].astype(str) + '|' +
-                               df['聲調'].astype(str))
-
-        # 🚀 為每個 (簡稱, 漢字, 音節, 多音字) 組分配唯一ID，避免文白讀提前合併
-        df['_group_id'] = df.groupby(['簡稱', '漢字', '音節', '多音字']).ngroup()
-
-        # 🚀 計算每組的唯一音韻特徵數
-        phonetic_counts = df.groupby('_group_id')['_phonetic_key'].nunique()
-        df['_phonetic_count'] = df['_group_id'].map(phonetic_counts)
-
-        # 🚀 分離兩種情況：音韻一致 vs 音韻不一致
-        consistent_mask = df['_phonetic_count'] == 1
-        inconsistent_mask = ~consistent_mask
-
-        # === 處理音韻一致的組（需要合併註釋） ===
-        consistent_df = df[consistent_mask].copy()
-
-        # 🚀 向量化合併註釋
-        def agg_notes(series):
-            """聚合註釋：去空、去重、用分號連接"""
-            notes = series.dropna().astype(str).str.strip()
-            notes = notes[notes != '']
-            if len(notes) == 0:
-                return ''
-            return ';'.join(notes.unique())
-
-        # 🚀 使用 groupby.agg() 一次性處理所有組
-        if len(consistent_df) > 0:
-            consistent_merged = consistent_df.groupby('_group_id', as_index=False).agg({
-                '簡稱': 'first',
-                '漢字': 'first',
-                '音節': 'first',
-                '聲母': 'first',
-                '韻母': 'first',
-                '聲調': 'first',
-                '註釋': agg_notes,
-                '多音字': 'first'
-            })
-        else:
-            consistent_merged = pd.DataFrame(columns=['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字'])
-
-        # === 處理音韻不一致的組（保留所有行） ===
-        inconsistent_df = df[inconsistent_mask][
-            ['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字']].copy()
-
-        # 🚀 合併兩部分
-        merged_df = pd.concat([consistent_merged, inconsistent_df], ignore_index=True)
-
-        # 標記多音字（音節不同）- 保留文白讀 2/3，只給其他多音讀補 1
-        merged_df = apply_polyphonic_labels(merged_df, ['簡稱', '漢字'])
-
-        # 只保留需要的列，去除臨時列
-        final_columns = ['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字']
-        merged_df = merged_df[final_columns]
-
-        # 寫入臨時表
-        merged_df.to_sql("dialects_temp", conn, if_exists='append', index=False)
-
-        print(f"  處理後剩餘 {len(merged_df)} 筆（原始 {len(df)} 筆）")
-
-        # 釋放內存
-        del df, merged_df
+    written = _insert_in_chunks(conn, "dialects_temp", _iter_merged_dialect_rows(with_progress(read_cursor)))
+    print(f"\n  處理後剩餘 {written} 筆（原始 {total_rows} 筆）")
 
     print("\n⏳ 正在重建數據庫表...")
     cursor.execute("DROP TABLE IF EXISTS dialects")
     cursor.execute("ALTER TABLE dialects_temp RENAME TO dialects")
-
-    # 恢复正常模式
-    cursor.execute("PRAGMA synchronous = NORMAL")
-    cursor.execute("PRAGMA journal_mode = DELETE")
-
     conn.commit()
+    _restore_journal_mode(conn)
+
     conn.close()
     print("✅ 多音字處理完成")
 
@@ -654,7 +985,7 @@ def process_polyphonic_annotations_new(db_path: str, append: bool = False):
     # 如果 append 模式開啟，只保留指定簡稱
     if append:
         try:
-            df_append = pd.read_excel(APPEND_PATH, sheet_name="檔案")
+            df_append = read_excel_cached(APPEND_PATH, sheet_name="檔案")
             update_rows = df_append[df_append['待更新'] == 1]
             valid_簡稱 = update_rows['簡稱'].dropna().unique().tolist()
 
@@ -849,13 +1180,15 @@ def append_simplified_character_rows(df, char_column, unique_columns=None):
         for row in result[key_columns].itertuples(index=False, name=None)
     }
     new_rows = []
+    t2s = get_opencc('t2s.json')
+    t2s.precompute_single_chars()
 
     for row in result.to_dict("records"):
         char = str(row.get(char_column, "")).strip()
         if len(char) != 1:
             continue
 
-        simplified = traditional2simplified(char).strip()
+        simplified = t2s.convert(char).strip()
         if len(simplified) != 1 or simplified == char:
             continue
 
@@ -942,6 +1275,207 @@ def scan_update_directory():
     return tsv_files
 
 
+BUILD_MANIFEST_TABLE = "build_manifest"
+
+
+def _manifest_key(path):
+    """清單中的路徑統一存為相對 BASE_DIR 的路徑，換機器 / 換目錄後仍可對上"""
+    return os.path.relpath(os.path.abspath(path), BASE_DIR)
+
+
+def _file_content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _resolve_tsv_shortnames(path, query_db_path, abbreviation_index):
+    """TSV 匹配到的簡稱列表（首個為寫庫用的簡稱），匹配不到時返回 None"""
+    try:
+        tsv_result = get_tsvs(single=path, query_db_path=query_db_path, abbreviation_index=abbreviation_index)
+        if tsv_result and len(tsv_result) >= 2 and tsv_result[1]:
+            return list(tsv_result[1])
+    except (IndexError, TypeError):
+        pass
+    return None
+
+
+def _resolve_tsv_shortname(path, query_db_path, abbreviation_index):
+    shortnames = _resolve_tsv_shortnames(path, query_db_path, abbreviation_index)
+    return shortnames[0] if shortnames else None
+
+
+def _tone_map_hash(shortnames, tone_maps):
+    """
+    提取時該 TSV 所用調號映射（與 get_new 相同，按簡稱順序合併）的哈希。
+    聲調欄由它決定：元數據表中調值欄變了，TSV 沒變也要重新提取。query 庫沒有 tone_map 表時返回 None。
+    """
+    if tone_maps is None:
+        return None
+    tone_map = tone_map_for(shortnames, tone_maps)
+    return hashlib.sha1(repr(sorted(tone_map.items())).encode("utf-8")).hexdigest()
+
+
+def load_build_manifest(db_path):
+    """
+    讀取方言庫內的構建清單。
+
+    Returns:
+        dict: {相對路徑: {'size', 'mtime', 'hash', '簡稱', 'tone_hash'}}；數據庫或清單表不存在時返回 None
+        舊版清單沒有調號哈希欄，tone_hash 為 None（下次 incremental 會重新提取）
+    """
+    if not os.path.exists(db_path):
+        return None
+
+    with sqlite3.connect(db_path) as conn:
+        table = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (BUILD_MANIFEST_TABLE,)
+        ).fetchone()
+        if not table:
+            return None
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({BUILD_MANIFEST_TABLE})")}
+        tone_column = "調號哈希" if "調號哈希" in columns else "NULL"
+        rows = conn.execute(
+            f"SELECT 路徑, 文件大小, 修改時間, 內容哈希, 簡稱, {tone_column} FROM {BUILD_MANIFEST_TABLE}"
+        ).fetchall()
+
+    return {
+        path: {"size": size, "mtime": mtime, "hash": content_hash, "簡稱": abbr, "tone_hash": tone_hash}
+        for path, size, mtime, content_hash, abbr, tone_hash in rows
+    }
+
+
+def save_build_manifest(db_path, entries, replace=False, removed_paths=None):
+    """
+    寫入構建清單。
+
+    Args:
+        entries: {相對路徑: {'size', 'mtime', 'hash', '簡稱', 'tone_hash'}}
+        replace: True 時清空後重寫（全量構建）
+        removed_paths: 需要從清單中刪除的相對路徑
+    """
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {BUILD_MANIFEST_TABLE} (
+                路徑 TEXT PRIMARY KEY,
+                文件大小 INTEGER,
+                修改時間 REAL,
+                內容哈希 TEXT,
+                簡稱 TEXT,
+                調號哈希 TEXT
+            )
+        """)
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({BUILD_MANIFEST_TABLE})")}
+        if "調號哈希" not in columns:
+            conn.execute(f"ALTER TABLE {BUILD_MANIFEST_TABLE} ADD COLUMN 調號哈希 TEXT")
+        if replace:
+            conn.execute(f"DELETE FROM {BUILD_MANIFEST_TABLE}")
+        if removed_paths:
+            conn.executemany(
+                f"DELETE FROM {BUILD_MANIFEST_TABLE} WHERE 路徑 = ?",
+                [(path,) for path in removed_paths]
+            )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {BUILD_MANIFEST_TABLE} (路徑, 文件大小, 修改時間, 內容哈希, 簡稱, 調號哈希) "
+            f"VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (path, entry["size"], entry["mtime"], entry["hash"], entry["簡稱"], entry.get("tone_hash"))
+                for path, entry in entries.items()
+            ]
+        )
+        conn.commit()
+
+
+def invalidate_build_manifest(db_path, 簡稱_list):
+    """append / update 模式改寫了這些方言點，清掉其清單記錄，下次 incremental 會重新提取"""
+    if not 簡稱_list or load_build_manifest(db_path) is None:
+        return
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            f"DELETE FROM {BUILD_MANIFEST_TABLE} WHERE 簡稱 = ?",
+            [(abbr,) for abbr in 簡稱_list]
+        )
+        conn.commit()
+
+
+def fingerprint_tsv_files(tsv_paths, query_db_path, manifest=None):
+    """
+    計算 TSV 的大小、修改時間、內容哈希、匹配到的簡稱與所用調號映射的哈希，並與舊清單比較。
+    大小和修改時間都沒變的文件直接沿用舊哈希，不重新讀文件。
+
+    Returns:
+        tuple: (entries, changed_paths, removed_keys)
+            - entries: {相對路徑: 清單條目}，覆蓋當前所有可匹配的 TSV
+            - changed_paths: 新增、內容變化、簡稱變化或調號映射變化的 TSV 路徑
+            - removed_keys: 舊清單中已不存在的相對路徑
+    """
+    manifest = manifest or {}
+    abbreviation_index = get_abbreviation_index(query_db_path)
+    tone_maps = load_tone_maps(query_db_path)
+    entries = {}
+    changed_paths = []
+
+    for path in tsv_paths:
+        if path == "_":
+            continue
+        key = _manifest_key(path)
+        stat = os.stat(path)
+        previous = manifest.get(key)
+
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            content_hash = previous["hash"]
+        else:
+            content_hash = _file_content_hash(path)
+
+        shortnames = _resolve_tsv_shortnames(path, query_db_path, abbreviation_index)
+        if shortnames is None:
+            continue
+        abbr = shortnames[0]
+        tone_hash = _tone_map_hash(shortnames, tone_maps)
+
+        entries[key] = {
+            "size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash, "簡稱": abbr, "tone_hash": tone_hash,
+        }
+        if (not previous or previous["hash"] != content_hash or previous["簡稱"] != abbr
+                or previous.get("tone_hash") != tone_hash):
+            changed_paths.append(path)
+
+    removed_keys = [key for key in manifest if key not in entries]
+    return entries, changed_paths, removed_keys
+
+
+def plan_incremental_paths(tsv_paths, manifest, entries, changed_paths, removed_keys):
+    """
+    incremental 模式實際要重新提取的 TSV。
+    寫庫按簡稱整體刪除舊行，多個 TSV 可匹配到同一簡稱：
+    只要其中一個新增、變化、刪除或改了簡稱，同簡稱下沒變的 TSV 也要一起重新提取，否則它們的行會被刪掉而不補回。
+
+    Returns:
+        tuple: (按原順序的待處理路徑, 舊數據要先刪除的簡稱列表（已刪除或改了簡稱的 TSV 原來的簡稱）)
+    """
+    changed_keys = {_manifest_key(path) for path in changed_paths}
+    stale_簡稱 = (
+        {manifest[key]["簡稱"] for key in removed_keys}
+        | {
+            manifest[key]["簡稱"] for key, entry in entries.items()
+            if key in manifest and manifest[key]["簡稱"] != entry["簡稱"]
+        }
+    )
+    affected = stale_簡稱 | {entries[key]["簡稱"] for key in changed_keys if key in entries}
+
+    paths = []
+    for path in tsv_paths:
+        if path == "_":
+            continue
+        key = _manifest_key(path)
+        entry = entries.get(key)
+        if key in changed_keys or (entry is not None and entry["簡稱"] in affected):
+            paths.append(path)
+    return paths, sorted(stale_簡稱)
+
+
 def process_polyphonic_annotations_selective(db_path: str, 簡稱_list: list):
     """
     Process polyphonic annotations for specific dialects only
@@ -959,8 +1493,7 @@ def process_polyphonic_annotations_selective(db_path: str, 簡稱_list: list):
     cursor = conn.cursor()
 
     # Performance optimization
-    cursor.execute("PRAGMA synchronous = OFF")
-    cursor.execute("PRAGMA journal_mode = MEMORY")
+    _set_bulk_write_pragmas(conn)
 
     print(f"📝 處理多音字標記（僅處理 {len(簡稱_list)} 個方言點）...")
 
@@ -969,86 +1502,40 @@ def process_polyphonic_annotations_selective(db_path: str, 簡稱_list: list):
         print(f"[{idx}/{len(簡稱_list)}] 正在處理：{簡稱}")
 
         # Read only this dialect's data
-        query = "SELECT * FROM dialects WHERE 簡稱 = ? ORDER BY 漢字"
-        df = pd.read_sql_query(query, conn, params=(簡稱,))
+        cursor.execute(f"{_DIALECT_ROW_SELECT} WHERE 簡稱 = ? ORDER BY 漢字, rowid", (簡稱,))
+        merged_rows = list(_iter_merged_dialect_rows(cursor))
 
-        if df.empty:
+        if not merged_rows:
             continue
 
-        # Create phonetic key
-        df['_phonetic_key'] = (df['聲母'].astype(str) + '|' +
-                               df['韻母'].astype(str) + '|' +
-                               df['聲調'].astype(str))
-
-        # Group by (漢字, 音節, 多音字)，避免文白讀提前合併
-        df['_group_id'] = df.groupby(['漢字', '音節', '多音字']).ngroup()
-
-        # Count unique phonetic features per group
-        phonetic_counts = df.groupby('_group_id')['_phonetic_key'].nunique()
-        df['_phonetic_count'] = df['_group_id'].map(phonetic_counts)
-
-        # Process consistent groups (merge notes)
-        consistent_mask = df['_phonetic_count'] == 1
-
-        if consistent_mask.any():
-            consistent_df = df[consistent_mask].copy()
-
-            def agg_notes(series):
-                notes = series.dropna().astype(str).str.strip()
-                notes = notes[notes != '']
-                if len(notes) == 0:
-                    return ''
-                return ';'.join(notes.unique())
-
-            consistent_merged = consistent_df.groupby('_group_id', as_index=False).agg({
-                '簡稱': 'first',
-                '漢字': 'first',
-                '音節': 'first',
-                '聲母': 'first',
-                '韻母': 'first',
-                '聲調': 'first',
-                '註釋': agg_notes,
-                '多音字': 'first'
-            })
-
-            # Delete old records for this 簡稱
-            cursor.execute("DELETE FROM dialects WHERE 簡稱 = ?", (簡稱,))
-
-            # Insert merged records
-            inconsistent_df = df[~consistent_mask][
-                ['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字']].copy()
-            merged_df = pd.concat([consistent_merged, inconsistent_df], ignore_index=True)
-        else:
-            # No merging needed, just use original data
-            cursor.execute("DELETE FROM dialects WHERE 簡稱 = ?", (簡稱,))
-            merged_df = df[['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字']].copy()
-
-        # Mark polyphonic characters while preserving wen/bai labels
-        merged_df = apply_polyphonic_labels(merged_df, ['漢字'])
-
-        # 只保留需要的列，去除臨時列
-        final_columns = ['簡稱', '漢字', '音節', '聲母', '韻母', '聲調', '註釋', '多音字']
-        merged_df = merged_df[final_columns]
-
-        # Re-insert processed data
-        merged_df.to_sql('dialects', conn, if_exists='append', index=False)
+        # Delete old records for this 簡稱 and re-insert processed data
+        cursor.execute("DELETE FROM dialects WHERE 簡稱 = ?", (簡稱,))
+        _insert_in_chunks(conn, "dialects", merged_rows)
 
     conn.commit()
-
-    # Restore normal mode
-    cursor.execute("PRAGMA synchronous = NORMAL")
-    cursor.execute("PRAGMA journal_mode = DELETE")
+    _restore_journal_mode(conn)
 
     conn.close()
     print("✅ 多音字處理完成")
 
 
-def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False, mode='admin'):
+def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False, mode='admin', jobs=1,
+                 syllable_cache=False, incremental=False, resume=True, status_cube=False):
     """
     Args:
         mode: 'admin' 或 'user'
         append: 從 Excel 配置文件讀取待更新列表
         update: 從 UPDATE_DATA_DIR 目錄讀取所有 TSV 文件進行增量更新
+        incremental: 按構建清單（TSV 內容哈希）只重新提取新增、變化或刪除的方言點
+        jobs: 解析 TSV 的進程數，>1 時並行解析、單進程按文件順序寫庫
+        syllable_cache: 是否在兩次運行之間持久化音節拆分緩存（SYLLABLE_CACHE_PATH）
+        resume: 全量構建時沿用上次中斷留下的暫存庫，從最後完成的方言點繼續；False 時刪掉暫存庫從頭構建。
+                暫存庫的構建簽名（音節拆分規則、query 庫調號映射）與本次不同時也會刪掉重建
+        status_cube: 建完索引後生成地位特徵預聚合表；正式方言庫中已有該表時總會維護它
+                     （全量構建在暫存庫中重新生成，其餘模式刷新改動過的方言點）
+
+    Returns:
+        dict: {步驟名: 耗時秒數}
     """
 
     # 記錄開始時間
@@ -1085,6 +1572,32 @@ def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False,
             if os.path.splitext(os.path.basename(p))[0] not in exclude_files
         ]
 
+    # 計算 TSV 指紋；incremental 模式據此只保留需要重新提取的文件
+    manifest_entries = {}
+    manifest_removed = []
+    stale_簡稱 = []
+    if incremental and not update and not append:
+        manifest = load_build_manifest(dialects_db_path)
+        if manifest is None:
+            print("⚠️ 方言庫中沒有構建清單，incremental 模式改為全量構建")
+            incremental = False
+        manifest_entries, changed_paths, manifest_removed = fingerprint_tsv_files(
+            tsv_paths, query_db_path, manifest
+        )
+        if incremental:
+            print(f"   incremental 模式：{len(changed_paths)} 個 TSV 新增或變化，"
+                  f"{len(manifest_removed)} 個已刪除")
+            tsv_paths, stale_簡稱 = plan_incremental_paths(
+                tsv_paths, manifest, manifest_entries, changed_paths, manifest_removed
+            )
+            if stale_簡稱:
+                with sqlite3.connect(dialects_db_path) as conn_stale:
+                    conn_stale.executemany("DELETE FROM dialects WHERE 簡稱 = ?", [(abbr,) for abbr in stale_簡稱])
+                    conn_stale.commit()
+                print(f"   已刪除 {len(stale_簡稱)} 個失效方言點的舊數據：{stale_簡稱}")
+    elif not update and not append:
+        manifest_entries, _, _ = fingerprint_tsv_files(tsv_paths, query_db_path)
+
     print(f"   共 {len(tsv_paths)} 個 TSV 文件待處理")
 
     # 5. 寫入總數據表
@@ -1093,7 +1606,45 @@ def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False,
     print(f"{'=' * 60}")
     step2_start = time.time()
     db_path = os.path.join(os.getcwd(), dialects_db_path)
-    processed_簡稱 = process_all2sql(tsv_paths, db_path, append, update, query_db_path=query_db_path)
+    # 全量構建寫入暫存庫，建完索引後再整體替換正式庫；其餘模式就地修改正式庫
+    full_build = not append and not update and not incremental
+    write_db_path = staging_db_path(db_path) if full_build else db_path
+    signature = compute_build_signature(query_db_path) if full_build else None
+    if full_build:
+        if not resume:
+            discard_staging_db(write_db_path)
+        elif not staging_matches_build(write_db_path, signature):
+            print("⚠️ 暫存庫由不同的拆分規則或調號映射寫入，不能續建，從頭構建")
+            discard_staging_db(write_db_path)
+        print(f"   全量構建寫入暫存庫：{write_db_path}")
+    syllable_cache_path = SYLLABLE_CACHE_PATH if syllable_cache else None
+    if syllable_cache_path:
+        loaded = SYLLABLE_CACHE.load(syllable_cache_path)
+        print(f"   已載入音節緩存：{loaded} 條")
+    syllable_stats = {"hits": 0, "misses": 0}
+    # append 模式沿用寫庫後整表合併（步驟3），其餘模式在提取時就完成合併
+    processed_簡稱 = process_all2sql(tsv_paths, write_db_path, append, update or incremental,
+                                   query_db_path=query_db_path, jobs=jobs, syllable_cache_path=syllable_cache_path,
+                                   syllable_stats=syllable_stats, merge_polyphonic=not append,
+                                   track_progress=full_build, build_signature=signature)
+    if syllable_cache_path:
+        SYLLABLE_CACHE.save(syllable_cache_path)
+
+    # 更新構建清單：寫庫失敗的文件不記錄，下次 incremental 會重試
+    if update or append:
+        invalidate_build_manifest(dialects_db_path, processed_簡稱)
+    else:
+        processed_set = set(processed_簡稱 or [])
+        changed_keys = {_manifest_key(p) for p in tsv_paths if p != "_"}
+        save_build_manifest(
+            write_db_path,
+            {
+                key: entry for key, entry in manifest_entries.items()
+                if entry["簡稱"] in processed_set or key not in changed_keys
+            },
+            replace=not incremental,
+            removed_paths=manifest_removed,
+        )
     step_times['步驟2：寫入方言數據'] = time.time() - step2_start
 
     # 5. 處理重複行和多音字
@@ -1102,42 +1653,56 @@ def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False,
     print(f"{'=' * 60}")
     step3_start = time.time()
 
-    if update and processed_簡稱:
-        # Use selective processing for update mode (more efficient)
-        process_polyphonic_annotations_selective(dialects_db_path, processed_簡稱)
-    else:
-        # Use full processing for normal/append mode
+    if append:
+        # append 模式：舊數據與新寫入的行一起整表合併
         process_polyphonic_annotations(dialects_db_path)
+    else:
+        print("⏭️  多音字已在提取時合併，跳過整表重寫")
+    step_times['步驟3：處理重複行和多音字'] = time.time() - step3_start
 
-    if not update:
-        conn_indexes = sqlite3.connect(dialects_db_path)
+    print(f"\n{'=' * 60}")
+    print(f"步驟4：創建索引...")
+    print(f"{'=' * 60}")
+    index_start = time.time()
+    if not update and not incremental:
+        conn_indexes = sqlite3.connect(write_db_path)
         ensure_dialects_indexes(conn_indexes)
         conn_indexes.commit()
         conn_indexes.close()
     else:
-        print("⏭️  update 模式：跳過創建索引（索引已存在）")
-
-    step_times['步驟3：處理重複行和多音字'] = time.time() - step3_start
+        print("⏭️  update / incremental 模式：跳過創建索引（索引已存在）")
+    # 看正式庫而不是暫存庫：全量構建替換正式庫時不能把已有的預聚合表丟掉
+    if status_cube or has_status_cube(db_path):
+        # 全量構建在暫存庫中整表生成；其餘模式只重算本次寫入或刪除的方言點
+        build_status_cube(
+            write_db_path,
+            characters_db_path=CHARACTERS_DB_PATH,
+            abbrs=None if full_build else sorted(set(processed_簡稱 or []) | set(stale_簡稱)),
+        )
+    if full_build:
+        finalize_staging_db(write_db_path, db_path)
+    step_times['步驟4：創建索引'] = time.time() - index_start
 
     # 6. 同步存儲標記
     print(f"\n{'=' * 60}")
-    print(f"步驟4：同步存儲標記...")
+    print(f"步驟5：同步存儲標記...")
     print(f"{'=' * 60}")
     step4_start = time.time()
     sync_dialects_flags(
         all_db_path=dialects_db_path,
-        query_db_path=query_db_path
+        query_db_path=query_db_path,
+        log_path=CHARACTERS_DB_PATH
     )
-    step_times['步驟4：同步存儲標記'] = time.time() - step4_start
+    step_times['步驟5：同步存儲標記'] = time.time() - step4_start
 
     # 7. 寫入漢字地位表（可選）
     if write_chars_db:
         print(f"\n{'=' * 60}")
-        print(f"步驟5：寫入漢字地位表...")
+        print(f"步驟6：寫入漢字地位表...")
         print(f"{'=' * 60}")
         step5_start = time.time()
         process_phonology_excel()
-        step_times['步驟5：寫入漢字地位表'] = time.time() - step5_start
+        step_times['步驟6：寫入漢字地位表'] = time.time() - step5_start
 
     # 計算總時間
     total_time = time.time() - start_time
@@ -1161,8 +1726,15 @@ def write_to_sql(yindian=None, write_chars_db=None, append=False, update=False,
         print(f"  ✅ 總執行時間: {total_minutes}分{total_seconds:.2f}秒")
     else:
         print(f"  ✅ 總執行時間: {total_seconds:.2f}秒")
+
+    lookups = syllable_stats["hits"] + syllable_stats["misses"]
+    if lookups:
+        hit_rate = syllable_stats["hits"] / lookups * 100
+        print(f"  🔁 音節緩存命中率: {hit_rate:.1f}%（{syllable_stats['hits']}/{lookups}）")
     print(f"{'=' * 60}\n")
 
+    return step_times
+
 
 def _spec_value(spec, key, default=None):
     if spec is None:
@@ -0,0 +1,47 @@
+import unittest
+
+from common.characters_index import CharactersIndex
+
+
+def make_index(rows, multi_flags=True):
+    chars = [char for char, _ in rows]
+    columns = {col: [values.get(col) for _, values in rows] for col in ("組", "等", "攝")}
+    flags = None
+    if multi_flags:
+        counts = {char: chars.count(char) for char in chars}
+        flags = ["1" if counts[char] > 1 else "" for char in chars]
+    return CharactersIndex(chars, columns, flags)
+
+
+class CharactersIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = make_index([
+            ('知', {'組': '知', '等': '三', '攝': '止'}),
+            ('張', {'組': '知', '等': '三', '攝': '宕'}),
+            ('長', {'組': '知', '等': '三', '攝': '宕'}),
+            ('長', {'組': '端', '等': '三', '攝': '宕'}),
+            ('中', {'組': '知', '等': '三', '攝': '通'}),
+            ('中', {'組': '知', '等': '三', '攝': '通'}),
+            ('端', {'組': '端', '等': '一', '攝': None}),
+        ])
+
+    def test_path_conditions_intersect_in_row_order(self):
+        chars, _ = self.index.query([('知', '組'), ('三', '等')])
+
+        self.assertEqual(chars, ['知', '張', '長', '中', '中'])
+        self.assertEqual(self.index.query([('知', '組'), ('一', '等')]), ([], []))
+        self.assertEqual(self.index.query([('知', '不存在')]), ([], []))
+
+    def test_multi_status_uses_all_rows_of_the_character(self):
+        # 長 在「組」上有知、端兩個地位；中 兩行地位相同，不算多地位
+        self.assertEqual(self.index.query([('知', '組'), ('三', '等')])[1], ['長'])
+        self.assertEqual(self.index.query([('三', '等')])[1], [])
+        self.assertEqual(make_index([('長', {'組': '知'}), ('長', {'組': '端'})], False).query([('知', '組')])[1], [])
+
+    def test_values_are_sorted_without_nulls(self):
+        self.assertEqual(self.index.values('攝'), sorted(['止', '宕', '通']))
+        self.assertEqual(self.index.values('不存在'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import unittest
+
+from source.tsv2sql import _manifest_key, plan_incremental_paths
+
+
+def entry(abbr, content_hash="h"):
+    return {"size": 1, "mtime": 1.0, "hash": content_hash, "簡稱": abbr, "tone_hash": "t"}
+
+
+class PlanIncrementalPathsTests(unittest.TestCase):
+    def setUp(self):
+        self.paths = [os.path.join("data", "processed", f"{name}.tsv") for name in ("甲1", "甲2", "乙", "丙")]
+        self.keys = [_manifest_key(path) for path in self.paths]
+        self.manifest = {key: entry(abbr) for key, abbr in zip(self.keys, ("甲", "甲", "乙", "丙"))}
+
+    def test_unchanged_tsv_sharing_abbreviation_is_reextracted(self):
+        entries = dict(self.manifest)
+        entries[self.keys[0]] = entry("甲", "新")
+
+        paths, stale = plan_incremental_paths(self.paths, self.manifest, entries, [self.paths[0]], [])
+
+        self.assertEqual(paths, self.paths[:2])
+        self.assertEqual(stale, [])
+
+    def test_removed_or_remapped_tsv_pulls_in_old_abbreviation(self):
+        # 甲2 已刪除；丙 改匹配到 乙
+        entries = {key: self.manifest[key] for key in self.keys if key != self.keys[1]}
+        entries[self.keys[3]] = entry("乙")
+        current = [path for path in self.paths if path != self.paths[1]]
+
+        paths, stale = plan_incremental_paths(current, self.manifest, entries, [self.paths[3]], [self.keys[1]])
+
+        self.assertEqual(paths, [self.paths[0], self.paths[2], self.paths[3]])
+        self.assertEqual(stale, sorted(["甲", "丙"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
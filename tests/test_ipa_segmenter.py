@@ -0,0 +1,117 @@
+import random
+import re
+import unittest
+
+from common.constants import vowel_pattern
+from common.ipa_segmenter import RHYME_TRANSLATION, parse_syllable
+
+# 原 get_new 中逐個 str.replace 的韻母 / 聲母替換表（鼻化元音拆成「元音 + U+0303」）
+OLD_RHYME_REPLACEMENTS = {
+    'ε': 'ɛ', "α": "ɑ", "ʯ": "ʮ", "∅": "ø", "ο": "o", "ǝ": "ə", "о": "o", "у": "y", "е": "e",
+    "ã": "ã", "ẽ": "ẽ", "ĩ": "ĩ", "ī": "ĩ", "ā": "ã",
+    "ỹ": "ỹ", "õ": "õ", "ʱ": "ʰ", "ˡ": "ʰ"
+}
+OLD_CONSONANT_REPLACEMENTS = {
+    '∫': 'ʃ', 'th': 'tʰ', 'kh': 'kʰ', 'ph': 'pʰ',
+    'tsh': 'tsʰ', "ς": "ɕ", 'ts': 'ʦ', 'tʃ': 'ʧ', 'tɕ': 'ʨ',
+    "∨": "v", "ł": "ɬ", "tʰs": "ʦʰ", "(ʔ)": "ʔ", "∅": "ʔ", "Ǿ": "ʔ"
+}
+
+
+def old_split_syllable(phon):
+    """原 extract_all_from_files 的逐字正則拆分（聲母、韻母），作為對照"""
+    consonant = ""
+    rhyme_start = 0
+    if phon and phon[0] in {"∅", "Ø"}:
+        consonant = "ʔ"
+    else:
+        if not re.search(vowel_pattern, re.split(r"\d", phon)[0]):
+            vowel_fallback = r"([ʐɣmnŋɲȵƞʋvʒlḷfzr])"
+            if re.match(r"^[mn]ŋ", phon):
+                consonant = phon[0]
+                rhyme_start = 1
+            elif re.match(vowel_fallback, phon[0]):
+                consonant = "/"
+            elif not re.search(vowel_fallback, phon):
+                consonant = ""
+            else:
+                for char in phon:
+                    if re.match(vowel_fallback, char) or re.match(r'\d', char):
+                        break
+                    consonant += char
+        else:
+            if re.match(vowel_pattern, phon[0]):
+                consonant = "/"
+            elif 'j' in phon[1:] or 'ʲ' in phon[1:]:
+                for char in phon:
+                    if re.match(vowel_pattern, char) or char in ('j', 'ʲ'):
+                        break
+                    consonant += char
+            else:
+                for char in phon:
+                    if re.match(vowel_pattern, char):
+                        break
+                    consonant += char
+        consonant = re.sub(r"\d", "", consonant)
+
+    all_rhymes = []
+    tmp_phon = phon[1:] if phon.startswith(("∅", "Ø")) else phon[rhyme_start:]
+    if 'j' not in tmp_phon[1:] and 'ʲ' not in tmp_phon[1:]:
+        vowel_found = False
+        for c in tmp_phon:
+            if re.match(vowel_pattern, c) and not vowel_found:
+                vowel_found = True
+                all_rhymes.append(c)
+            elif vowel_found and (c.isdigit() or c.isspace()):
+                break
+            elif vowel_found:
+                all_rhymes.append(c)
+        if not vowel_found and any(c in tmp_phon for c in "ʐzflḷɣmnŋȵɲƞʋvʒr"):
+            match = re.search(r".*?([ʐzflḷɣrmnŋɲȵƞʋvʒ].*?)(?=\d|\s|$)", tmp_phon)
+            if match:
+                all_rhymes += list(match.group(1))
+    else:
+        match = re.search(rf"[{vowel_pattern.strip('[]')}jʲ][^\d\s]*", tmp_phon)
+        if match:
+            all_rhymes = list(match.group(0))
+
+    rhyme = ''.join(c for c in all_rhymes if not (c.isdigit() or re.match(r'[一-鿿]', c)))
+    for old, new in OLD_RHYME_REPLACEMENTS.items():
+        rhyme = rhyme.replace(old, new)
+    for old, new in OLD_CONSONANT_REPLACEMENTS.items():
+        consonant = consonant.replace(old, new)
+    return consonant, rhyme
+
+
+class ParseSyllableTests(unittest.TestCase):
+    def assert_same_as_old(self, syllables):
+        for phon in syllables:
+            with self.subTest(phon=phon):
+                self.assertEqual(parse_syllable(phon)[:2], old_split_syllable(phon))
+
+    def test_translation_table_matches_replace_loop(self):
+        keys = [chr(code) for code in RHYME_TRANSLATION]
+        self.assertEqual(set(keys), set(OLD_RHYME_REPLACEMENTS))
+        self.assert_same_as_old(
+            syllable
+            for key in keys
+            for syllable in (f"t{key}55", f"{key}n33", f"ts{key}ŋ21", f"pj{key}5", f"m{key}{key}13")
+        )
+        self.assertEqual(parse_syllable("tã55")[1], "ã")
+
+    def test_random_syllables_match_old_parser(self):
+        alphabet = (
+            "ptkbdgmnŋɲȵszʃɕʂʐxhɦfvlrjʲwʔ∅Ø"
+            "aeiouyɛɑɔəɐɤɯʉøœæɪʊʮɿʅ" + "".join(OLD_RHYME_REPLACEMENTS) + "ʰʱˡ̩̃"
+        )
+        rng = random.Random(20261017)
+        syllables = []
+        for _ in range(5000):
+            body = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+            tone = "".join(rng.choice("123456789") for _ in range(rng.randint(0, 2)))
+            syllables.append(body + tone + rng.choice(["", "a", "b"]))
+        self.assert_same_as_old(syllables)
+
+
+if __name__ == '__main__':
+    unittest.main()
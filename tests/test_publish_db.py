@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from source import publish_db
+
+
+def make_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE dialects (簡稱 TEXT, 漢字 TEXT)")
+    conn.executemany("INSERT INTO dialects VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def read_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT 簡稱, 漢字 FROM dialects ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+@unittest.skipUnless(hasattr(os, "symlink"), "需要符號鏈接")
+class PublishDatabasesTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmpdir.name)
+        self.query_db = self.root / 'query_admin.db'
+        self.dialects_db = self.root / 'dialects_admin.db'
+        self.releases_dir = self.root / 'releases'
+        self.current = self.root / 'current'
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def publish(self, **kwargs):
+        return publish_db.publish_databases(
+            db_paths=(str(self.query_db), str(self.dialects_db)),
+            releases_dir=str(self.releases_dir),
+            current_path=str(self.current),
+            **kwargs,
+        )
+
+    def test_publish_switches_current_to_checked_wal_snapshot(self):
+        make_db(self.query_db, [('廣州', '東')])
+        make_db(self.dialects_db, [('廣州', '東'), ('廣州', '西')])
+
+        release = self.publish()
+
+        self.assertTrue(self.current.is_symlink())
+        self.assertEqual(os.path.realpath(self.current), os.path.realpath(release))
+        served = self.current / 'dialects_admin.db'
+        # 連接全部關閉後 SQLite 會刪掉 -wal / -shm，先於任何讀取檢查
+        self.assertTrue(Path(str(served) + '-wal').exists())
+        self.assertTrue(Path(str(served) + '-shm').exists())
+        self.assertEqual(read_rows(served), [('廣州', '東'), ('廣州', '西')])
+        conn = sqlite3.connect(served)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertIsNotNone(conn.execute("SELECT name FROM sqlite_master WHERE name='sqlite_stat1'").fetchone())
+        finally:
+            conn.close()
+        self.assertTrue((Path(release) / publish_db.RELEASE_MANIFEST).exists())
+
+        # 構建流程之後改寫源庫，不影響正在服務的版本
+        conn = sqlite3.connect(self.dialects_db)
+        conn.execute("DROP TABLE dialects")
+        conn.commit()
+        conn.close()
+        self.assertEqual(read_rows(served), [('廣州', '東'), ('廣州', '西')])
+
+    def test_missing_source_reuses_current_release_and_prunes_old_versions(self):
+        make_db(self.query_db, [('廣州', '東')])
+        make_db(self.dialects_db, [('廣州', '東')])
+        first = self.publish(keep=1)
+        os.remove(self.dialects_db)
+
+        second = self.publish(keep=1)
+        third = self.publish(keep=1)
+
+        self.assertEqual(read_rows(Path(third) / 'dialects_admin.db'), [('廣州', '東')])
+        # 只保留最新版本和切換前的服務版本
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+        self.assertEqual(sorted(os.listdir(self.releases_dir)), sorted([Path(second).name, Path(third).name]))
+
+    def test_corrupt_database_is_not_published(self):
+        make_db(self.query_db, [('廣州', '東')])
+        make_db(self.dialects_db, [('廣州', '東')])
+        first = self.publish()
+
+        original = publish_db._check_and_analyze
+        with mock.patch.object(
+                publish_db, '_check_and_analyze',
+                lambda path: ['*** in database main ***'] if path.endswith('dialects_admin.db') else original(path),
+        ):
+            self.assertIsNone(self.publish())
+
+        self.assertEqual(os.path.realpath(self.current), os.path.realpath(first))
+        self.assertEqual(os.listdir(self.releases_dir), [Path(first).name])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from common import db_pool
+from source import status_cube
+
+
+def make_dialects_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE dialects (簡稱 TEXT, 漢字 TEXT, 聲母 TEXT, 韻母 TEXT, 聲調 TEXT)")
+    conn.executemany("INSERT INTO dialects VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def make_characters_db(path, rows):
+    columns = ", ".join(status_cube.STATUS_CUBE_COLUMNS)
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE characters (漢字 TEXT, {columns})")
+    for char, values in rows:
+        record = [values.get(col) for col in status_cube.STATUS_CUBE_COLUMNS]
+        conn.execute(f"INSERT INTO characters VALUES ({', '.join('?' * (len(record) + 1))})", [char, *record])
+    conn.commit()
+    conn.close()
+
+
+def cube_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(
+            (*row[:-1], tuple(sorted(row[-1].split(","))))
+            for row in conn.execute(f"SELECT * FROM {status_cube.STATUS_CUBE_TABLE}")
+        )
+    finally:
+        conn.close()
+
+
+class StatusCubeTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        root = Path(self._tmpdir.name)
+        self.dialects_db = str(root / 'dialects.db')
+        self.characters_db = str(root / 'characters.db')
+        make_characters_db(self.characters_db, [
+            ('知', {'組': '知', '等': '三'}),
+            ('張', {'組': '知', '等': '三'}),
+            ('端', {'組': '端', '等': '一'}),
+        ])
+        make_dialects_db(self.dialects_db, [
+            ('廣州', '知', 'tʃ', 'i', '55'),
+            ('廣州', '張', 'tʃ', 'œŋ', '55'),
+            ('廣州', '張', 'ts', 'œŋ', '55'),
+            ('廣州', '端', 't', 'yn', '55'),
+            ('梅縣', '知', 'ts', 'ɿ', '44'),
+            ('梅縣', '張', None, 'oŋ', '44'),
+        ])
+
+    def tearDown(self):
+        db_pool.close_read_connections()
+        self._tmpdir.cleanup()
+
+    def test_counts_distinct_characters_per_feature_value(self):
+        status_cube.build_status_cube(self.dialects_db, self.characters_db)
+
+        df = status_cube.query_status_cube(['梅縣', '廣州'], '組', '知', '聲母', db_path=self.dialects_db)
+
+        self.assertEqual(
+            [(r['地點'], r['特徵值'], r['字數'], r['總字數'], sorted(r['對應字'])) for r in df.to_dict('records')],
+            [('梅縣', 'ts', 1, 2, ['知']), ('廣州', 'ts', 1, 2, ['張']), ('廣州', 'tʃ', 2, 2, ['張', '知'])],
+        )
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        status_cube.build_status_cube(self.dialects_db, self.characters_db)
+        conn = sqlite3.connect(self.dialects_db)
+        conn.execute("UPDATE dialects SET 聲母 = 'ts' WHERE 簡稱 = '廣州'")
+        conn.execute("DELETE FROM dialects WHERE 簡稱 = '梅縣'")
+        conn.execute("INSERT INTO dialects VALUES ('潮州', '端', 't', 'uaŋ', '33')")
+        conn.commit()
+        conn.close()
+
+        # 只指定廣州；潮州（新增）和梅縣（已刪除）由 dialects 表對比找出
+        refreshed = status_cube.build_status_cube(self.dialects_db, self.characters_db, abbrs=['廣州'])
+        incremental = cube_rows(self.dialects_db)
+        status_cube.build_status_cube(self.dialects_db, self.characters_db)
+
+        self.assertEqual(refreshed, 2)
+        self.assertEqual(incremental, cube_rows(self.dialects_db))
+
+
+if __name__ == '__main__':
+    unittest.main()
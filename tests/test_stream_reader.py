@@ -0,0 +1,69 @@
+import re
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from common.stream_reader import iter_xlsx_rows, read_sheet_headers, rewrite_xlsx_header
+
+
+def set_dimension(path, ref):
+    """把各工作表 XML 中的 dimension 改成 ref（模擬其他工具寫出的過期 dimension）"""
+    tmp_path = path.with_suffix('.tmp')
+    with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp_path, 'w') as zout:
+        for info in zin.infolist():
+            data = zin.read(info)
+            if info.filename.startswith('xl/worksheets/'):
+                data = re.sub(rb'<dimension ref="[^"]*"\s*/>', f'<dimension ref="{ref}"/>'.encode(), data)
+            zout.writestr(info, data)
+    tmp_path.replace(path)
+
+
+class StreamReaderTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmpdir.name) / '字表.xlsx'
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = '字表'
+        ws.append(['字', '音', '釋', '備註', '來源'])
+        ws.append(['知', 'ti', None, None, '甲'])
+        ws.append([])
+        ws.append(['張', 'tiang', '姓', None, None, '乙'])
+        other = wb.create_sheet('其他')
+        other.append(['k', 'v'])
+        other.merge_cells('A3:B3')
+        other.column_dimensions['A'].width = 33
+        other['A1'].font = Font(bold=True)
+        wb.save(self.path)
+        set_dimension(self.path, 'A1:B2')
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_stale_dimension_keeps_all_columns(self):
+        expected = list(load_workbook(self.path, data_only=True).active.iter_rows(values_only=True))
+
+        self.assertEqual(list(iter_xlsx_rows(self.path)), expected)
+        self.assertEqual(len(expected[0]), 6)
+        self.assertEqual(read_sheet_headers(str(self.path))['字表'], ('字', '音', '釋', '備註', '來源', None))
+
+    def test_rewrite_header_only_touches_target_cells(self):
+        rewrite_xlsx_header(self.path, '字表', {1: 'IPA_程序改名'})
+
+        wb = load_workbook(self.path)
+        rows = list(wb['字表'].iter_rows(values_only=True))
+        self.assertEqual(rows[0], ('字', 'IPA_程序改名', '釋', '備註', '來源', None))
+        self.assertEqual(rows[3], ('張', 'tiang', '姓', None, None, '乙'))
+        other = wb['其他']
+        self.assertEqual([str(r) for r in other.merged_cells.ranges], ['A3:B3'])
+        self.assertEqual(other.column_dimensions['A'].width, 33)
+        self.assertTrue(other['A1'].font.b)
+
+
+if __name__ == '__main__':
+    unittest.main()